@@ -1,6 +1,16 @@
 from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session
 from app.config import Config
 from app.extensions import db, socketio
+from app.services.estado_compartido import estado_compartido
+from app.services.resumen_semanal import registrar_resumen_semanal
+from app.services import (
+    cache_autorizacion,
+    cache_periodos,
+    estadisticas_admin,
+    estadisticas_establecimiento,
+    instrumentacion_sql,
+)
+from app.services.emisiones_socket import gestor_cola_socketio
 from app.routes.inspeccion_routes import inspeccion_bp
 from app.routes.jefe_routes import jefe_routes
 from app.routes.inspector_routes import inspector_bp
@@ -31,6 +41,13 @@ def create_app():
 
     # Inicializar extensiones
     db.init_app(app)
+    instrumentacion_sql.init_app(app)
+    estado_compartido.init_app(app)
+    cache_autorizacion.init_app(app)
+    registrar_resumen_semanal()
+    cache_periodos.init_app(app)
+    estadisticas_admin.init_app(app)
+    estadisticas_establecimiento.init_app(app)
     socketio_options = {
         'logger': app.config['FLASK_ENV'] == 'development',
         'engineio_logger': app.config['FLASK_ENV'] == 'development',
@@ -41,7 +58,12 @@ def create_app():
         socketio_options['cors_allowed_origins'] = cors_allowed_origins
 
     message_queue = app.config.get('SOCKETIO_MESSAGE_QUEUE')
-    if message_queue:
+    if message_queue and app.config.get('SOCKETIO_SOLO_PUBLICAR'):
+        # Las conexiones las atiende el gateway asyncio; este proceso solo publica
+        socketio_options['client_manager'] = gestor_cola_socketio(
+            message_queue, solo_publicar=True
+        )
+    elif message_queue:
         socketio_options['message_queue'] = message_queue
 
     socketio.init_app(app, **socketio_options)
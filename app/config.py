@@ -149,6 +149,52 @@ class Config:
         SOCKETIO_ASYNC_MODE = 'threading'
     SOCKETIO_CORS_ALLOWED_ORIGINS = _get_csv_env('SOCKETIO_CORS_ALLOWED_ORIGINS')
     SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE')
+    # Ventana en la que se agrupan cambios de items por sala en un solo items_actualizados (0 = sin espera)
+    SOCKETIO_VENTANA_EMISION_MS = _get_int_env('SOCKETIO_VENTANA_EMISION_MS', 100)
+    # Gateway asyncio opcional (gateway_socketio.py): la app Flask solo publica en la cola
+    SOCKETIO_SOLO_PUBLICAR = _get_bool_env('SOCKETIO_SOLO_PUBLICAR', False)
+    # Hilos con los que el gateway ejecuta los handlers (consultas y estado compartido)
+    SOCKETIO_GATEWAY_HILOS = _get_int_env('SOCKETIO_GATEWAY_HILOS', 16)
+
+    # Estado vivo de inspecciones (borradores y checklist en tiempo real)
+    # memoria: un solo worker. sqlite: archivo WAL compartido entre workers del host.
+    ESTADO_TIEMPO_REAL_BACKEND = os.getenv('ESTADO_TIEMPO_REAL_BACKEND', 'memoria').strip().lower()
+    ESTADO_TIEMPO_REAL_RUTA = os.getenv(
+        'ESTADO_TIEMPO_REAL_RUTA',
+        os.path.join(BASE_DIR, 'var', 'estado_tiempo_real.sqlite3')
+    )
+    # Caducidad desde la última escritura, tope de memoria y periodo del barrido (0 desactiva)
+    ESTADO_TIEMPO_REAL_TTL_MINUTOS = _get_int_env('ESTADO_TIEMPO_REAL_TTL_MINUTOS', 720)
+    ESTADO_TIEMPO_REAL_MAX_MB = _get_int_env('ESTADO_TIEMPO_REAL_MAX_MB', 64)
+    ESTADO_TIEMPO_REAL_BARRIDO_SEGUNDOS = _get_int_env('ESTADO_TIEMPO_REAL_BARRIDO_SEGUNDOS', 60)
+    # Parches recientes que se guardan por establecimiento para reanudar reconexiones
+    ESTADO_TIEMPO_REAL_HISTORIAL_PARCHES = _get_int_env('ESTADO_TIEMPO_REAL_HISTORIAL_PARCHES', 200)
+    # Diario en disco de borradores para el backend memoria (se reproduce al arrancar)
+    ESTADO_TIEMPO_REAL_DIARIO = _get_bool_env('ESTADO_TIEMPO_REAL_DIARIO', True)
+    ESTADO_TIEMPO_REAL_DIARIO_RUTA = os.getenv(
+        'ESTADO_TIEMPO_REAL_DIARIO_RUTA',
+        os.path.join(BASE_DIR, 'var', 'borradores_inspeccion.jsonl')
+    )
+    ESTADO_TIEMPO_REAL_DIARIO_COMPACTAR_MB = _get_int_env('ESTADO_TIEMPO_REAL_DIARIO_COMPACTAR_MB', 16)
+
+    # Segundos que cada worker reutiliza los establecimientos autorizados de un usuario (0 desactiva)
+    AUTORIZACION_CACHE_TTL_SEGUNDOS = _get_int_env('AUTORIZACION_CACHE_TTL_SEGUNDOS', 60)
+
+    # Respuestas de periodos cerrados de los dashboards que guarda cada worker (0 desactiva)
+    CACHE_PERIODOS_MAX_ENTRADAS = _get_int_env('CACHE_PERIODOS_MAX_ENTRADAS', 256)
+
+    # Cada cuántos segundos se renuevan las estadísticas del dashboard de administración (0 = calcular en cada visita)
+    ADMIN_ESTADISTICAS_SEGUNDOS = _get_int_env('ADMIN_ESTADISTICAS_SEGUNDOS', 60)
+
+    # Segundos que se reutilizan los contadores de un establecimiento (se descartan al cambiar sus inspecciones; 0 desactiva)
+    ESTADISTICAS_ESTABLECIMIENTO_TTL_SEGUNDOS = _get_int_env('ESTADISTICAS_ESTABLECIMIENTO_TTL_SEGUNDOS', 300)
+
+    # Puntajes de una inspección sumados en la base con una consulta (false = calificar los detalles en Python)
+    PUNTAJES_EN_SQL = _get_bool_env('PUNTAJES_EN_SQL', True)
+
+    # Consultas por petición en Server-Timing y en el log; más de N repeticiones de la misma consulta se reportan como N+1
+    SQL_INSTRUMENTACION = _get_bool_env('SQL_INSTRUMENTACION', True)
+    SQL_REPETICIONES_MAX = _get_int_env('SQL_REPETICIONES_MAX', 10)
 
     # Configuración específica para producción
     if FLASK_ENV == 'production':
@@ -16,6 +16,8 @@ from functools import wraps
 import json
 from sqlalchemy import text, func, desc, or_, and_
 from app.extensions import db
+from app.services.estado_compartido import estado_compartido
+from app.services.estadisticas_admin import snapshot_admin
 from app.models.Usuario_models import Usuario, Rol, TipoEstablecimiento
 from app.models.Inspecciones_models import (
     Establecimiento, EncargadoEstablecimiento, Inspeccion, 
@@ -91,15 +93,14 @@ class AdminController:
         Muestra estadísticas generales del sistema
         """
         try:
-            # Estadísticas generales
-            stats = AdminController.obtener_estadisticas_generales()
+            # Estadísticas generales y alertas: instantánea renovada en segundo plano
+            snapshot = snapshot_admin.obtener(current_app._get_current_object())
+            stats = snapshot['estadisticas']
+            alertas = snapshot['alertas']
             
             # Actividad reciente
             actividad_reciente = AdminController.obtener_actividad_reciente()
             
-            # Alertas del sistema
-            alertas = AdminController.obtener_alertas_sistema()
-            
             return render_template('admin/dashboard.html', 
                                  stats=stats,
                                  actividad_reciente=actividad_reciente,
@@ -111,43 +112,9 @@ class AdminController:
     
     @staticmethod
     def obtener_estadisticas_generales():
-        """Obtiene estadísticas generales del sistema"""
+        """Obtiene estadísticas generales del sistema (instantánea compartida)"""
         try:
-            # Contar usuarios por rol
-            usuarios_stats = db.session.query(
-                Rol.nombre,
-                func.count(Usuario.id).label('cantidad')
-            ).join(Usuario, Rol.id == Usuario.rol_id).filter(Usuario.activo == True).group_by(Rol.nombre).all()
-            
-            # Establecimientos y encargados
-            total_establecimientos = Establecimiento.query.filter_by(activo=True).count()
-            establecimientos_con_encargado = db.session.query(
-                func.count(func.distinct(EncargadoEstablecimiento.establecimiento_id))
-            ).filter(EncargadoEstablecimiento.activo == True).scalar()
-            
-            # Inspecciones del mes actual
-            inicio_mes = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            inspecciones_mes = Inspeccion.query.filter(
-                Inspeccion.fecha >= inicio_mes
-            ).count()
-            
-            # Inspecciones pendientes
-            inspecciones_pendientes = Inspeccion.query.filter_by(estado='pendiente').count()
-            
-            # Jefes de establecimiento activos
-            total_jefes = JefeEstablecimiento.query.filter_by(activo=True).count()
-            
-            return {
-                'usuarios_por_rol': dict(usuarios_stats),
-                'total_usuarios': Usuario.query.filter_by(activo=True).count(),
-                'total_establecimientos': total_establecimientos,
-                'establecimientos_con_encargado': establecimientos_con_encargado,
-                'inspecciones_mes': inspecciones_mes,
-                'inspecciones_pendientes': inspecciones_pendientes,
-                'usuarios_en_linea': Usuario.query.filter_by(en_linea=True).count(),
-                'total_jefes': total_jefes
-            }
-            
+            return snapshot_admin.obtener(current_app._get_current_object())['estadisticas']
         except Exception as e:
             return {}
     
@@ -183,45 +150,9 @@ class AdminController:
     
     @staticmethod
     def obtener_alertas_sistema():
-        """Obtiene alertas importantes del sistema"""
+        """Obtiene alertas importantes del sistema (instantánea compartida)"""
         try:
-            alertas = []
-            
-            # Establecimientos sin encargado
-            establecimientos_sin_encargado = db.session.query(
-                Establecimiento.nombre
-            ).outerjoin(EncargadoEstablecimiento, and_(
-                EncargadoEstablecimiento.establecimiento_id == Establecimiento.id,
-                EncargadoEstablecimiento.activo == True
-            )).filter(
-                Establecimiento.activo == True,
-                EncargadoEstablecimiento.id.is_(None)
-            ).all()
-            
-            if establecimientos_sin_encargado:
-                alertas.append({
-                    'tipo': 'warning',
-                    'titulo': 'Establecimientos sin Encargado',
-                    'mensaje': f'{len(establecimientos_sin_encargado)} establecimientos no tienen encargado asignado',
-                    'detalles': [e.nombre for e in establecimientos_sin_encargado]
-                })
-            
-            # Inspecciones pendientes por más de 7 días
-            fecha_limite = datetime.now() - timedelta(days=7)
-            inspecciones_atrasadas = Inspeccion.query.filter(
-                Inspeccion.estado == 'pendiente',
-                Inspeccion.fecha < fecha_limite
-            ).count()
-            
-            if inspecciones_atrasadas > 0:
-                alertas.append({
-                    'tipo': 'danger',
-                    'titulo': 'Inspecciones Atrasadas',
-                    'mensaje': f'{inspecciones_atrasadas} inspecciones pendientes por más de 7 días'
-                })
-            
-            return alertas
-            
+            return snapshot_admin.obtener(current_app._get_current_object())['alertas']
         except Exception as e:
             return []
 
@@ -549,6 +480,15 @@ def api_health_check():
             'timestamp': datetime.now().isoformat()
         }), 500
 
+@admin_bp.route('/api/estado-tiempo-real', methods=['GET'])
+@admin_required
+def api_estado_tiempo_real():
+    """API con el tamaño y los contadores de expulsión del estado vivo de inspecciones"""
+    try:
+        return jsonify(estado_compartido.estadisticas())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # =================== GESTIÓN DE ROLES ===================
 
 @admin_bp.route('/roles')
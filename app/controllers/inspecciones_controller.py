@@ -1,4 +1,4 @@
-from flask import json, jsonify, request, session, current_app
+from flask import json, jsonify, request, session, current_app, stream_with_context
 from datetime import datetime, date, timedelta
 import logging
 import os
@@ -7,7 +7,7 @@ import re
 import uuid
 from werkzeug.utils import secure_filename
 import pytz
-from sqlalchemy import text, func, or_
+from sqlalchemy import text, func, or_, and_, insert, select, update
 from app.extensions import socketio, db
 from app.models.Inspecciones_models import (
     Inspeccion,
@@ -98,17 +98,54 @@ from app.models.Inspecciones_models import (
     EvidenciaInspeccion,
     ItemEvaluacionBase,
     InspectorEstablecimiento,
+    ResumenSemanalEstablecimiento,
 )
 from app.models.Usuario_models import Usuario, TipoEstablecimiento, Rol
 from app.extensions import db
+from app.services.estado_compartido import estado_compartido
+from app.services.emisiones_socket import LoteEmisiones
+from app.services.cache_autorizacion import establecimientos_autorizados
+from app.services.planes_semanales import obtener_o_crear_planes
+from app.services.puntuacion import (
+    aporte_rating,
+    aportes_sql,
+    calificacion_global,
+    configuracion_calificacion,
+    metricas_rating,
+    puntaje_maximo_posible,
+    puntaje_maximo_sql,
+    rating_efectivo_sql,
+    resumir_lote,
+    tabla_calificacion,
+)
+from app.services.cache_periodos import (
+    VERSION_INSPECCIONES,
+    cache_periodos,
+    clave_periodo,
+    versiones,
+)
+from app.services.checklist_tiempo_real import (
+    EVENTO_PARCHE,
+    anotar_parche,
+    construir_parche,
+    huella,
+    huellas_items,
+    mensaje_parche,
+    parche_modifica_items,
+    registrar_parche,
+    reiniciar_confirmacion,
+)
 
-# Almacenamiento temporal en memoria para datos de inspección
-# En producción usar Redis
-inspecciones_temporales = {}
-datos_tiempo_real = {}  # Para almacenar datos temporales entre inspector y encargado
+# Estado vivo de inspecciones compartido entre workers (ver ESTADO_TIEMPO_REAL_BACKEND).
+# Los valores leídos son copias: para modificarlos usar .actualizar(clave, funcion).
+inspecciones_temporales = estado_compartido.espacio("inspecciones_temporales")
+datos_tiempo_real = estado_compartido.espacio("datos_tiempo_real")  # Datos compartidos entre inspector y encargado
+huellas_borrador = estado_compartido.espacio("huellas_borrador")  # Huella del último autoguardado por establecimiento
 
 
 class InspeccionesController:
+    BUSQUEDA_LIMITE = 50
+    BUSQUEDA_LIMITE_MAXIMO = 200
     EVIDENCIAS_FOLDER = "app/static/evidencias"
     FIRMAS_FOLDER = "firmas"
     ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "webp", "avif"}
@@ -411,31 +448,12 @@ class InspeccionesController:
 
     @staticmethod
     def _obtener_configuracion_calificacion(riesgo):
-        riesgo_normalizado = (riesgo or "").strip()
-        if riesgo_normalizado == "Crítico":
-            return {
-                "puntaje_minimo": 1,
-                "puntaje_maximo": 8,
-                "opciones_validas": {1, 8},
-                "etiquetas_calificacion": {1: "Cumple", 8: "No cumple"},
-                "porcentaje_por_rating": {1: 100, 8: 0},
-            }
-
-        return {
-            "puntaje_minimo": 1,
-            "puntaje_maximo": 3,
-            "opciones_validas": {1, 2, 3},
-            "etiquetas_calificacion": {
-                1: "Excelente",
-                2: "Bueno",
-                3: "Regular",
-            },
-            "porcentaje_por_rating": {1: 100, 2: 75, 3: 50},
-        }
+        """Configuración del riesgo, compartida y de solo lectura (ver app/services/puntuacion.py)."""
+        return tabla_calificacion(riesgo)
 
     @staticmethod
     def _normalizar_rating_por_riesgo(riesgo, rating):
-        config = InspeccionesController._obtener_configuracion_calificacion(riesgo)
+        config = tabla_calificacion(riesgo)
 
         try:
             rating_normalizado = int(rating)
@@ -446,73 +464,69 @@ class InspeccionesController:
 
     @staticmethod
     def _calcular_metricas_rating(riesgo, rating):
-        es_valido, rating_normalizado, config = (
-            InspeccionesController._normalizar_rating_por_riesgo(riesgo, rating)
-        )
-        if not es_valido:
-            return None
+        return metricas_rating(riesgo, rating)
 
+    @staticmethod
+    def _configuracion_items_tiempo_real(establecimiento_id):
+        """Riesgo por item y máximos del establecimiento, en forma serializable."""
+        items_configurados = InspeccionesController._obtener_items_activos_establecimiento(
+            establecimiento_id
+        )
+        riesgos = {str(item_est.id): item_base.riesgo or "" for item_est, item_base in items_configurados}
         return {
-            "rating": rating_normalizado,
-            "puntaje": float(rating_normalizado),
-            "puntaje_maximo": float(config["puntaje_maximo"]),
-            "porcentaje_cumplimiento": float(
-                config["porcentaje_por_rating"][rating_normalizado]
-            ),
-            "criticos_no_conformes": 1
-            if (riesgo or "").strip() == "Crítico" and rating_normalizado == 8
-            else 0,
+            "riesgos": riesgos,
+            "total_items": len(items_configurados),
+            "puntaje_maximo_posible": puntaje_maximo_posible(riesgos.values()),
         }
 
     @staticmethod
-    def _calcular_calificacion_global(puntaje_total, items_calificados):
-        if not items_calificados:
+    def _aporte_item_tiempo_real(riesgo, item_data):
+        """``[puntaje, porcentaje, criticos]`` de un item calificado o ``None``."""
+        if riesgo is None or not isinstance(item_data, dict) or item_data.get("rating") is None:
             return None
-        puntos_extra = max(0, round(puntaje_total) - items_calificados)
-        if puntos_extra == 0:
-            return "EXCELENTE"
-        elif puntos_extra <= 7:
-            return "MUY BIEN"
-        elif puntos_extra <= 15:
-            return "REGULAR"
-        else:
-            return "MALO"
+        aporte = aporte_rating(riesgo, item_data["rating"])
+        return list(aporte) if aporte else None
 
     @staticmethod
-    def _calcular_resumen_desde_evaluaciones(evaluaciones, total_items=None):
-        puntaje_total = 0.0
-        suma_porcentaje_cumplimiento = 0.0
-        puntos_criticos_perdidos = 0
-        items_calificados = 0
-        puntaje_maximo_posible = 0.0
-
-        for evaluacion in evaluaciones:
-            riesgo = evaluacion.get("riesgo")
-            puntaje_maximo_posible += float(
-                InspeccionesController._obtener_configuracion_calificacion(riesgo)[
-                    "puntaje_maximo"
-                ]
-            )
-
-            detalle = evaluacion.get("detalle") or {}
-            rating = detalle.get("rating")
-            if rating is None:
-                continue
-
-            metricas = InspeccionesController._calcular_metricas_rating(riesgo, rating)
-            if not metricas:
-                continue
+    def _resumen_desde_aportes(aportes, configuracion):
+        items_evaluados = len(aportes)
+        puntaje_total = sum(aporte[0] for aporte in aportes.values())
+        suma_porcentaje = sum(aporte[1] for aporte in aportes.values())
+        puntos_criticos_perdidos = sum(aporte[2] for aporte in aportes.values())
+        return {
+            "puntaje_total": round(puntaje_total, 2),
+            "puntaje_maximo_posible": round(configuracion["puntaje_maximo_posible"], 2),
+            "puntaje_promedio_item": round(puntaje_total / items_evaluados, 2)
+            if items_evaluados
+            else 0,
+            "porcentaje_cumplimiento": round(suma_porcentaje / items_evaluados, 2)
+            if items_evaluados
+            else 0,
+            "puntos_criticos_perdidos": round(puntos_criticos_perdidos, 2),
+            "items_calificados": items_evaluados,
+            "items_evaluados": items_evaluados,
+            "total_items": configuracion["total_items"],
+        }
 
-            puntaje_total += metricas["puntaje"]
-            suma_porcentaje_cumplimiento += metricas["porcentaje_cumplimiento"]
-            puntos_criticos_perdidos += metricas["criticos_no_conformes"]
-            items_calificados += 1
+    @staticmethod
+    def _calcular_resumen_desde_evaluaciones(evaluaciones, total_items=None):
+        riesgos = [evaluacion.get("riesgo") for evaluacion in evaluaciones]
+        calificadas = [
+            (evaluacion.get("riesgo"), (evaluacion.get("detalle") or {}).get("rating"))
+            for evaluacion in evaluaciones
+            if (evaluacion.get("detalle") or {}).get("rating") is not None
+        ]
+        totales = resumir_lote(
+            [riesgo for riesgo, _ in calificadas], [rating for _, rating in calificadas]
+        )
+        puntaje_total = totales["puntaje_total"]
+        items_calificados = totales["items_calificados"]
 
         if total_items is None:
             total_items = len(evaluaciones)
 
         porcentaje_cumplimiento = (
-            round(suma_porcentaje_cumplimiento / items_calificados, 2)
+            round(totales["suma_porcentaje"] / items_calificados, 2)
             if items_calificados > 0
             else 0
         )
@@ -524,10 +538,10 @@ class InspeccionesController:
 
         return {
             "puntaje_total": round(puntaje_total, 2),
-            "puntaje_maximo_posible": round(puntaje_maximo_posible, 2),
+            "puntaje_maximo_posible": round(float(puntaje_maximo_posible(riesgos)), 2),
             "puntaje_promedio_item": puntaje_promedio_item,
             "porcentaje_cumplimiento": porcentaje_cumplimiento,
-            "puntos_criticos_perdidos": puntos_criticos_perdidos,
+            "puntos_criticos_perdidos": totales["puntos_criticos_perdidos"],
             "items_calificados": items_calificados,
             "total_items": total_items,
             "calificacion_global": InspeccionesController._calcular_calificacion_global(
@@ -554,6 +568,56 @@ class InspeccionesController:
             .all()
         )
 
+    @staticmethod
+    def _guardar_detalles_inspeccion(inspeccion_id, detalles_por_item):
+        """Inserta o actualiza en bloque los detalles de una inspección.
+
+        ``detalles_por_item`` es ``{item_establecimiento_id: {"rating", "score",
+        "observacion_item"}}``. Una consulta trae los detalles existentes y luego
+        se hace un ``executemany`` para las inserciones y otro para las
+        actualizaciones. Devuelve ``(insertados, actualizados)``.
+
+        El UPDATE por clave primaria aplica los valores a los detalles que la
+        sesión ya tenga cargados, pero el INSERT en bloque no pasa por el
+        identity map: si ``inspeccion.detalles`` estaba cargada se expira para
+        que lo que se lea antes del commit incluya los detalles nuevos.
+        """
+        if not detalles_por_item:
+            return 0, 0
+
+        existentes = {}
+        for detalle_id, item_id in (
+            db.session.query(InspeccionDetalle.id, InspeccionDetalle.item_establecimiento_id)
+            .filter(InspeccionDetalle.inspeccion_id == inspeccion_id)
+            .order_by(InspeccionDetalle.id)
+        ):
+            existentes.setdefault(item_id, detalle_id)
+
+        nuevos = []
+        cambios = []
+        for item_id, valores in detalles_por_item.items():
+            if item_id in existentes:
+                cambios.append({"id": existentes[item_id], **valores})
+            else:
+                nuevos.append(
+                    {
+                        "inspeccion_id": inspeccion_id,
+                        "item_establecimiento_id": item_id,
+                        **valores,
+                    }
+                )
+
+        if nuevos:
+            db.session.execute(insert(InspeccionDetalle), nuevos)
+            inspeccion = db.session.identity_map.get(
+                db.session.identity_key(Inspeccion, inspeccion_id)
+            )
+            if inspeccion is not None:
+                db.session.expire(inspeccion, ["detalles"])
+        if cambios:
+            db.session.execute(update(InspeccionDetalle), cambios)
+        return len(nuevos), len(cambios)
+
     @staticmethod
     def allowed_file(filename):
         return is_allowed_image_filename(filename)
@@ -584,16 +648,33 @@ class InspeccionesController:
 
     @staticmethod
     def _obtener_establecimientos_autorizados(user_id, user_role):
-        """Devuelve los establecimientos que el usuario puede consultar o editar."""
+        """Devuelve los establecimientos que el usuario puede consultar o editar.
+
+        Se memoriza por petición y, por unos segundos, entre peticiones; los
+        cambios de asignaciones o de establecimientos lo invalidan.
+        """
         if not user_id or not user_role:
             return []
 
+        return establecimientos_autorizados.obtener(
+            user_id,
+            user_role,
+            lambda: InspeccionesController._cargar_establecimientos_autorizados(
+                user_id, user_role
+            ),
+        )
+
+    @staticmethod
+    def _cargar_establecimientos_autorizados(user_id, user_role):
         hoy = date.today()
 
         if user_role in [ROL_ADMINISTRADOR, ROL_INSPECTOR, ROL_AYUDANTE_INSPECTOR]:
             return [
-                establecimiento.id
-                for establecimiento in Establecimiento.query.filter_by(activo=True).all()
+                establecimiento_id
+                for (establecimiento_id,) in db.session.query(Establecimiento.id)
+                .filter(Establecimiento.activo == True)
+                .order_by(Establecimiento.id)
+                .all()
             ]
 
         if user_role == ROL_ENCARGADO:
@@ -852,6 +933,68 @@ class InspeccionesController:
             db.session.rollback()
             return []
 
+    @staticmethod
+    def _encargados_actuales(establecimiento_ids, fecha_actual):
+        """Encargado vigente de cada establecimiento (principal y más reciente primero).
+
+        Una sola consulta: ROW_NUMBER() por establecimiento sobre las asignaciones
+        vigentes y se queda con la primera de cada uno.
+        """
+        if not establecimiento_ids:
+            return {}
+
+        orden = (
+            func.row_number()
+            .over(
+                partition_by=EncargadoEstablecimiento.establecimiento_id,
+                order_by=(
+                    EncargadoEstablecimiento.es_principal.desc(),
+                    EncargadoEstablecimiento.fecha_inicio.desc(),
+                    EncargadoEstablecimiento.id.desc(),
+                ),
+            )
+            .label("orden")
+        )
+        vigentes = (
+            db.session.query(
+                EncargadoEstablecimiento.establecimiento_id,
+                EncargadoEstablecimiento.usuario_id,
+                orden,
+            )
+            .filter(
+                EncargadoEstablecimiento.establecimiento_id.in_(establecimiento_ids),
+                EncargadoEstablecimiento.activo == True,
+                EncargadoEstablecimiento.fecha_inicio <= fecha_actual,
+                or_(
+                    EncargadoEstablecimiento.fecha_fin.is_(None),
+                    EncargadoEstablecimiento.fecha_fin >= fecha_actual,
+                ),
+            )
+            .subquery()
+        )
+        filas = (
+            db.session.query(
+                vigentes.c.establecimiento_id,
+                Usuario.id,
+                Usuario.nombre,
+                Usuario.apellido,
+                Usuario.correo,
+                Usuario.telefono,
+            )
+            .join(Usuario, Usuario.id == vigentes.c.usuario_id)
+            .filter(vigentes.c.orden == 1)
+            .all()
+        )
+        return {
+            fila.establecimiento_id: {
+                "id": fila.id,
+                "nombre": f"{fila.nombre} {fila.apellido or ''}".strip(),
+                "correo": fila.correo,
+                "telefono": fila.telefono,
+            }
+            for fila in filas
+        }
+
     @staticmethod
     def obtener_establecimientos():
         try:
@@ -928,97 +1071,92 @@ class InspeccionesController:
             else:
                 return jsonify({"error": "Rol no autorizado"}), 403
 
-            data = []
             fecha_actual = date.today()
+            data = [
+                {
+                    "id": e.id,
+                    "nombre": e.nombre,
+                    "direccion": e.direccion,
+                    "tipo_establecimiento_id": e.tipo_establecimiento_id,
+                }
+                for e in establecimientos
+            ]
+            establecimiento_ids = [fila["id"] for fila in data]
+            planes_creados = 0
 
-            for e in establecimientos:
-                
-                # Obtener tipo de establecimiento de manera segura
-                tipo_establecimiento_nombre = None
+            # FILTRADO POR META SEMANAL: Solo para inspectores
+            if user_role == "Inspector" and data:
                 try:
-                    if hasattr(e, 'tipo_establecimiento') and e.tipo_establecimiento:
-                        tipo_establecimiento_nombre = e.tipo_establecimiento.nombre
-                except Exception as tipo_error:
-                    import logging
-                    logging.error(f"Error obteniendo tipo de establecimiento: {str(tipo_error)}")
-
-                # FILTRADO POR META SEMANAL: Solo para inspectores
-                if user_role == "Inspector":
-                    try:
-                        # Calcular semana actual (LUNES A DOMINGO)
-                        import pytz
-                        lima_tz = pytz.timezone("America/Lima")
-                        fecha_obj = datetime.now(lima_tz)
-                        semana_actual = fecha_obj.isocalendar()[1]
-                        ano_actual = fecha_obj.year
-
-                        # Obtener plan semanal del establecimiento
-                        plan_semanal = InspeccionesController.obtener_o_crear_plan_semanal(
-                            e.id, semana_actual, ano_actual
-                        )
-
-                        # Contar inspecciones completadas en la semana actual
-                        from sqlalchemy import func
-                        inicio_semana = fecha_obj.date() - timedelta(days=fecha_obj.weekday())  # Lunes de esta semana
-                        fin_semana = inicio_semana + timedelta(days=6)  # Domingo de esta semana
-
-                        inspecciones_completadas = Inspeccion.query.filter(
-                            func.date(Inspeccion.fecha) >= inicio_semana,
-                            func.date(Inspeccion.fecha) <= fin_semana,
-                            Inspeccion.establecimiento_id == e.id,
-                            Inspeccion.estado == 'completada'
-                        ).count()
-
-                        # Si ya alcanzó la meta semanal, saltar este establecimiento
-                        if inspecciones_completadas >= plan_semanal.evaluaciones_meta:
-                            continue
+                    # Calcular semana actual (LUNES A DOMINGO)
+                    lima_tz = pytz.timezone("America/Lima")
+                    fecha_obj = datetime.now(lima_tz)
+                    inicio_semana = fecha_obj.date() - timedelta(days=fecha_obj.weekday())  # Lunes de esta semana
+                    fin_semana = inicio_semana + timedelta(days=6)  # Domingo de esta semana
 
-                    except Exception as meta_error:
-                        import logging
-                        logging.warning(f"Error verificando meta semanal para establecimiento {e.id}: {str(meta_error)}")
-                        # En caso de error, incluir el establecimiento para no bloquear funcionalidad
+                    planes, planes_creados = InspeccionesController.obtener_o_crear_planes_semanales(
+                        establecimiento_ids, fecha_obj.isocalendar()[1], fecha_obj.year
+                    )
 
-                # Obtener el encargado actual del establecimiento
-                try:
-                    encargado = (
-                        EncargadoEstablecimiento.query.filter(
-                            EncargadoEstablecimiento.establecimiento_id == e.id,
-                            EncargadoEstablecimiento.activo == True,
-                            EncargadoEstablecimiento.fecha_inicio <= fecha_actual,
-                            (
-                                EncargadoEstablecimiento.fecha_fin.is_(None)
-                                | (EncargadoEstablecimiento.fecha_fin >= fecha_actual)
-                            ),
+                    # Inspecciones completadas en la semana, todas en una consulta
+                    completadas = dict(
+                        db.session.query(
+                            Inspeccion.establecimiento_id, func.count(Inspeccion.id)
                         )
-                        .order_by(
-                            EncargadoEstablecimiento.es_principal.desc(),
-                            EncargadoEstablecimiento.fecha_inicio.desc(),
+                        .filter(
+                            Inspeccion.establecimiento_id.in_(establecimiento_ids),
+                            Inspeccion.fecha >= inicio_semana,
+                            Inspeccion.fecha <= fin_semana,
+                            Inspeccion.estado == "completada",
                         )
-                        .first()
+                        .group_by(Inspeccion.establecimiento_id)
+                        .all()
                     )
-                except Exception as encargado_error:
-                    encargado = None
 
-                data.append(
-                    {
-                        "id": e.id,
-                        "nombre": e.nombre,
-                        "direccion": e.direccion,
-                        "tipo_establecimiento_id": e.tipo_establecimiento_id,
-                        "tipo_establecimiento": tipo_establecimiento_nombre,
-                        "encargado_actual": (
-                            {
-                                "id": encargado.usuario.id,
-                                "nombre": f"{encargado.usuario.nombre} {encargado.usuario.apellido or ''}".strip(),
-                                "correo": encargado.usuario.correo,
-                                "telefono": encargado.usuario.telefono,
-                            }
-                            if encargado
-                            else None
-                        ),
-                    }
+                    # Si ya alcanzó la meta semanal, se omite el establecimiento
+                    data = [
+                        fila
+                        for fila in data
+                        if completadas.get(fila["id"], 0)
+                        < planes[fila["id"]].evaluaciones_meta
+                    ]
+                    establecimiento_ids = [fila["id"] for fila in data]
+
+                except Exception as meta_error:
+                    db.session.rollback()
+                    planes_creados = 0
+                    logging.warning(f"Error verificando meta semanal de establecimientos: {str(meta_error)}")
+                    # En caso de error, incluir los establecimientos para no bloquear funcionalidad
+
+            tipos = {}
+            tipo_ids = {
+                fila["tipo_establecimiento_id"]
+                for fila in data
+                if fila["tipo_establecimiento_id"]
+            }
+            if tipo_ids:
+                try:
+                    tipos = dict(
+                        db.session.query(TipoEstablecimiento.id, TipoEstablecimiento.nombre)
+                        .filter(TipoEstablecimiento.id.in_(tipo_ids))
+                        .all()
+                    )
+                except Exception as tipo_error:
+                    logging.error(f"Error obteniendo tipos de establecimiento: {str(tipo_error)}")
+
+            try:
+                encargados = InspeccionesController._encargados_actuales(
+                    establecimiento_ids, fecha_actual
                 )
+            except Exception as encargado_error:
+                encargados = {}
+
+            for fila in data:
+                fila["tipo_establecimiento"] = tipos.get(fila["tipo_establecimiento_id"])
+                fila["encargado_actual"] = encargados.get(fila["id"])
 
+            # Confirma los planes semanales que se hayan creado para el filtro de meta
+            if planes_creados:
+                db.session.commit()
             return jsonify(data)
         except Exception as e:
             import traceback
@@ -1118,63 +1256,126 @@ class InspeccionesController:
             return jsonify({"error": str(e)}), 500
 
     @staticmethod
-    def calcular_puntajes_inspeccion(inspeccion_id):
-        """Calcula automáticamente los puntajes de una inspección"""
-        try:
-            inspeccion = Inspeccion.query.get(inspeccion_id)
-            if not inspeccion:
-                raise Exception("Inspección no encontrada")
+    def _totales_puntaje_sql(inspeccion):
+        """Totales de ``calcular_puntajes_inspeccion`` en una consulta de agregación.
 
-            items_configurados = (
-                InspeccionesController._obtener_items_activos_establecimiento(
-                    inspeccion.establecimiento_id
-                )
+        Los detalles se califican con los ``CASE`` de app/services/puntuacion.py;
+        el máximo posible y el total de items activos van como subconsultas.
+        """
+        detalles = (
+            select(
+                ItemEvaluacionBase.riesgo.label("riesgo"),
+                rating_efectivo_sql(InspeccionDetalle.rating, InspeccionDetalle.score).label(
+                    "rating"
+                ),
+            )
+            .select_from(InspeccionDetalle)
+            .join(
+                ItemEvaluacionEstablecimiento,
+                InspeccionDetalle.item_establecimiento_id == ItemEvaluacionEstablecimiento.id,
             )
-            puntaje_maximo_posible = sum(
-                InspeccionesController._obtener_configuracion_calificacion(
-                    item_base.riesgo
-                )["puntaje_maximo"]
-                for _, item_base in items_configurados
+            .join(
+                ItemEvaluacionBase,
+                ItemEvaluacionEstablecimiento.item_base_id == ItemEvaluacionBase.id,
             )
-            total_items = len(items_configurados)
+            .where(InspeccionDetalle.inspeccion_id == inspeccion.id)
+            .subquery()
+        )
+        puntaje, porcentaje, criticos = aportes_sql(detalles.c.riesgo, detalles.c.rating)
 
-            # Obtener todos los detalles de la inspección
-            detalles = (
-                db.session.query(
-                    InspeccionDetalle, ItemEvaluacionEstablecimiento, ItemEvaluacionBase
-                )
-                .join(
-                    ItemEvaluacionEstablecimiento,
-                    InspeccionDetalle.item_establecimiento_id
-                    == ItemEvaluacionEstablecimiento.id,
-                )
-                .join(
-                    ItemEvaluacionBase,
-                    ItemEvaluacionEstablecimiento.item_base_id == ItemEvaluacionBase.id,
-                )
-                .filter(InspeccionDetalle.inspeccion_id == inspeccion_id)
-                .all()
+        # Mismo filtro que _obtener_items_activos_establecimiento
+        items_activos = (
+            select(ItemEvaluacionBase.riesgo)
+            .select_from(ItemEvaluacionEstablecimiento)
+            .join(
+                ItemEvaluacionBase,
+                ItemEvaluacionEstablecimiento.item_base_id == ItemEvaluacionBase.id,
             )
+            .where(
+                ItemEvaluacionEstablecimiento.establecimiento_id == inspeccion.establecimiento_id,
+                ItemEvaluacionEstablecimiento.activo == True,
+                ItemEvaluacionBase.activo == True,
+            )
+            .subquery()
+        )
 
-            puntaje_total = 0
-            suma_porcentaje_cumplimiento = 0
-            puntos_criticos_perdidos = 0
-            items_calificados = 0
+        fila = db.session.execute(
+            select(
+                func.coalesce(func.sum(puntaje), 0).label("puntaje_total"),
+                func.coalesce(func.sum(porcentaje), 0).label("suma_porcentaje"),
+                func.coalesce(func.sum(criticos), 0).label("puntos_criticos_perdidos"),
+                func.count(puntaje).label("items_calificados"),
+                select(func.coalesce(func.sum(puntaje_maximo_sql(items_activos.c.riesgo)), 0))
+                .scalar_subquery()
+                .label("puntaje_maximo_posible"),
+                select(func.count()).select_from(items_activos).scalar_subquery().label(
+                    "total_items"
+                ),
+            ).select_from(detalles)
+        ).one()
 
-            for detalle, item_est, item_base in detalles:
-                metricas_rating = InspeccionesController._calcular_metricas_rating(
-                    item_base.riesgo,
-                    detalle.rating if detalle.rating is not None else detalle.score,
-                )
-                if not metricas_rating:
-                    continue
+        return {
+            "puntaje_total": float(fila.puntaje_total),
+            "suma_porcentaje": float(fila.suma_porcentaje),
+            "puntos_criticos_perdidos": int(fila.puntos_criticos_perdidos),
+            "items_calificados": int(fila.items_calificados),
+            "puntaje_maximo_posible": int(fila.puntaje_maximo_posible),
+            "total_items": int(fila.total_items),
+        }
 
-                puntaje_total += metricas_rating["puntaje"]
-                suma_porcentaje_cumplimiento += metricas_rating[
-                    "porcentaje_cumplimiento"
-                ]
-                puntos_criticos_perdidos += metricas_rating["criticos_no_conformes"]
-                items_calificados += 1
+    @staticmethod
+    def _totales_puntaje_python(inspeccion):
+        """Mismos totales que ``_totales_puntaje_sql`` calificando los detalles en Python."""
+        items_configurados = InspeccionesController._obtener_items_activos_establecimiento(
+            inspeccion.establecimiento_id
+        )
+
+        # Obtener todos los detalles de la inspección
+        detalles = (
+            db.session.query(InspeccionDetalle, ItemEvaluacionEstablecimiento, ItemEvaluacionBase)
+            .join(
+                ItemEvaluacionEstablecimiento,
+                InspeccionDetalle.item_establecimiento_id == ItemEvaluacionEstablecimiento.id,
+            )
+            .join(
+                ItemEvaluacionBase,
+                ItemEvaluacionEstablecimiento.item_base_id == ItemEvaluacionBase.id,
+            )
+            .filter(InspeccionDetalle.inspeccion_id == inspeccion.id)
+            .all()
+        )
+
+        totales = resumir_lote(
+            [item_base.riesgo for _, _, item_base in detalles],
+            [
+                detalle.rating if detalle.rating is not None else detalle.score
+                for detalle, _, _ in detalles
+            ],
+        )
+        totales["puntaje_maximo_posible"] = puntaje_maximo_posible(
+            item_base.riesgo for _, item_base in items_configurados
+        )
+        totales["total_items"] = len(items_configurados)
+        return totales
+
+    @staticmethod
+    def calcular_puntajes_inspeccion(inspeccion_id):
+        """Calcula automáticamente los puntajes de una inspección"""
+        try:
+            inspeccion = Inspeccion.query.get(inspeccion_id)
+            if not inspeccion:
+                raise Exception("Inspección no encontrada")
+
+            if current_app.config.get("PUNTAJES_EN_SQL", True):
+                totales = InspeccionesController._totales_puntaje_sql(inspeccion)
+            else:
+                totales = InspeccionesController._totales_puntaje_python(inspeccion)
+            puntaje_total = totales["puntaje_total"]
+            suma_porcentaje_cumplimiento = totales["suma_porcentaje"]
+            puntos_criticos_perdidos = totales["puntos_criticos_perdidos"]
+            items_calificados = totales["items_calificados"]
+            puntaje_maximo = totales["puntaje_maximo_posible"]
+            total_items = totales["total_items"]
 
             porcentaje = (
                 (suma_porcentaje_cumplimiento / items_calificados)
@@ -1188,14 +1389,14 @@ class InspeccionesController:
             )
 
             inspeccion.puntaje_total = puntaje_total
-            inspeccion.puntaje_maximo_posible = puntaje_maximo_posible
+            inspeccion.puntaje_maximo_posible = puntaje_maximo
             inspeccion.porcentaje_cumplimiento = round(porcentaje, 2)
             inspeccion.puntos_criticos_perdidos = puntos_criticos_perdidos
             db.session.commit()
 
             return {
                 "puntaje_total": puntaje_total,
-                "puntaje_maximo_posible": puntaje_maximo_posible,
+                "puntaje_maximo_posible": puntaje_maximo,
                 "puntaje_promedio_item": puntaje_promedio_item,
                 "porcentaje_cumplimiento": round(porcentaje, 2),
                 "puntos_criticos_perdidos": puntos_criticos_perdidos,
@@ -1251,183 +1452,185 @@ class InspeccionesController:
 
             clave_temporal = f"establecimiento_{establecimiento_id}"
 
-            # Guardar en memoria del servidor
+            # Autoguardado idéntico al anterior: basta comparar la huella del borrador.
+            # No se reescribe nada, pero se renueva el TTL para que un borrador que
+            # sigue abierto no caduque por no cambiar
+            huella_borrador = huella(data)
+            registro_huella = huellas_borrador.get(clave_temporal)
+            if (
+                registro_huella
+                and registro_huella.get("huella") == huella_borrador
+                and registro_huella.get("user_id") == user_id
+                and inspecciones_temporales.tocar(clave_temporal)
+                and datos_tiempo_real.tocar(clave_temporal)
+            ):
+                huellas_borrador.tocar(clave_temporal)
+                return jsonify(
+                    {
+                        "mensaje": "Sin cambios desde el último guardado",
+                        "timestamp": registro_huella.get("timestamp"),
+                        "seq": registro_huella.get("seq", 0),
+                    }
+                )
+
+            # Guardar en el estado compartido del servidor
+            timestamp_guardado = safe_timestamp()
             inspecciones_temporales[clave_temporal] = {
                 "data": data,
-                "timestamp": safe_timestamp(),
+                "timestamp": timestamp_guardado,
                 "user_id": user_id,
             }
 
-            # Debug logging
-
             # Actualizar datos tiempo real SOLO SI HAY CAMBIOS
-            establecimiento_id = data.get("establecimiento_id")
-            if establecimiento_id:
-                clave_tiempo_real = f"establecimiento_{establecimiento_id}"
-
-                # Obtener datos anteriores para comparar
-                datos_anteriores = datos_tiempo_real.get(clave_tiempo_real, {})
-                items_anteriores = datos_anteriores.get("items", {})
-                observaciones_anteriores = datos_anteriores.get("observaciones", "")
-
-                # Verificar si hay cambios reales
-                items_actuales = data.get("items", {})
-                observaciones_actuales = data.get("observaciones", "")
-                items_cambiaron = items_actuales != items_anteriores
-                observaciones_cambiaron = (
-                    observaciones_actuales != observaciones_anteriores
-                )
-
-                hay_cambios = items_cambiaron or observaciones_cambiaron
-
-                if hay_cambios:
-                    if clave_tiempo_real not in datos_tiempo_real:
-                        datos_tiempo_real[clave_tiempo_real] = {}
+            clave_tiempo_real = clave_temporal
+            datos_anteriores = datos_tiempo_real.get(clave_tiempo_real, {})
+            seq_guardado = datos_anteriores.get("seq", 0)
+
+            # Verificar por huella qué items cambiaron realmente
+            items_actuales = data.get("items") or {}
+            observaciones_actuales = data.get("observaciones", "")
+            huellas_actuales = huellas_items(items_actuales)
+            calculo_anterior = datos_anteriores.get("calculo_resumen") or {}
+            huellas_anteriores = calculo_anterior.get("huellas") or {}
+            items_cambiados = {
+                item_id
+                for item_id, huella_item in huellas_actuales.items()
+                if huellas_anteriores.get(item_id) != huella_item
+            }
+            items_cambiados.update(
+                item_id
+                for item_id in (*huellas_anteriores, *(datos_anteriores.get("items") or {}))
+                if item_id not in huellas_actuales
+            )
+            observaciones_cambiaron = observaciones_actuales != datos_anteriores.get(
+                "observaciones", ""
+            )
 
-                    estado_actual_tiempo_real = datos_tiempo_real[clave_tiempo_real]
+            if items_cambiados or observaciones_cambiaron:
+                # La configuración de items se carga una vez por borrador; solo se
+                # vuelve a consultar si aparece un item que no conoce
+                configuracion = calculo_anterior.get("configuracion")
+                if not configuracion or any(
+                    item_id.isdigit() and item_id not in configuracion["riesgos"]
+                    for item_id in items_cambiados
+                    if item_id in items_actuales
+                ):
+                    try:
+                        configuracion = InspeccionesController._configuracion_items_tiempo_real(
+                            establecimiento_id
+                        )
+                    except Exception:
+                        configuracion = None
+
+                parche = {}
+
+                def aplicar_cambios(estado_actual_tiempo_real):
+                    estado_actual_tiempo_real = estado_actual_tiempo_real or {}
+                    parche.clear()
+                    parche.update(
+                        construir_parche(
+                            estado_actual_tiempo_real,
+                            items_actuales,
+                            observaciones_actuales,
+                        )
+                    )
 
-                    # Reiniciar confirmacion del encargado solo cuando cambian items/puntajes del checklist
-                    if items_cambiaron and estado_actual_tiempo_real.get("confirmada_por_encargado"):
-                        estado_actual_tiempo_real["confirmada_por_encargado"] = False
-                        estado_actual_tiempo_real["confirmador_id"] = None
-                        estado_actual_tiempo_real["confirmador_nombre"] = None
-                        estado_actual_tiempo_real["confirmador_rol"] = None
-                        estado_actual_tiempo_real["fecha_confirmacion"] = None
-
-                    # Calcular resumen automáticamente basado en los items
-                    resumen_calculado = {}
-                    if items_actuales:
-                        try:
-                            puntaje_total = 0
-                            suma_porcentaje_cumplimiento = 0
-                            puntos_criticos_perdidos = 0
-                            items_evaluados = 0
-                            items_configurados = (
-                                InspeccionesController._obtener_items_activos_establecimiento(
-                                    establecimiento_id
-                                )
+                    # Resumen incremental: solo se recalcula el aporte de los items
+                    # cuya huella cambió respecto al estado vigente
+                    calculo = estado_actual_tiempo_real.get("calculo_resumen") or {}
+                    if configuracion is None:
+                        resumen_calculado = {}
+                        calculo = {}
+                    else:
+                        aportes = dict(calculo.get("aportes") or {})
+                        huellas_vigentes = calculo.get("huellas") or {}
+                        if calculo.get("configuracion") != configuracion:
+                            aportes = {}
+                            huellas_vigentes = {}
+                        for item_id in set(aportes) | set(huellas_actuales):
+                            if huellas_vigentes.get(item_id) == huellas_actuales.get(item_id):
+                                continue
+                            aporte = InspeccionesController._aporte_item_tiempo_real(
+                                configuracion["riesgos"].get(item_id),
+                                items_actuales.get(item_id),
                             )
-                            items_por_id = {
-                                item_est.id: item_base
-                                for item_est, item_base in items_configurados
-                            }
-                            total_items = len(items_configurados)
-                            puntaje_maximo_posible = sum(
-                                InspeccionesController._obtener_configuracion_calificacion(
-                                    item_base.riesgo
-                                )["puntaje_maximo"]
-                                for item_base in items_por_id.values()
+                            if aporte:
+                                aportes[item_id] = aporte
+                            else:
+                                aportes.pop(item_id, None)
+                        resumen_calculado = (
+                            InspeccionesController._resumen_desde_aportes(
+                                aportes, configuracion
                             )
+                            if items_actuales
+                            else {}
+                        )
+                        calculo = {
+                            "huellas": huellas_actuales,
+                            "aportes": aportes,
+                            "configuracion": configuracion,
+                        }
+                    estado_actual_tiempo_real["calculo_resumen"] = calculo
 
-                            for item_id_str, item_data in items_actuales.items():
-                                try:
-                                    # Evitar procesar items con ID 'undefined'
-                                    if (
-                                        item_id_str == "undefined"
-                                        or not item_id_str.isdigit()
-                                    ):
-                                        continue
-
-                                    item_id = int(item_id_str)
-                                    item_base = items_por_id.get(item_id)
-                                    if not item_base:
-                                        continue
-
-                                    if (
-                                        "rating" not in item_data
-                                        or item_data["rating"] is None
-                                    ):
-                                        continue
-
-                                    metricas_rating = (
-                                        InspeccionesController._calcular_metricas_rating(
-                                            item_base.riesgo, item_data["rating"]
-                                        )
-                                    )
-                                    if not metricas_rating:
-                                        continue
-
-                                    items_evaluados += 1
-                                    puntaje_total += metricas_rating["puntaje"]
-                                    suma_porcentaje_cumplimiento += metricas_rating[
-                                        "porcentaje_cumplimiento"
-                                    ]
-                                    puntos_criticos_perdidos += metricas_rating[
-                                        "criticos_no_conformes"
-                                    ]
-                                except (ValueError, TypeError):
-                                    continue
-
-                            porcentaje = (
-                                (suma_porcentaje_cumplimiento / items_evaluados)
-                                if items_evaluados > 0
-                                else 0
-                            )
-                            puntaje_promedio_item = (
-                                round(puntaje_total / items_evaluados, 2)
-                                if items_evaluados > 0
-                                else 0
-                            )
+                    if not parche:
+                        return estado_actual_tiempo_real
 
-                            resumen_calculado = {
-                                "puntaje_total": round(puntaje_total, 2),
-                                "puntaje_maximo_posible": round(
-                                    puntaje_maximo_posible, 2
-                                ),
-                                "puntaje_promedio_item": puntaje_promedio_item,
-                                "porcentaje_cumplimiento": round(porcentaje, 2),
-                                "puntos_criticos_perdidos": round(
-                                    puntos_criticos_perdidos, 2
-                                ),
-                                "items_calificados": items_evaluados,
-                                "items_evaluados": items_evaluados,
-                                "total_items": total_items,
-                            }
-                        except Exception as e:
-                            resumen_calculado = {}
+                    # Reiniciar confirmacion del encargado solo cuando cambian items/puntajes del checklist
+                    if parche_modifica_items(parche):
+                        reiniciar_confirmacion(estado_actual_tiempo_real)
+
+                    if resumen_calculado != estado_actual_tiempo_real.get("resumen"):
+                        parche["resumen"] = resumen_calculado
 
+                    estado_actual_tiempo_real = registrar_parche(
+                        estado_actual_tiempo_real, parche, recalculado=True
+                    )
                     estado_actual_tiempo_real.update(
                         {
                             "establecimiento_id": establecimiento_id,
                             "inspector_id": user_id,
-                            "items": items_actuales,
-                            "observaciones": observaciones_actuales,
-                            "resumen": resumen_calculado,
                             "ultima_actualizacion": safe_timestamp(),
                         }
                     )
+                    return estado_actual_tiempo_real
+
+                estado_actual_tiempo_real = datos_tiempo_real.actualizar(
+                    clave_tiempo_real, aplicar_cambios
+                )
+                seq_guardado = estado_actual_tiempo_real.get("seq", 0)
 
-                    # SOLO emitir actualización en tiempo real cuando HAY CAMBIOS
+                # Emitir solo los campos que cambiaron, con su número de secuencia
+                if parche:
                     try:
-                        room = f"establecimiento_{establecimiento_id}"
-                        socketio.emit(
-                            "inspeccion_tiempo_real",
-                            {
-                                "establecimiento_id": establecimiento_id,
-                                "inspector_id": user_id,
-                                "items": items_actuales,
-                                "observaciones": observaciones_actuales,
-                                "resumen": resumen_calculado,
-                                "confirmada_por_encargado": estado_actual_tiempo_real.get("confirmada_por_encargado", False),
-                                "confirmador_nombre": estado_actual_tiempo_real.get("confirmador_nombre"),
-                                "confirmador_rol": estado_actual_tiempo_real.get("confirmador_rol"),
-                                "firma_data": estado_actual_tiempo_real.get("firma_encargado"),
-                                "firma_temporal": bool(estado_actual_tiempo_real.get("firma_temporal")),
-                                "timestamp": safe_timestamp(),
-                            },
-                            to=room,
+                        mensaje = mensaje_parche(
+                            establecimiento_id,
+                            parche,
+                            estado_actual_tiempo_real,
+                            inspector_id=user_id,
+                            timestamp=safe_timestamp(),
                         )
-
-                        # Tiempo real: Cambios detectados y enviados por Inspector
+                        anotar_parche(
+                            establecimiento_id,
+                            mensaje,
+                            current_app.config.get("ESTADO_TIEMPO_REAL_HISTORIAL_PARCHES", 0),
+                        )
+                        room = f"establecimiento_{establecimiento_id}"
+                        socketio.emit(EVENTO_PARCHE, mensaje, to=room)
                     except Exception as e:
                         pass  # Error silenciado en producción
-                else:
-                    pass  # No hay cambios - omitiendo emisión tiempo real
+
+            huellas_borrador[clave_temporal] = {
+                "huella": huella_borrador,
+                "user_id": user_id,
+                "timestamp": timestamp_guardado,
+                "seq": seq_guardado,
+            }
 
             return jsonify(
                 {
                     "mensaje": "Datos guardados temporalmente",
-                    "timestamp": inspecciones_temporales[clave_temporal]["timestamp"],
+                    "timestamp": timestamp_guardado,
+                    "seq": seq_guardado,
                 }
             )
 
@@ -1547,15 +1750,14 @@ class InspeccionesController:
 
                 # Limpiar inspecciones_temporales
                 clave_temporal = f"establecimiento_{establecimiento_id}"
-                if clave_temporal in inspecciones_temporales:
-                    del inspecciones_temporales[clave_temporal]
+                if inspecciones_temporales.pop(clave_temporal) is not None:
                     logging.info(f"Datos temporales eliminados: {clave_temporal}")
 
                 # Limpiar datos_tiempo_real
                 clave_tiempo_real = f"establecimiento_{establecimiento_id}"
-                if clave_tiempo_real in datos_tiempo_real:
-                    del datos_tiempo_real[clave_tiempo_real]
+                if datos_tiempo_real.pop(clave_tiempo_real) is not None:
                     logging.info(f"Datos tiempo real eliminados: {clave_tiempo_real}")
+                huellas_borrador.descartar(clave_temporal)
 
             return jsonify({"mensaje": "Datos temporales eliminados"})
         except Exception as e:
@@ -1918,8 +2120,8 @@ class InspeccionesController:
                     
                     # Contar inspecciones completadas en esta semana para el establecimiento
                     inspecciones_semana = Inspeccion.query.filter(
-                        func.date(Inspeccion.fecha) >= inicio_semana,
-                        func.date(Inspeccion.fecha) <= fin_semana,
+                        Inspeccion.fecha >= inicio_semana,
+                        Inspeccion.fecha <= fin_semana,
                         Inspeccion.establecimiento_id == establecimiento_id,
                         Inspeccion.estado == 'completada'
                     ).count()
@@ -2220,7 +2422,20 @@ class InspeccionesController:
                 item_est.id: item_base for item_est, item_base in items_establecimiento
             }
 
-            # Guardar o actualizar detalles de items
+            # Las emisiones se acumulan y salen juntas después del commit
+            lote = LoteEmisiones()
+            room_inspeccion = f"inspeccion_{inspeccion.id}"
+            actualizado_por = session.get("user_role", "Inspector")
+            lote.agregar_item(
+                room_inspeccion,
+                None,
+                inspeccion_id=inspeccion.id,
+                actualizado_por=actualizado_por,
+                timestamp=safe_timestamp(),
+            )
+
+            # Guardar o actualizar detalles de items (se escriben en bloque al final)
+            detalles_por_item = {}
             for item_id_raw, item_data in items_data.items():
                 rating = item_data.get("rating")
                 observacion_item = item_data.get("observacion", "")
@@ -2255,63 +2470,33 @@ class InspeccionesController:
                         )
 
                     items_procesados += 1
-                    # Buscar detalle existente
-                    detalle = InspeccionDetalle.query.filter_by(
-                        inspeccion_id=inspeccion.id, item_establecimiento_id=item_id
-                    ).first()
-
-                    if not detalle:
-                        detalle = InspeccionDetalle(
-                            inspeccion_id=inspeccion.id, item_establecimiento_id=item_id
-                        )
-                        db.session.add(detalle)
-
-                    detalle.rating = rating_normalizado
-                    detalle.score = float(rating_normalizado)
-                    detalle.observacion_item = observacion_item
-
-                    # Emitir actualización en tiempo real para que el encargado vea los cambios
-                    try:
-                        room = f"inspeccion_{inspeccion.id}"
-                        socketio.emit(
-                            "item_actualizado",
-                            {
-                                "inspeccion_id": inspeccion.id,
-                                "item_id": item_id,
-                                "rating": rating_normalizado,
-                                "riesgo": item_base.riesgo,
-                                "puntaje_maximo": InspeccionesController._obtener_configuracion_calificacion(
-                                    item_base.riesgo
-                                )["puntaje_maximo"],
-                                "observacion": observacion_item,
-                                "actualizado_por": session.get(
-                                    "user_role", "Inspector"
-                                ),
-                                "timestamp": safe_timestamp(),
-                            },
-                            to=room,
-                        )
-                    except Exception as e:
-                        pass  # Error silenciado
-
-            pass  # Items procesados exitosamente
+                    detalles_por_item[item_id] = {
+                        "rating": rating_normalizado,
+                        "score": float(rating_normalizado),
+                        "observacion_item": observacion_item,
+                    }
 
-            # Emitir actualización de observaciones generales si cambiaron
-            if observaciones:
-                try:
-                    room = f"inspeccion_{inspeccion.id}"
-                    socketio.emit(
-                        "observaciones_actualizadas",
+                    # Anotar actualización en tiempo real para que el encargado vea los cambios
+                    lote.agregar_item(
+                        room_inspeccion,
                         {
-                            "inspeccion_id": inspeccion.id,
-                            "observaciones": observaciones,
-                            "actualizado_por": session.get("user_role", "Inspector"),
-                            "timestamp": safe_timestamp(),
+                            "item_id": item_id,
+                            "rating": rating_normalizado,
+                            "riesgo": item_base.riesgo,
+                            "puntaje_maximo": InspeccionesController._obtener_configuracion_calificacion(
+                                item_base.riesgo
+                            )["puntaje_maximo"],
+                            "observacion": observacion_item,
                         },
-                        to=room,
                     )
-                except Exception as e:
-                    pass  # Error silenciado
+
+            InspeccionesController._guardar_detalles_inspeccion(
+                inspeccion.id, detalles_por_item
+            )
+
+            # Las observaciones generales viajan en el mismo items_actualizados
+            if observaciones:
+                lote.agregar_item(room_inspeccion, None, observaciones=observaciones)
 
             # Procesar evidencias si las hay
             evidencias_guardadas = []
@@ -2375,8 +2560,8 @@ class InspeccionesController:
                     fin_semana = inicio_semana + timedelta(days=6)
                     
                     inspecciones_semana = Inspeccion.query.filter(
-                        func.date(Inspeccion.fecha) >= inicio_semana.date(),
-                        func.date(Inspeccion.fecha) <= fin_semana.date(),
+                        Inspeccion.fecha >= inicio_semana.date(),
+                        Inspeccion.fecha <= fin_semana.date(),
                         Inspeccion.establecimiento_id == establecimiento_id,
                         Inspeccion.estado == 'completada'
                     ).count()
@@ -2389,7 +2574,7 @@ class InspeccionesController:
                     
                     # Emitir evento para actualización en tiempo real
                     if socketio:
-                        socketio.emit('plan_semanal_actualizado', {
+                        lote.emitir('plan_semanal_actualizado', {
                             'tipo': 'inspeccion_completada',
                             'establecimiento_id': establecimiento_id,
                             'establecimiento': establecimiento_nombre,
@@ -2403,22 +2588,17 @@ class InspeccionesController:
                     pass
 
                 # Emitir cambio de estado cuando se completa
-                try:
-                    room = f"inspeccion_{inspeccion.id}"
-                    socketio.emit(
-                        "estado_inspeccion_cambiado",
-                        {
-                            "inspeccion_id": inspeccion.id,
-                            "estado": "completada",
-                            "puntajes": puntajes,
-                            "cambiado_por": session.get("user_role", "Inspector"),
-                            "timestamp": safe_timestamp(),
-                        },
-                        to=room,
-                    )
-                except Exception as e:
-                    import logging
-                    logging.warning(f"No se pudo emitir cambio de estado: {str(e)}")
+                lote.emitir(
+                    "estado_inspeccion_cambiado",
+                    {
+                        "inspeccion_id": inspeccion.id,
+                        "estado": "completada",
+                        "puntajes": puntajes,
+                        "cambiado_por": actualizado_por,
+                        "timestamp": safe_timestamp(),
+                    },
+                    to=room_inspeccion,
+                )
             db.session.commit()
             logging.info(f"DEBUG - Inspección guardada con estado: {inspeccion.estado}")
 
@@ -2438,21 +2618,23 @@ class InspeccionesController:
                 logging.error(f"Error limpiando datos temporales: {str(e)}")
 
             # Emitir señal de limpieza para todos los usuarios conectados al establecimiento
+            lote.emitir(
+                "inspeccion_guardada_resetear",
+                {
+                    "establecimiento_id": establecimiento_id,
+                    "inspeccion_id": inspeccion.id,
+                    "accion": accion,
+                    "timestamp": safe_timestamp(),
+                },
+                to=f"establecimiento_{establecimiento_id}",
+            )
+
+            # Enviar todo lo acumulado ahora que el commit terminó
             try:
-                room = f"establecimiento_{establecimiento_id}"
-                socketio.emit(
-                    "inspeccion_guardada_resetear",
-                    {
-                        "establecimiento_id": establecimiento_id,
-                        "inspeccion_id": inspeccion.id,
-                        "accion": accion,
-                        "timestamp": safe_timestamp(),
-                    },
-                    to=room,
-                )
+                lote.enviar()
             except Exception as e:
                 import logging
-                logging.warning(f"No se pudo emitir señal de reseteo: {str(e)}")
+                logging.warning(f"No se pudieron emitir actualizaciones de la inspección: {str(e)}")
 
             resultado = InspeccionesController._construir_resultado_guardado(
                 inspeccion,
@@ -2711,6 +2893,35 @@ class InspeccionesController:
                 {"error": f"Error al obtener firmantes habilitados: {str(e)}"}
             ), 500
 
+    @staticmethod
+    def _fila_informe(fila):
+        hora_inicio = fila.hora_inicio or fila.created_at
+        return {
+            "id": fila.id,
+            "fecha": fila.fecha.isoformat(),
+            "hora_inicio": hora_inicio.strftime("%H:%M") if hora_inicio else None,
+            "establecimiento": fila.establecimiento_nombre,
+            "inspector": (
+                f"{fila.inspector_nombre} {fila.inspector_apellido or ''}".strip()
+                if fila.inspector_nombre
+                else None
+            ),
+            "encargado": (
+                f"{fila.encargado_nombre} {fila.encargado_apellido or ''}".strip()
+                if fila.encargado_nombre
+                else None
+            ),
+            "estado": fila.estado,
+            "puntaje_total": (
+                float(fila.puntaje_total) if fila.puntaje_total else None
+            ),
+            "porcentaje_cumplimiento": (
+                float(fila.porcentaje_cumplimiento)
+                if fila.porcentaje_cumplimiento
+                else None
+            ),
+        }
+
     @staticmethod
     def filtrar_inspecciones(
         fecha_inicio=None,
@@ -2719,10 +2930,44 @@ class InspeccionesController:
         inspector_id=None,
         encargado_id=None,
         estado=None,
+        page=None,
+        per_page=None,
+        stream=False,
     ):
-        """Filtrar inspecciones según criterios del pedido.txt"""
+        """Filtrar inspecciones según criterios del pedido.txt
+
+        Sin ``page``/``per_page`` devuelve la lista completa; con ellos, una
+        página con totales. ``stream`` envía la lista como JSON por partes,
+        leyendo las filas por lotes, para rangos de fechas grandes.
+        """
         try:
-            query = Inspeccion.query
+            from sqlalchemy.orm import aliased
+
+            UsuarioInspector = aliased(Usuario)
+            UsuarioEncargado = aliased(Usuario)
+
+            # Solo las columnas que se devuelven, con joins en lugar de relaciones perezosas
+            query = (
+                db.session.query(
+                    Inspeccion.id,
+                    Inspeccion.fecha,
+                    Inspeccion.hora_inicio,
+                    Inspeccion.created_at,
+                    Inspeccion.estado,
+                    Inspeccion.puntaje_total,
+                    Inspeccion.porcentaje_cumplimiento,
+                    Establecimiento.nombre.label("establecimiento_nombre"),
+                    UsuarioInspector.nombre.label("inspector_nombre"),
+                    UsuarioInspector.apellido.label("inspector_apellido"),
+                    UsuarioEncargado.nombre.label("encargado_nombre"),
+                    UsuarioEncargado.apellido.label("encargado_apellido"),
+                )
+                .join(
+                    Establecimiento, Inspeccion.establecimiento_id == Establecimiento.id
+                )
+                .outerjoin(UsuarioInspector, Inspeccion.inspector_id == UsuarioInspector.id)
+                .outerjoin(UsuarioEncargado, Inspeccion.encargado_id == UsuarioEncargado.id)
+            )
 
             # Aplicar filtros
             if fecha_inicio:
@@ -2752,41 +2997,47 @@ class InspeccionesController:
                 query = query.filter(Inspeccion.encargado_id == user_id)
             # Admin puede ver todas
 
-            inspecciones = query.order_by(Inspeccion.fecha.desc()).all()
+            query = query.order_by(Inspeccion.fecha.desc(), Inspeccion.id.desc())
 
-            data = []
-            for inspeccion in inspecciones:
-                data.append(
+            if page or per_page:
+                paginadas = query.paginate(
+                    page=page or 1,
+                    per_page=per_page or InspeccionesController.BUSQUEDA_LIMITE,
+                    max_per_page=InspeccionesController.BUSQUEDA_LIMITE_MAXIMO,
+                    error_out=False,
+                )
+                return jsonify(
                     {
-                        "id": inspeccion.id,
-                        "fecha": inspeccion.fecha.isoformat(),
-                        "hora_inicio": (
-                            inspeccion.hora_inicio.strftime("%H:%M")
-                            if inspeccion.hora_inicio
-                            else inspeccion.created_at.strftime("%H:%M")
-                        ),
-                        "establecimiento": inspeccion.establecimiento.nombre,
-                        "inspector": f"{inspeccion.inspector.nombre} {inspeccion.inspector.apellido or ''}".strip(),
-                        "encargado": (
-                            f"{inspeccion.encargado.nombre} {inspeccion.encargado.apellido or ''}".strip()
-                            if inspeccion.encargado
-                            else None
-                        ),
-                        "estado": inspeccion.estado,
-                        "puntaje_total": (
-                            float(inspeccion.puntaje_total)
-                            if inspeccion.puntaje_total
-                            else None
-                        ),
-                        "porcentaje_cumplimiento": (
-                            float(inspeccion.porcentaje_cumplimiento)
-                            if inspeccion.porcentaje_cumplimiento
-                            else None
-                        ),
+                        "inspecciones": [
+                            InspeccionesController._fila_informe(fila)
+                            for fila in paginadas.items
+                        ],
+                        "total": paginadas.total,
+                        "pages": paginadas.pages,
+                        "current_page": paginadas.page,
+                        "has_next": paginadas.has_next,
+                        "has_prev": paginadas.has_prev,
                     }
                 )
 
-            return jsonify(data)
+            if stream:
+                def generar():
+                    yield "["
+                    separador = ""
+                    for fila in query.yield_per(500):
+                        yield separador + json.dumps(
+                            InspeccionesController._fila_informe(fila)
+                        )
+                        separador = ","
+                    yield "]"
+
+                return current_app.response_class(
+                    stream_with_context(generar()), mimetype="application/json"
+                )
+
+            return jsonify(
+                [InspeccionesController._fila_informe(fila) for fila in query.all()]
+            )
 
         except Exception as e:
             return jsonify({"error": f"Error al filtrar inspecciones: {str(e)}"}), 500
@@ -3260,7 +3511,7 @@ class InspeccionesController:
                     }
 
                 item_data = {
-                    "configuracion_calificacion": InspeccionesController._obtener_configuracion_calificacion(
+                    "configuracion_calificacion": configuracion_calificacion(
                         item_base.riesgo
                     ),
                     "id": item_base.id,
@@ -3278,7 +3529,7 @@ class InspeccionesController:
                             item_base.riesgo
                         )["opciones_validas"]
                     ),
-                    "etiquetas_calificacion": InspeccionesController._obtener_configuracion_calificacion(
+                    "etiquetas_calificacion": configuracion_calificacion(
                         item_base.riesgo
                     )["etiquetas_calificacion"],
                     "detalle": (
@@ -3451,6 +3702,50 @@ class InspeccionesController:
             else:
                 return None, error_msg
 
+    @staticmethod
+    def _codificar_cursor_busqueda(fila):
+        """Cursor opaco con la clave de orden (fecha, created_at, id) de la última fila."""
+        clave = [
+            fila.fecha.isoformat(),
+            fila.created_at.isoformat() if fila.created_at else None,
+            fila.id,
+        ]
+        return base64.urlsafe_b64encode(json.dumps(clave).encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def _decodificar_cursor_busqueda(cursor):
+        if not cursor:
+            return None
+        fecha, created_at, inspeccion_id = json.loads(
+            base64.urlsafe_b64decode(cursor.encode("ascii"))
+        )
+        return (
+            date.fromisoformat(fecha),
+            datetime.fromisoformat(created_at) if created_at else None,
+            int(inspeccion_id),
+        )
+
+    @staticmethod
+    def _condicion_despues_de_cursor(fecha, created_at, inspeccion_id):
+        """Filas posteriores al cursor en orden (fecha, created_at, id) descendente.
+
+        En orden descendente MySQL y SQLite dejan los ``created_at`` nulos al final.
+        """
+        if created_at is None:
+            misma_fecha = and_(
+                Inspeccion.created_at.is_(None), Inspeccion.id < inspeccion_id
+            )
+        else:
+            misma_fecha = or_(
+                Inspeccion.created_at < created_at,
+                Inspeccion.created_at.is_(None),
+                and_(Inspeccion.created_at == created_at, Inspeccion.id < inspeccion_id),
+            )
+        return or_(
+            Inspeccion.fecha < fecha,
+            and_(Inspeccion.fecha == fecha, misma_fecha),
+        )
+
     @staticmethod
     def buscar_inspecciones():
         """Buscar inspecciones con filtros incluyendo encargado"""
@@ -3470,31 +3765,24 @@ class InspeccionesController:
             fecha_hasta = request.args.get("fecha_hasta")
             estado = request.args.get("estado")
 
-            # Construir query base con JOIN para obtener información del encargado
-            query = (
-                db.session.query(
-                    Inspeccion.id,
-                    Inspeccion.fecha,
-                    Inspeccion.hora_fin,  # Agregar hora_fin
-                    Inspeccion.estado,
-                    Inspeccion.puntaje_total,
-                    Inspeccion.puntaje_maximo_posible,
-                    Inspeccion.porcentaje_cumplimiento,
-                    Inspeccion.observaciones,
-                    Establecimiento.nombre.label("establecimiento_nombre"),
-                    Usuario.nombre.label("inspector_nombre"),
-                    func.coalesce(UsuarioEncargado.nombre, "Sin encargado").label(
-                        "encargado_nombre"
-                    ),
-                )
-                .join(
-                    Establecimiento, Inspeccion.establecimiento_id == Establecimiento.id
-                )
-                .outerjoin(Usuario, Inspeccion.inspector_id == Usuario.id)
-                .outerjoin(
-                    UsuarioEncargado, Inspeccion.encargado_id == UsuarioEncargado.id
-                )
+            # Paginación por cursor con tope de tamaño de página
+            limite = (
+                request.args.get("limite", type=int)
+                or InspeccionesController.BUSQUEDA_LIMITE
             )
+            limite = min(max(limite, 1), InspeccionesController.BUSQUEDA_LIMITE_MAXIMO)
+            try:
+                cursor = InspeccionesController._decodificar_cursor_busqueda(
+                    request.args.get("cursor")
+                )
+            except (TypeError, ValueError):
+                return jsonify({"error": "Cursor de paginación inválido"}), 400
+
+            sin_resultados = {"inspecciones": [], "siguiente_cursor": None, "limite": limite}
+
+            # Los filtros solo tocan columnas de inspecciones; los joins se hacen
+            # después, sobre la página ya recortada
+            query = db.session.query(Inspeccion.id)
 
             # Filtros de permisos según rol
             if user_role == "Encargado":
@@ -3516,7 +3804,7 @@ class InspeccionesController:
                 ]
 
                 if not establecimientos_permitidos:
-                    return jsonify([])
+                    return jsonify(sin_resultados)
 
                 query = query.filter(
                     Inspeccion.establecimiento_id.in_(establecimientos_permitidos)
@@ -3541,7 +3829,7 @@ class InspeccionesController:
                 ]
 
                 if not establecimientos_permitidos:
-                    return jsonify([])
+                    return jsonify(sin_resultados)
 
                 query = query.filter(
                     Inspeccion.establecimiento_id.in_(establecimientos_permitidos)
@@ -3565,22 +3853,89 @@ class InspeccionesController:
             if estado:
                 query = query.filter(Inspeccion.estado == estado)
 
-            # Ordenar por fecha descendente y luego por created_at descendente
-            query = query.order_by(Inspeccion.fecha.desc(), Inspeccion.created_at.desc())
+            if cursor:
+                query = query.filter(
+                    InspeccionesController._condicion_despues_de_cursor(*cursor)
+                )
+
+            # Página por keyset sobre (fecha, created_at, id); un registro extra
+            # indica si hay página siguiente
+            pagina = (
+                query.with_entities(
+                    Inspeccion.id.label("id"),
+                    Inspeccion.fecha.label("fecha"),
+                    Inspeccion.created_at.label("created_at"),
+                )
+                .order_by(
+                    Inspeccion.fecha.desc(),
+                    Inspeccion.created_at.desc(),
+                    Inspeccion.id.desc(),
+                )
+                .limit(limite + 1)
+                .subquery("pagina")
+            )
 
-            # Ejecutar query
-            inspecciones = query.all()
+            # items_evaluados en un solo GROUP BY acotado a la página
+            conteo_detalles = (
+                db.session.query(
+                    InspeccionDetalle.inspeccion_id.label("inspeccion_id"),
+                    func.count(InspeccionDetalle.id).label("items_evaluados"),
+                )
+                .join(pagina, pagina.c.id == InspeccionDetalle.inspeccion_id)
+                .group_by(InspeccionDetalle.inspeccion_id)
+                .subquery("conteo_detalles")
+            )
+
+            inspecciones = (
+                db.session.query(
+                    Inspeccion.id,
+                    Inspeccion.fecha,
+                    Inspeccion.created_at,
+                    Inspeccion.hora_fin,  # Agregar hora_fin
+                    Inspeccion.estado,
+                    Inspeccion.puntaje_total,
+                    Inspeccion.puntaje_maximo_posible,
+                    Inspeccion.porcentaje_cumplimiento,
+                    Inspeccion.observaciones,
+                    Establecimiento.nombre.label("establecimiento_nombre"),
+                    Usuario.nombre.label("inspector_nombre"),
+                    func.coalesce(UsuarioEncargado.nombre, "Sin encargado").label(
+                        "encargado_nombre"
+                    ),
+                    func.coalesce(conteo_detalles.c.items_evaluados, 0).label(
+                        "items_evaluados"
+                    ),
+                )
+                .select_from(pagina)
+                .join(Inspeccion, Inspeccion.id == pagina.c.id)
+                .join(
+                    Establecimiento, Inspeccion.establecimiento_id == Establecimiento.id
+                )
+                .outerjoin(Usuario, Inspeccion.inspector_id == Usuario.id)
+                .outerjoin(
+                    UsuarioEncargado, Inspeccion.encargado_id == UsuarioEncargado.id
+                )
+                .outerjoin(
+                    conteo_detalles, conteo_detalles.c.inspeccion_id == Inspeccion.id
+                )
+                .order_by(
+                    pagina.c.fecha.desc(),
+                    pagina.c.created_at.desc(),
+                    pagina.c.id.desc(),
+                )
+                .all()
+            )
+
+            siguiente_cursor = None
+            if len(inspecciones) > limite:
+                inspecciones = inspecciones[:limite]
+                siguiente_cursor = InspeccionesController._codificar_cursor_busqueda(
+                    inspecciones[-1]
+                )
 
             # Convertir a diccionario
             resultado = []
             for insp in inspecciones:
-                # Contar items evaluados
-                items_evaluados = (
-                    db.session.query(InspeccionDetalle)
-                    .filter_by(inspeccion_id=insp.id)
-                    .count()
-                )
-
                 # Combinar fecha y hora_fin para mostrar fecha completa
                 fecha_completa = None
                 if insp.fecha and insp.hora_fin:
@@ -3602,11 +3957,17 @@ class InspeccionesController:
                         "establecimiento_nombre": insp.establecimiento_nombre,
                         "inspector_nombre": insp.inspector_nombre,
                         "encargado_nombre": insp.encargado_nombre,
-                        "items_evaluados": items_evaluados,
+                        "items_evaluados": insp.items_evaluados,
                     }
                 )
 
-            return jsonify(resultado)
+            return jsonify(
+                {
+                    "inspecciones": resultado,
+                    "siguiente_cursor": siguiente_cursor,
+                    "limite": limite,
+                }
+            )
 
         except Exception as e:
             return jsonify({"error": f"Error en búsqueda: {str(e)}"}), 500
@@ -4002,23 +4363,20 @@ class InspeccionesController:
             if establecimiento_id:
                 # Limpiar datos específicos del establecimiento (formato correcto usado en guardar_inspeccion_parcial)
                 clave_establecimiento = f"establecimiento_{establecimiento_id}"
-                if clave_establecimiento in inspecciones_temporales:
-                    del inspecciones_temporales[clave_establecimiento]
+                inspecciones_temporales.pop(clave_establecimiento)
 
                 # Limpiar datos de tiempo real del establecimiento
                 clave_tiempo_real = f"establecimiento_{establecimiento_id}"
-                if clave_tiempo_real in datos_tiempo_real:
-                    del datos_tiempo_real[clave_tiempo_real]
+                datos_tiempo_real.pop(clave_tiempo_real)
+                huellas_borrador.descartar(clave_establecimiento)
 
                 # Limpiar datos específicos del establecimiento y usuario (formato antiguo)
                 clave_especifica = f"user_{user_id}_{establecimiento_id}"
-                if clave_especifica in inspecciones_temporales:
-                    del inspecciones_temporales[clave_especifica]
+                inspecciones_temporales.pop(clave_especifica)
 
             # Limpiar datos generales del usuario (formato antiguo)
             clave_usuario = f"user_{user_id}"
-            if clave_usuario in inspecciones_temporales:
-                del inspecciones_temporales[clave_usuario]
+            inspecciones_temporales.pop(clave_usuario)
 
         except Exception as e:
             import logging
@@ -4136,27 +4494,28 @@ class InspeccionesController:
                     }
                 )
 
-            inspecciones_periodo = (
-                db.session.query(Inspeccion)
-                .filter(
-                    func.date(Inspeccion.fecha) >= inicio_periodo,
-                    func.date(Inspeccion.fecha) <= fin_periodo,
-                    Inspeccion.establecimiento_id.in_(establecimientos_permitidos),
-                    Inspeccion.estado == "completada",
+            # Semana o mes ya terminado: respuesta guardada (ver cache_periodos)
+            periodo_cerrado = fin_periodo < hoy
+            if periodo_cerrado:
+                clave_snapshot = clave_periodo(
+                    "plan_semanal",
+                    periodo_tipo,
+                    inicio_periodo,
+                    mes_offset if periodo_tipo == "mensual" else semana_offset,
+                    sorted(establecimientos_permitidos),
                 )
-                .all()
-            )
-
-            estadisticas_por_establecimiento = {}
-            establecimientos = (
-                db.session.query(Establecimiento)
-                .filter(Establecimiento.id.in_(establecimientos_permitidos))
-                .all()
-            )
+                version_snapshot = versiones(VERSION_INSPECCIONES)
+                contenido = cache_periodos.obtener(clave_snapshot, version_snapshot)
+                if contenido is not None:
+                    return current_app.response_class(
+                        contenido, mimetype="application/json"
+                    )
 
             meta_default = InspeccionesController._obtener_meta_semanal_default()
             semanas_del_periodo = []
             planes_por_semana = {}
+            planes_semana = {}
+            planes_creados = 0
 
             if periodo_tipo == "mensual":
                 semanas_del_periodo = InspeccionesController._obtener_semanas_en_periodo(
@@ -4174,23 +4533,45 @@ class InspeccionesController:
                         (plan.establecimiento_id, plan.semana, plan.ano): plan
                         for plan in planes
                     }
+            else:
+                planes_semana, planes_creados = InspeccionesController.obtener_o_crear_planes_semanales(
+                    establecimientos_permitidos,
+                    inicio_periodo.isocalendar()[1],
+                    inicio_periodo.year,
+                )
 
-            cambios_plan_semanal = False
-
-            # Bulk query: cantidad de items calificados por inspección (evita N+1)
-            ids_periodo = [insp.id for insp in inspecciones_periodo]
-            items_por_inspeccion = {}
-            if ids_periodo:
-                conteos = (
-                    db.session.query(
-                        InspeccionDetalle.inspeccion_id,
-                        func.count(InspeccionDetalle.id)
-                    )
-                    .filter(InspeccionDetalle.inspeccion_id.in_(ids_periodo))
-                    .group_by(InspeccionDetalle.inspeccion_id)
-                    .all()
+            # Resumen ya agregado por (establecimiento, semana, mes); ver resumen_semanal
+            filtro_periodo = (
+                ResumenSemanalEstablecimiento.inicio_mes == inicio_periodo
+                if periodo_tipo == "mensual"
+                else ResumenSemanalEstablecimiento.inicio_semana == inicio_periodo
+            )
+            resumenes_por_establecimiento = {}
+            for resumen in (
+                ResumenSemanalEstablecimiento.query.filter(
+                    ResumenSemanalEstablecimiento.establecimiento_id.in_(
+                        establecimientos_permitidos
+                    ),
+                    filtro_periodo,
+                )
+                .order_by(
+                    ResumenSemanalEstablecimiento.inicio_semana,
+                    ResumenSemanalEstablecimiento.inicio_mes,
                 )
-                items_por_inspeccion = {insp_id: cnt for insp_id, cnt in conteos}
+                .all()
+            ):
+                resumenes_por_establecimiento.setdefault(
+                    resumen.establecimiento_id, []
+                ).append(resumen)
+
+            estadisticas_por_establecimiento = {}
+            establecimientos = (
+                db.session.query(Establecimiento)
+                .filter(Establecimiento.id.in_(establecimientos_permitidos))
+                .all()
+            )
+
+            cambios_plan_semanal = False
 
             for establecimiento in establecimientos:
                 nombre_sanitizado = (
@@ -4199,67 +4580,36 @@ class InspeccionesController:
                     else "Sin nombre"
                 )
 
-                inspecciones_establecimiento = [
-                    insp for insp in inspecciones_periodo if insp.establecimiento_id == establecimiento.id
-                ]
-                total_inspecciones = len(inspecciones_establecimiento)
-
-                calificaciones = [
-                    insp.porcentaje_cumplimiento
-                    for insp in inspecciones_establecimiento
-                    if insp.porcentaje_cumplimiento
-                ]
+                resumenes = resumenes_por_establecimiento.get(establecimiento.id, [])
+                total_inspecciones = sum(
+                    resumen.inspecciones_completadas for resumen in resumenes
+                )
 
+                con_cumplimiento = sum(
+                    resumen.inspecciones_con_cumplimiento for resumen in resumenes
+                )
                 promedio_calificacion = (
-                    sum(calificaciones) / len(calificaciones) if calificaciones else 0
+                    sum(resumen.suma_cumplimiento for resumen in resumenes)
+                    / con_cumplimiento
+                    if con_cumplimiento
+                    else 0
                 )
 
                 # Detalle de cada inspección realizada en el periodo (para explicar "1/5", "20%", etc. en el dashboard)
                 inspecciones_realizadas_detalle = [
-                    {
-                        "id": insp.id,
-                        "fecha": insp.fecha.isoformat() if insp.fecha else None,
-                        "hora_inicio": (
-                            insp.hora_inicio.strftime("%H:%M")
-                            if insp.hora_inicio
-                            else None
-                        ),
-                        "puntaje_total": (
-                            round(insp.puntaje_total)
-                            if insp.puntaje_total is not None
-                            else None
-                        ),
-                        "calificacion": (
-                            InspeccionesController._calcular_calificacion_global(
-                                insp.puntaje_total,
-                                items_por_inspeccion.get(insp.id, 0),
-                                insp.puntos_criticos_perdidos or 0,
-                            )
-                            if insp.puntaje_total is not None
-                            else None
-                        ),
-                    }
-                    for insp in sorted(
-                        inspecciones_establecimiento, key=lambda i: (i.fecha, i.created_at)
-                    )
+                    detalle
+                    for resumen in resumenes
+                    for detalle in (resumen.inspecciones or [])
                 ]
 
-                # Calificación de la inspección más reciente del establecimiento
-                insp_reciente = max(
-                    inspecciones_establecimiento,
-                    key=lambda i: (i.fecha, i.created_at),
-                    default=None
+                # Calificación de la inspección más reciente: está en el último fragmento
+                resumen_reciente = resumenes[-1] if resumenes else None
+                calificacion_reciente = (
+                    resumen_reciente.calificacion_reciente if resumen_reciente else None
+                )
+                puntaje_reciente = (
+                    resumen_reciente.puntaje_reciente if resumen_reciente else None
                 )
-                if insp_reciente and insp_reciente.puntaje_total is not None:
-                    items_calc = items_por_inspeccion.get(insp_reciente.id, 0)
-                    criticos_fallados = insp_reciente.puntos_criticos_perdidos or 0
-                    calificacion_reciente = InspeccionesController._calcular_calificacion_global(
-                        insp_reciente.puntaje_total, items_calc, criticos_fallados
-                    )
-                    puntaje_reciente = round(insp_reciente.puntaje_total)
-                else:
-                    calificacion_reciente = None
-                    puntaje_reciente = None
 
                 if periodo_tipo == "mensual":
                     meta_periodo = 0
@@ -4274,11 +4624,7 @@ class InspeccionesController:
                         else 0
                     )
                 else:
-                    semana_consultada = inicio_periodo.isocalendar()[1]
-                    ano_consultado = inicio_periodo.year
-                    plan_semanal = InspeccionesController.obtener_o_crear_plan_semanal(
-                        establecimiento.id, semana_consultada, ano_consultado
-                    )
+                    plan_semanal = planes_semana[establecimiento.id]
                     meta_periodo = int(plan_semanal.evaluaciones_meta)
                     if plan_semanal.evaluaciones_realizadas != total_inspecciones:
                         plan_semanal.evaluaciones_realizadas = total_inspecciones
@@ -4304,7 +4650,9 @@ class InspeccionesController:
                     "promedio_calificacion": int(promedio_calificacion),
                     "calificacion_reciente": calificacion_reciente,
                     "puntaje_reciente": puntaje_reciente,
-                    "inspeccion_reciente_id": insp_reciente.id if insp_reciente else None,
+                    "inspeccion_reciente_id": (
+                        resumen_reciente.inspeccion_reciente_id if resumen_reciente else None
+                    ),
                     "inspecciones_realizadas_detalle": inspecciones_realizadas_detalle,
                     "estado": (
                         "completo"
@@ -4314,7 +4662,8 @@ class InspeccionesController:
                     "dias_restantes": dias_restantes,
                 }
 
-            if cambios_plan_semanal:
+            # En la vista semanal confirma también los planes que se hayan creado
+            if cambios_plan_semanal or planes_creados:
                 db.session.commit()
 
             total_inspecciones_general = sum(
@@ -4383,7 +4732,22 @@ class InspeccionesController:
                     "es_actual": semana_offset == 0,
                 }
 
-            return jsonify(resultado)
+            respuesta = jsonify(resultado)
+            # Solo es definitivo si ya no quedan inspecciones por completar
+            if periodo_cerrado and not (
+                db.session.query(Inspeccion.id)
+                .filter(
+                    Inspeccion.establecimiento_id.in_(establecimientos_permitidos),
+                    Inspeccion.fecha >= inicio_periodo,
+                    Inspeccion.fecha <= fin_periodo,
+                    Inspeccion.estado != "completada",
+                )
+                .first()
+            ):
+                cache_periodos.guardar(
+                    clave_snapshot, version_snapshot, respuesta.get_data()
+                )
+            return respuesta
 
         except Exception as e:
             logging.exception("Error obteniendo plan del dashboard: %s", str(e))
@@ -4585,31 +4949,28 @@ class InspeccionesController:
         - Semanas pasadas: mantienen su meta original (historial protegido)
         - Semana actual: puede ser actualizada cuando cambia la configuración global
         - Semanas futuras: usan la meta actual por defecto
+        No hace commit: el plan creado se confirma con la transacción del llamador.
         """
-        plan = PlanSemanal.query.filter_by(
-            establecimiento_id=establecimiento_id,
-            semana=semana,
-            ano=ano
-        ).first()
-        
-        if not plan:
-            # Obtener meta por defecto ACTUAL (solo para nuevos planes)
-            config_meta = ConfiguracionEvaluacion.query.filter_by(
-                clave="meta_semanal_default"
-            ).first()
-            meta_default = int(config_meta.valor) if config_meta else 3
-            
-            plan = PlanSemanal(
-                establecimiento_id=establecimiento_id,
-                semana=semana,
-                ano=ano,
-                evaluaciones_meta=meta_default,  # Meta congelada para este plan
-                evaluaciones_realizadas=0
-            )
-            db.session.add(plan)
-            db.session.commit()
-        
-        return plan
+        clave = (int(establecimiento_id), int(semana), int(ano))
+        planes, _ = obtener_o_crear_planes([clave])
+        return planes[clave]
+
+    @staticmethod
+    def obtener_o_crear_planes_semanales(establecimiento_ids, semana, ano):
+        """
+        Versión en bloque de obtener_o_crear_plan_semanal:
+        ({establecimiento_id: plan}, planes creados).
+        Una consulta para los existentes y un INSERT que ignora duplicados para los
+        que faltan (ver app/services/planes_semanales.py). No hace commit: el
+        llamador confirma solo si se creó alguno.
+        """
+        planes, creados = obtener_o_crear_planes(
+            (establecimiento_id, semana, ano) for establecimiento_id in establecimiento_ids
+        )
+        return (
+            {establecimiento_id: plan for (establecimiento_id, _, _), plan in planes.items()},
+            creados,
+        )
 
     @staticmethod
     def actualizar_meta_semanal():
@@ -4767,11 +5128,10 @@ class InspeccionesController:
             # Obtener estado de tiempo real del establecimiento
             clave_tiempo_real = f"establecimiento_{establecimiento_id}"
             
-            if clave_tiempo_real not in datos_tiempo_real:
+            estado = datos_tiempo_real.get(clave_tiempo_real)
+            if estado is None:
                 return jsonify({"error": "No hay inspección activa para este establecimiento"}), 404
             
-            estado = datos_tiempo_real[clave_tiempo_real]
-            
             # Verificar si ya fue confirmada
             if estado.get("confirmada_por_encargado"):
                 confirmador = estado.get("confirmador_nombre", "Otro encargado")
@@ -4821,16 +5181,42 @@ class InspeccionesController:
                         "encargado_nombre": nombre_confirmador,
                     }
 
-            # Marcar como confirmada
-            estado["confirmada_por_encargado"] = True
-            estado["confirmador_id"] = confirmador_id
-            estado["confirmador_nombre"] = nombre_confirmador
-            estado["confirmador_rol"] = confirmador_rol
-            estado["firma_encargado_id"] = firma_id
-            estado["firma_encargado"] = firma_encargado_data
-            estado["firma_temporal"] = firma_temporal
-            estado["fecha_confirmacion"] = safe_timestamp()
-            
+            # Marcar como confirmada de forma atómica: otro worker pudo confirmar mientras tanto
+            confirmacion = {}
+
+            def marcar_confirmada(estado_actual):
+                if estado_actual is None:
+                    confirmacion["error"] = "sin_estado"
+                    return None
+                if estado_actual.get("confirmada_por_encargado"):
+                    confirmacion["error"] = "confirmada"
+                    confirmacion["confirmador"] = estado_actual.get(
+                        "confirmador_nombre", "Otro encargado"
+                    )
+                    return estado_actual
+
+                estado_actual["confirmada_por_encargado"] = True
+                estado_actual["confirmador_id"] = confirmador_id
+                estado_actual["confirmador_nombre"] = nombre_confirmador
+                estado_actual["confirmador_rol"] = confirmador_rol
+                estado_actual["firma_encargado_id"] = firma_id
+                estado_actual["firma_encargado"] = firma_encargado_data
+                estado_actual["firma_temporal"] = firma_temporal
+                estado_actual["fecha_confirmacion"] = safe_timestamp()
+                return estado_actual
+
+            estado = datos_tiempo_real.actualizar(clave_tiempo_real, marcar_confirmada)
+
+            if confirmacion.get("error") == "sin_estado":
+                return jsonify({"error": "No hay inspección activa para este establecimiento"}), 404
+            if confirmacion.get("error") == "confirmada":
+                confirmador = confirmacion["confirmador"]
+                return jsonify({
+                    "error": f"Esta inspección ya fue confirmada por {confirmador}",
+                    "confirmada": True,
+                    "confirmador": confirmador
+                }), 409  # Conflict
+
             
             # Notificar vía WebSocket a todos los conectados
             from app.socket_events import socketio
@@ -5095,9 +5481,15 @@ class InspeccionesController:
 
             # Actualizar también los datos en tiempo real para que el encargado vea el cambio
             clave_tiempo_real = f"establecimiento_{inspeccion.establecimiento_id}"
-            if clave_tiempo_real in datos_tiempo_real:
-                datos_tiempo_real[clave_tiempo_real]["inspector_id"] = current_user_id
-                datos_tiempo_real[clave_tiempo_real]["ultima_actualizacion"] = safe_timestamp()
+
+            def reasignar_inspector(estado_actual):
+                if estado_actual is None:
+                    return None
+                estado_actual["inspector_id"] = current_user_id
+                estado_actual["ultima_actualizacion"] = safe_timestamp()
+                return estado_actual
+
+            if datos_tiempo_real.actualizar(clave_tiempo_real, reasignar_inspector):
 
                 # Emitir actualización en tiempo real para notificar el cambio de inspector
                 try:
@@ -5419,26 +5811,12 @@ class InspeccionesController:
 
     @staticmethod
     def _calcular_calificacion_global(puntaje_total, items_calificados, criticos_fallados=0):
-        """Devuelve EXCELENTE/MUY BIEN/REGULAR/MALO según puntos extra sobre el mínimo.
+        """EXCELENTE/MUY BIEN/REGULAR/MALO según puntos extra sobre el mínimo.
 
-        Umbrales confirmados por Alfredo (llamada 10/07): Excelente 0-1, Muy bien 2-6,
-        Regular 7-14, Malo >14. Si hay algún ítem crítico fallado, nunca puede salir
-        Excelente ni Muy bien (bloqueo explícito, aunque un crítico fallado ya suma +7
-        y empuja a Regular/Malo por el umbral solo).
+        Umbrales confirmados por Alfredo (llamada 10/07); ver calificacion_global
+        en app/services/puntuacion.py.
         """
-        puntos_extra = max(0, round(puntaje_total) - items_calificados)
-
-        if criticos_fallados > 0:
-            return "REGULAR" if puntos_extra <= 14 else "MALO"
-
-        if puntos_extra <= 1:
-            return "EXCELENTE"
-        elif puntos_extra <= 6:
-            return "MUY BIEN"
-        elif puntos_extra <= 14:
-            return "REGULAR"
-        else:
-            return "MALO"
+        return calificacion_global(puntaje_total, items_calificados, criticos_fallados)
 
     @staticmethod
     def descartar_inspeccion(inspeccion_id):
@@ -3,6 +3,7 @@ from functools import wraps
 from app.models.Usuario_models import Usuario, Rol
 from app.models.Inspecciones_models import Establecimiento, JefeEstablecimiento, EncargadoEstablecimiento, Inspeccion, FirmaEncargadoPorJefe
 from app.extensions import db
+from app.services.estadisticas_establecimiento import estadisticas_establecimiento
 from app.utils.auth_decorators import login_required
 from app.utils.auth_utils import generar_contrasena_temporal
 from app.utils.media import private_signature_dir, signature_db_path, signature_public_url
@@ -600,42 +601,15 @@ def historial():
 
 
 def obtener_estadisticas_establecimiento(establecimiento_id):
-    """✅ CONVERTIDO A ORM: Obtener estadísticas del establecimiento"""
+    """Obtener estadísticas del establecimiento (servicio compartido, una consulta)"""
     try:
-        # ✅ Encargados activos usando ORM
-        encargados_activos = EncargadoEstablecimiento.query.filter(
-            EncargadoEstablecimiento.establecimiento_id == establecimiento_id,
-            EncargadoEstablecimiento.activo == True
-        ).count()
-
-        # ✅ Inspecciones este mes usando ORM
-        fecha_inicio_mes = datetime.now().replace(day=1)
-        inspecciones_mes = Inspeccion.query.filter(
-            Inspeccion.establecimiento_id == establecimiento_id,
-            Inspeccion.fecha >= fecha_inicio_mes
-        ).count()
-
-        # ✅ Firmas pendientes usando ORM
-        firmas_pendientes = EncargadoEstablecimiento.query.filter(
-            EncargadoEstablecimiento.establecimiento_id == establecimiento_id,
-            EncargadoEstablecimiento.activo == True,
-            EncargadoEstablecimiento.fecha_habilitacion.is_(None)
-        ).count()
-
-        # ✅ Promedio de cumplimiento usando ORM
-        promedio_cumplimiento = db.session.query(
-            func.coalesce(func.avg(Inspeccion.porcentaje_cumplimiento), 0)
-        ).filter(
-            Inspeccion.establecimiento_id == establecimiento_id,
-            Inspeccion.estado == 'completada',
-            Inspeccion.fecha >= fecha_inicio_mes
-        ).scalar()
+        datos = estadisticas_establecimiento(establecimiento_id)
 
         return {
-            'encargados_activos': encargados_activos,
-            'inspecciones_mes': inspecciones_mes,
-            'firmas_pendientes': firmas_pendientes,
-            'promedio_cumplimiento': round(float(promedio_cumplimiento or 0), 1)
+            'encargados_activos': datos['encargados']['activos'],
+            'inspecciones_mes': datos['inspecciones']['mes'],
+            'firmas_pendientes': datos['encargados']['firmas_pendientes'],
+            'promedio_cumplimiento': datos['inspecciones']['promedio_cumplimiento_mes']
         }
 
     except Exception as e:
@@ -720,33 +694,9 @@ def obtener_inspecciones_recientes(establecimiento_id, limit=10):
 
 
 def generar_datos_reporte(establecimiento_id):
-    """Generar datos completos para el reporte"""
+    """Generar datos completos para el reporte (último mes, trimestre y año)"""
     try:
-        # Datos del último mes, trimestre y año
-        ahora = datetime.now()
-        hace_mes = ahora - timedelta(days=30)
-        hace_trimestre = ahora - timedelta(days=90)
-        hace_año = ahora - timedelta(days=365)
-
-        reporte = {}
-
-        # Inspecciones por período
-        for periodo, fecha_inicio in [('mes', hace_mes), ('trimestre', hace_trimestre), ('año', hace_año)]:
-            datos = db.session.execute(text("""
-                SELECT COUNT(*) as total,
-                       COUNT(CASE WHEN estado = 'completada' THEN 1 END) as completadas,
-                       AVG(CASE WHEN estado = 'completada' THEN porcentaje_cumplimiento END) as promedio
-                FROM inspecciones 
-                WHERE establecimiento_id = :establecimiento_id AND fecha >= :fecha_inicio
-            """), {'establecimiento_id': establecimiento_id, 'fecha_inicio': fecha_inicio}).fetchone()
-
-            reporte[periodo] = {
-                'total_inspecciones': datos[0] or 0,
-                'completadas': datos[1] or 0,
-                'promedio_cumplimiento': round(float(datos[2] or 0), 1)
-            }
-
-        return reporte
+        return estadisticas_establecimiento(establecimiento_id)['periodos']
 
     except Exception as e:
         return {}
@@ -755,29 +705,13 @@ def generar_datos_reporte(establecimiento_id):
 def obtener_estadisticas_reporte(establecimiento_id):
     """Obtener estadísticas adicionales para el reporte"""
     try:
-        # Encargados activos e inactivos
-        encargados_stats = db.session.execute(text("""
-            SELECT 
-                COUNT(CASE WHEN activo = 1 THEN 1 END) as activos,
-                COUNT(CASE WHEN activo = 0 THEN 1 END) as inactivos
-            FROM encargados_establecimientos 
-            WHERE establecimiento_id = :establecimiento_id
-        """), {'establecimiento_id': establecimiento_id}).fetchone()
-
-        # Firmas registradas y pendientes (simplificado)
-        firmas_stats = db.session.execute(text("""
-            SELECT 
-                COUNT(CASE WHEN fecha_habilitacion IS NOT NULL THEN 1 END) as registradas,
-                COUNT(CASE WHEN fecha_habilitacion IS NULL THEN 1 END) as pendientes
-            FROM encargados_establecimientos
-            WHERE establecimiento_id = :establecimiento_id AND activo = 1
-        """), {'establecimiento_id': establecimiento_id}).fetchone()
+        encargados = estadisticas_establecimiento(establecimiento_id)['encargados']
 
         return {
-            'encargados_activos': encargados_stats[0] or 0,
-            'encargados_inactivos': encargados_stats[1] or 0,
-            'firmas_registradas': firmas_stats[0] or 0,
-            'firmas_pendientes': firmas_stats[1] or 0
+            'encargados_activos': encargados['activos'],
+            'encargados_inactivos': encargados['inactivos'],
+            'firmas_registradas': encargados['firmas_registradas'],
+            'firmas_pendientes': encargados['firmas_pendientes']
         }
 
     except Exception as e:
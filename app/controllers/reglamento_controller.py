@@ -3,7 +3,6 @@ Descripción: Controlador para gestionar el Reglamento de Restaurante
 Lógica: Maneja reuniones semanales, catálogo configurable de items y cierre de evaluaciones
 """
 
-from collections import defaultdict
 from datetime import date, datetime, timedelta
 import os
 import re
@@ -18,13 +17,22 @@ from app.models.Inspecciones_models import (
     EvaluacionReglamento,
     Establecimiento,
     Inspeccion,
-    InspeccionDetalle,
-    ItemEvaluacionBase,
-    ItemEvaluacionEstablecimiento,
     ReunionItemReglamento,
 )
 from app.utils.auth_decorators import login_required
 from app.utils.security import safe_text, save_validated_upload_image
+from app.services.cache_periodos import (
+    VERSION_REGLAMENTO,
+    cache_periodos,
+    clave_periodo,
+    limite_reglamento_cerrado,
+    versiones,
+)
+from app.services.evaluacion_semanal import (
+    evaluacion_semanal,
+    evaluacion_semanal_establecimiento,
+    rango_semana,
+)
 from app.services.encuestas_client import (
     EncuestasAPIError,
     METRICAS_REGLAMENTO_ENCUESTAS,
@@ -212,98 +220,6 @@ def _contar_inspecciones_completadas(establecimiento_id, fecha_inicio, fecha_fin
     ).count()
 
 
-def _calcular_calificacion_semanal_establecimiento(establecimiento_id, fecha_inicio, fecha_fin):
-    """Agrega todas las inspecciones completadas de un establecimiento en un rango de
-    fechas (puntaje_total, items_calificados, críticos) y calcula UNA calificación
-    cualitativa (EXCELENTE/MUY BIEN/REGULAR/MALO) para toda la semana, reutilizando la
-    misma fórmula del Bloque C (una inspección crítica fallada suma +7 igual que en un
-    solo checklist). Usado para automatizar A-01/A-02 del reglamento (Bloque F, 10/07)."""
-    from app.models.Inspecciones_models import InspeccionDetalle
-    from app.controllers.inspecciones_controller import InspeccionesController
-
-    inspecciones = Inspeccion.query.filter(
-        Inspeccion.establecimiento_id == establecimiento_id,
-        Inspeccion.estado == "completada",
-        Inspeccion.fecha >= fecha_inicio,
-        Inspeccion.fecha <= fecha_fin,
-    ).all()
-
-    if not inspecciones:
-        return None
-
-    ids_inspecciones = [insp.id for insp in inspecciones]
-    conteos = dict(
-        db.session.query(
-            InspeccionDetalle.inspeccion_id, db.func.count(InspeccionDetalle.id)
-        )
-        .filter(InspeccionDetalle.inspeccion_id.in_(ids_inspecciones))
-        .group_by(InspeccionDetalle.inspeccion_id)
-        .all()
-    )
-
-    puntaje_total_sum = sum(float(insp.puntaje_total or 0) for insp in inspecciones)
-    items_calificados_sum = sum(conteos.get(insp.id, 0) for insp in inspecciones)
-    criticos_sum = sum(int(insp.puntos_criticos_perdidos or 0) for insp in inspecciones)
-
-    calificacion = InspeccionesController._calcular_calificacion_global(
-        puntaje_total_sum, items_calificados_sum, criticos_sum
-    )
-
-    return {
-        "calificacion": calificacion,
-        "num_inspecciones": len(inspecciones),
-        "puntaje_total_sum": puntaje_total_sum,
-        "items_calificados_sum": items_calificados_sum,
-        "criticos_sum": criticos_sum,
-    }
-
-
-def _calcular_reincidencias_semanales(establecimiento_id, fecha_inicio, fecha_fin):
-    """Detecta items del checklist que fallaron al menos dos veces durante la semana."""
-    detalles = (
-        db.session.query(
-            ItemEvaluacionBase.id,
-            InspeccionDetalle.rating,
-            ItemEvaluacionBase.riesgo,
-        )
-        .join(Inspeccion, InspeccionDetalle.inspeccion_id == Inspeccion.id)
-        .join(
-            ItemEvaluacionEstablecimiento,
-            InspeccionDetalle.item_establecimiento_id == ItemEvaluacionEstablecimiento.id,
-        )
-        .join(
-            ItemEvaluacionBase,
-            ItemEvaluacionEstablecimiento.item_base_id == ItemEvaluacionBase.id,
-        )
-        .filter(
-            Inspeccion.establecimiento_id == establecimiento_id,
-            Inspeccion.estado == "completada",
-            Inspeccion.fecha >= fecha_inicio,
-            Inspeccion.fecha <= fecha_fin,
-            InspeccionDetalle.rating.isnot(None),
-        )
-        .all()
-    )
-
-    incumplimientos_por_item = defaultdict(int)
-    for item_base_id, rating, riesgo in detalles:
-        es_incumplimiento = (
-            int(rating) == 8 if (riesgo or "").strip() == "Crítico" else int(rating) != 1
-        )
-        if es_incumplimiento:
-            incumplimientos_por_item[item_base_id] += 1
-
-    reincidentes = {
-        item_id: cantidad
-        for item_id, cantidad in incumplimientos_por_item.items()
-        if cantidad >= 2
-    }
-    return {
-        "items_reincidentes": len(reincidentes),
-        "incumplimientos_reincidentes": sum(reincidentes.values()),
-    }
-
-
 def _evaluar_item_automatico_semanal(codigo, calificacion_semanal, reincidencias=None):
     """A-01 (Regular) y A-02 (Malo) son mutuamente excluyentes por construcción: una
     calificación semanal solo puede ser una de las 4 etiquetas a la vez."""
@@ -861,38 +777,6 @@ def _meses_en_rango(fecha_inicio, fecha_fin):
     return meses
 
 
-def _fecha_referencia_reunion(reunion):
-    if reunion.fecha_inicio_semana:
-        return reunion.fecha_inicio_semana
-    if reunion.fecha_reunion:
-        return reunion.fecha_reunion
-    if reunion.created_at:
-        return reunion.created_at.date()
-    return datetime.utcnow().date()
-
-
-def _puntos_reunion(reunion):
-    if reunion.total_puntos is not None:
-        return int(reunion.total_puntos or 0)
-    return _calcular_resumen_reunion_desde_evaluaciones(reunion.evaluaciones or [])[
-        "total_puntos"
-    ]
-
-
-def _infracciones_reunion(reunion):
-    if reunion.total_infracciones is not None:
-        return int(reunion.total_infracciones or 0)
-    return _calcular_resumen_reunion_desde_evaluaciones(reunion.evaluaciones or [])[
-        "total_infracciones"
-    ]
-
-
-def _platos_reunion(reunion):
-    if reunion.total_platos_sancion is not None:
-        return int(reunion.total_platos_sancion or 0)
-    return calcular_sancion_por_platos(_puntos_reunion(reunion)).get("platos", 0)
-
-
 def _parsear_rango_analitica():
     hoy = datetime.utcnow().date()
     fecha_inicio = _parsear_fecha_iso(request.args.get("fecha_inicio")) or date(
@@ -906,24 +790,42 @@ def _parsear_rango_analitica():
     return fecha_inicio, fecha_fin
 
 
-def _query_reuniones_analitica(establecimiento_ids, fecha_inicio, fecha_fin):
-    if not establecimiento_ids:
-        return []
-
-    fecha_base = db.func.coalesce(
+def _fecha_base_reunion():
+    return db.func.coalesce(
         ReglamentoRestaurante.fecha_inicio_semana,
         ReglamentoRestaurante.fecha_reunion,
     )
 
+
+def _filtros_reuniones_analitica(establecimiento_ids, rangos):
+    fecha_base = _fecha_base_reunion()
+    return (
+        ReglamentoRestaurante.estado == "completada",
+        ReglamentoRestaurante.establecimiento_id.in_(establecimiento_ids),
+        or_(
+            *(
+                and_(fecha_base >= fecha_inicio, fecha_base <= fecha_fin)
+                for fecha_inicio, fecha_fin in rangos
+            )
+        ),
+    )
+
+
+def _hay_reuniones_pendientes(establecimiento_ids, fecha_inicio, fecha_fin):
+    if not establecimiento_ids:
+        return False
+
+    fecha_base = _fecha_base_reunion()
     return (
-        ReglamentoRestaurante.query.filter(
-            ReglamentoRestaurante.estado == "completada",
+        db.session.query(ReglamentoRestaurante.id)
+        .filter(
+            ReglamentoRestaurante.estado != "completada",
             ReglamentoRestaurante.establecimiento_id.in_(establecimiento_ids),
             fecha_base >= fecha_inicio,
             fecha_base <= fecha_fin,
         )
-        .order_by(fecha_base.asc())
-        .all()
+        .first()
+        is not None
     )
 
 
@@ -942,73 +844,210 @@ def _resolver_filtro_establecimientos_analitica():
     return establecimientos, [establecimiento.id for establecimiento in establecimientos], None
 
 
-def _promedio_por_semana(reuniones):
-    semanas = defaultdict(list)
-    for reunion in reuniones:
-        fecha = _fecha_referencia_reunion(reunion)
-        iso_year, iso_week, _ = fecha.isocalendar()
-        semanas[(iso_year, iso_week)].append(_puntos_reunion(reunion))
+def _unir_items_evaluacion(consulta):
+    return consulta.outerjoin(
+        ReunionItemReglamento,
+        ReunionItemReglamento.id == EvaluacionReglamento.reunion_item_id,
+    ).outerjoin(ItemReglamento, ItemReglamento.id == EvaluacionReglamento.item_id)
+
+
+def _columnas_evaluacion():
+    """Expresiones SQL de una evaluación, iguales a las que se calculaban en Python.
+
+    Necesitan los outer join de ``_unir_items_evaluacion``: manda el item
+    configurado en la reunión y, si no hay, el del catálogo.
+    """
+    con_item_reunion = ReunionItemReglamento.id.isnot(None)
+    cumple = db.func.coalesce(EvaluacionReglamento.cumple, db.false())
+    numero = db.func.coalesce(EvaluacionReglamento.numero_infracciones, 0)
+    infracciones = db.case((numero > 0, numero), else_=1)
+    puntaje = db.case(
+        (
+            EvaluacionReglamento.puntaje_aplicado.isnot(None),
+            EvaluacionReglamento.puntaje_aplicado,
+        ),
+        (con_item_reunion, db.func.coalesce(ReunionItemReglamento.puntaje, 0)),
+        else_=db.func.coalesce(ItemReglamento.puntaje, 0),
+    )
+
+    return {
+        "codigo": db.case(
+            (con_item_reunion, ReunionItemReglamento.codigo), else_=ItemReglamento.codigo
+        ),
+        "descripcion": db.case(
+            (con_item_reunion, ReunionItemReglamento.descripcion),
+            else_=ItemReglamento.descripcion,
+        ),
+        "categoria": db.case(
+            (con_item_reunion, ReunionItemReglamento.categoria),
+            else_=ItemReglamento.categoria,
+        ),
+        "cumple": db.case((cumple, 1), else_=0),
+        "puntos": db.case((cumple, 0), else_=puntaje * infracciones),
+        # En el reporte por item una evaluación cumplida conserva sus infracciones
+        "infracciones_item": db.case((cumple, numero), else_=infracciones),
+        "infracciones_reunion": db.case((cumple, 0), else_=infracciones),
+    }
 
-    return _promedio([_promedio(puntos) for puntos in semanas.values()])
 
+def _subconsulta_reuniones_analitica(establecimiento_ids, rangos):
+    """Una fila por reunión completada con su fecha, puntos, infracciones y platos.
 
-def _promedio_por_mes(reuniones):
-    meses = defaultdict(list)
-    for reunion in reuniones:
-        fecha = _fecha_referencia_reunion(reunion)
-        meses[(fecha.year, fecha.month)].append(_puntos_reunion(reunion))
+    Las reuniones sin totales guardados se resumen desde sus evaluaciones, como
+    en ``_calcular_resumen_reunion_desde_evaluaciones``.
+    """
+    columnas = _columnas_evaluacion()
 
-    return _promedio([_promedio(puntos) for puntos in meses.values()])
+    def desde_evaluaciones(columna):
+        return (
+            _unir_items_evaluacion(
+                db.select(db.func.coalesce(db.func.sum(columna), 0)).select_from(
+                    EvaluacionReglamento
+                )
+            )
+            .where(EvaluacionReglamento.reunion_id == ReglamentoRestaurante.id)
+            .correlate(ReglamentoRestaurante)
+            .scalar_subquery()
+        )
 
+    return (
+        db.session.query(
+            ReglamentoRestaurante.id.label("id"),
+            ReglamentoRestaurante.establecimiento_id.label("establecimiento_id"),
+            _fecha_base_reunion().label("fecha"),
+            db.func.coalesce(
+                ReglamentoRestaurante.total_puntos,
+                desde_evaluaciones(columnas["puntos"]),
+            ).label("puntos"),
+            db.func.coalesce(
+                ReglamentoRestaurante.total_infracciones,
+                desde_evaluaciones(columnas["infracciones_reunion"]),
+            ).label("infracciones"),
+            ReglamentoRestaurante.total_platos_sancion.label("platos"),
+        )
+        .filter(*_filtros_reuniones_analitica(establecimiento_ids, rangos))
+        .subquery()
+    )
 
-def _serie_mensual(reuniones_actuales, reuniones_anio_anterior, fecha_inicio, fecha_fin):
-    meses = _meses_en_rango(fecha_inicio, fecha_fin)
-    actuales_por_mes = defaultdict(list)
-    anteriores_por_mes_equivalente = defaultdict(list)
 
-    for reunion in reuniones_actuales:
-        fecha = _fecha_referencia_reunion(reunion)
-        actuales_por_mes[(fecha.year, fecha.month)].append(_puntos_reunion(reunion))
+def _totales_por_fecha(establecimiento_ids, rangos):
+    """(fecha, reuniones, puntos, infracciones) por fecha de referencia, ascendente."""
+    if not establecimiento_ids:
+        return []
 
-    for reunion in reuniones_anio_anterior:
-        fecha = _fecha_referencia_reunion(reunion)
-        anteriores_por_mes_equivalente[(fecha.year + 1, fecha.month)].append(
-            _puntos_reunion(reunion)
+    reuniones = _subconsulta_reuniones_analitica(establecimiento_ids, rangos)
+    return (
+        db.session.query(
+            reuniones.c.fecha,
+            db.func.count(reuniones.c.id).label("reuniones"),
+            db.func.sum(reuniones.c.puntos).label("puntos"),
+            db.func.sum(reuniones.c.infracciones).label("infracciones"),
         )
+        .group_by(reuniones.c.fecha)
+        .order_by(reuniones.c.fecha.asc())
+        .all()
+    )
+
+
+def _promedio_acumulado(puntos, reuniones):
+    if not reuniones:
+        return 0
+    return round(puntos / reuniones, 2)
+
+
+def _acumular_por(filas, clave):
+    grupos = {}
+    for fila in filas:
+        llave = clave(fila.fecha)
+        puntos, reuniones = grupos.get(llave, (0, 0))
+        grupos[llave] = (puntos + int(fila.puntos or 0), reuniones + fila.reuniones)
+    return grupos
+
+
+def _promedio_de_grupos(grupos):
+    return _promedio(
+        [_promedio_acumulado(puntos, reuniones) for puntos, reuniones in grupos.values()]
+    )
+
+
+def _serie_mensual(filas_actuales, filas_anio_anterior, fecha_inicio, fecha_fin):
+    meses = _meses_en_rango(fecha_inicio, fecha_fin)
+    actuales_por_mes = _acumular_por(
+        filas_actuales, lambda fecha: (fecha.year, fecha.month)
+    )
+    anteriores_por_mes_equivalente = _acumular_por(
+        filas_anio_anterior, lambda fecha: (fecha.year + 1, fecha.month)
+    )
 
     labels = [f"{MESES_ES[mes.month - 1]} {mes.year}" for mes in meses]
     actual = []
     anterior = []
 
     for mes in meses:
-        puntos_actuales = actuales_por_mes.get((mes.year, mes.month), [])
-        puntos_anteriores = anteriores_por_mes_equivalente.get((mes.year, mes.month), [])
-        actual.append(_promedio(puntos_actuales) if puntos_actuales else None)
-        anterior.append(_promedio(puntos_anteriores) if puntos_anteriores else None)
+        clave = (mes.year, mes.month)
+        actual.append(
+            _promedio_acumulado(*actuales_por_mes[clave])
+            if clave in actuales_por_mes
+            else None
+        )
+        anterior.append(
+            _promedio_acumulado(*anteriores_por_mes_equivalente[clave])
+            if clave in anteriores_por_mes_equivalente
+            else None
+        )
 
     return {"labels": labels, "actual": actual, "anterior": anterior}
 
 
-def _barras_restaurantes(reuniones):
+def _barras_restaurantes(establecimiento_ids, fecha_inicio, fecha_fin):
+    if not establecimiento_ids:
+        return []
+
+    reuniones = _subconsulta_reuniones_analitica(
+        establecimiento_ids, [(fecha_inicio, fecha_fin)]
+    )
+    # Los platos no guardados dependen de los puntos de cada reunión: se agrupan
+    # por esos puntos y la tabla de sanciones se aplica en Python
+    puntos_sin_platos = db.case(
+        (reuniones.c.platos.is_(None), reuniones.c.puntos), else_=None
+    )
+    filas = (
+        db.session.query(
+            reuniones.c.establecimiento_id,
+            Establecimiento.nombre,
+            puntos_sin_platos.label("puntos_sin_platos"),
+            db.func.count(reuniones.c.id).label("reuniones"),
+            db.func.sum(reuniones.c.puntos).label("puntos"),
+            db.func.sum(reuniones.c.infracciones).label("infracciones"),
+            db.func.sum(reuniones.c.platos).label("platos"),
+        )
+        .join(Establecimiento, Establecimiento.id == reuniones.c.establecimiento_id)
+        .group_by(reuniones.c.establecimiento_id, Establecimiento.nombre, puntos_sin_platos)
+        .order_by(db.func.min(reuniones.c.fecha).asc(), reuniones.c.establecimiento_id.asc())
+        .all()
+    )
+
     datos = {}
-    for reunion in reuniones:
-        establecimiento = reunion.establecimiento
-        if not establecimiento:
-            continue
+    for fila in filas:
         item = datos.setdefault(
-            establecimiento.id,
+            fila.establecimiento_id,
             {
-                "establecimiento": establecimiento.nombre,
+                "establecimiento": fila.nombre,
                 "reuniones": 0,
                 "total_puntos": 0,
                 "total_infracciones": 0,
                 "total_platos": 0,
             },
         )
-        item["reuniones"] += 1
-        item["total_puntos"] += _puntos_reunion(reunion)
-        item["total_infracciones"] += _infracciones_reunion(reunion)
-        item["total_platos"] += _platos_reunion(reunion)
+        item["reuniones"] += fila.reuniones
+        item["total_puntos"] += int(fila.puntos or 0)
+        item["total_infracciones"] += int(fila.infracciones or 0)
+        item["total_platos"] += int(fila.platos or 0)
+        if fila.puntos_sin_platos is not None:
+            item["total_platos"] += (
+                calcular_sancion_por_platos(int(fila.puntos_sin_platos)).get("platos", 0)
+                * fila.reuniones
+            )
 
     filas = []
     for item in datos.values():
@@ -1023,66 +1062,73 @@ def _barras_restaurantes(reuniones):
     return sorted(filas, key=lambda item: item["promedio_puntos"], reverse=True)
 
 
-def _datos_evaluacion_reglamento(evaluacion):
-    item = evaluacion.reunion_item or evaluacion.item
-    codigo = getattr(item, "codigo", "") or "S/C"
-    descripcion = getattr(item, "descripcion", "") or "Sin descripcion"
-    categoria = (
-        _normalizar_categoria_reglamento(
-            getattr(item, "categoria", None), permitir_desconocida=True
+def _totales_por_item(establecimiento_ids, fecha_inicio, fecha_fin):
+    """Evaluaciones agrupadas por (categoría, código, descripción) del item.
+
+    Se ordenan por su primera evaluación para que el orden de los empates sea
+    el de siempre.
+    """
+    columnas = _columnas_evaluacion()
+    primera = db.func.min(EvaluacionReglamento.id)
+    return (
+        _unir_items_evaluacion(
+            db.session.query(
+                columnas["categoria"].label("categoria"),
+                columnas["codigo"].label("codigo"),
+                columnas["descripcion"].label("descripcion"),
+                db.func.count(EvaluacionReglamento.id).label("total"),
+                db.func.sum(columnas["cumple"]).label("cumple"),
+                db.func.sum(columnas["puntos"]).label("puntos"),
+                db.func.sum(columnas["infracciones_item"]).label("infracciones"),
+            )
+            .select_from(EvaluacionReglamento)
+            .join(
+                ReglamentoRestaurante,
+                ReglamentoRestaurante.id == EvaluacionReglamento.reunion_id,
+            )
         )
-        or "Sin categoria"
+        .filter(
+            *_filtros_reuniones_analitica(establecimiento_ids, [(fecha_inicio, fecha_fin)])
+        )
+        .group_by(columnas["categoria"], columnas["codigo"], columnas["descripcion"])
+        .order_by(primera.asc())
+        .all()
     )
-    puntaje = evaluacion.puntaje_aplicado
-    if puntaje is None:
-        puntaje = getattr(item, "puntaje", 0) or 0
-
-    numero_infracciones = evaluacion.numero_infracciones or 0
-    if not evaluacion.cumple and numero_infracciones <= 0:
-        numero_infracciones = 1
-
-    puntos = 0 if evaluacion.cumple else int(puntaje or 0) * numero_infracciones
-    return {
-        "codigo": codigo,
-        "descripcion": descripcion,
-        "categoria": categoria,
-        "cumple": bool(evaluacion.cumple),
-        "numero_infracciones": numero_infracciones,
-        "puntos": puntos,
-    }
 
 
-def _resumen_categorias_e_items(reunion_ids):
-    if not reunion_ids:
+def _resumen_categorias_e_items(establecimiento_ids, fecha_inicio, fecha_fin):
+    if not establecimiento_ids:
         return {"categorias": [], "menos_cumplidos": [], "cumplidos": []}
 
-    evaluaciones = EvaluacionReglamento.query.filter(
-        EvaluacionReglamento.reunion_id.in_(reunion_ids)
-    ).all()
-
     categorias = {}
     items = {}
 
-    for evaluacion in evaluaciones:
-        datos = _datos_evaluacion_reglamento(evaluacion)
+    for fila in _totales_por_item(establecimiento_ids, fecha_inicio, fecha_fin):
+        codigo = fila.codigo or "S/C"
+        descripcion = fila.descripcion or "Sin descripcion"
+        nombre_categoria = (
+            _normalizar_categoria_reglamento(fila.categoria, permitir_desconocida=True)
+            or "Sin categoria"
+        )
+        total = fila.total
+        cumple = int(fila.cumple or 0)
+        puntos = int(fila.puntos or 0)
+
         categoria = categorias.setdefault(
-            datos["categoria"],
-            {"categoria": datos["categoria"], "total": 0, "cumple": 0, "no_cumple": 0, "puntos": 0},
+            nombre_categoria,
+            {"categoria": nombre_categoria, "total": 0, "cumple": 0, "no_cumple": 0, "puntos": 0},
         )
-        categoria["total"] += 1
-        categoria["puntos"] += datos["puntos"]
-        if datos["cumple"]:
-            categoria["cumple"] += 1
-        else:
-            categoria["no_cumple"] += 1
+        categoria["total"] += total
+        categoria["puntos"] += puntos
+        categoria["cumple"] += cumple
+        categoria["no_cumple"] += total - cumple
 
-        item_key = (datos["codigo"], datos["descripcion"])
         item = items.setdefault(
-            item_key,
+            (codigo, descripcion),
             {
-                "codigo": datos["codigo"],
-                "descripcion": datos["descripcion"],
-                "categoria": datos["categoria"],
+                "codigo": codigo,
+                "descripcion": descripcion,
+                "categoria": nombre_categoria,
                 "total": 0,
                 "cumple": 0,
                 "no_cumple": 0,
@@ -1090,13 +1136,11 @@ def _resumen_categorias_e_items(reunion_ids):
                 "infracciones": 0,
             },
         )
-        item["total"] += 1
-        item["puntos"] += datos["puntos"]
-        item["infracciones"] += datos["numero_infracciones"]
-        if datos["cumple"]:
-            item["cumple"] += 1
-        else:
-            item["no_cumple"] += 1
+        item["total"] += total
+        item["puntos"] += puntos
+        item["infracciones"] += int(fila.infracciones or 0)
+        item["cumple"] += cumple
+        item["no_cumple"] += total - cumple
 
     categorias_data = []
     for categoria in categorias.values():
@@ -1146,17 +1190,33 @@ def _resumen_categorias_e_items(reunion_ids):
 
 
 def _construir_payload_analitica(establecimiento_ids, fecha_inicio, fecha_fin):
-    reuniones_actuales = _query_reuniones_analitica(
-        establecimiento_ids, fecha_inicio, fecha_fin
-    )
-    reuniones_anio_anterior = _query_reuniones_analitica(
-        establecimiento_ids, _restar_un_anio(fecha_inicio), _restar_un_anio(fecha_fin)
+    """Analítica del reglamento a partir de totales agrupados en SQL.
+
+    Python solo recibe filas agregadas: totales por fecha de referencia (que
+    alimentan KPIs, promedios semanales/mensuales y la serie mensual de ambos
+    años), totales por restaurante y totales por item evaluado.
+    """
+    inicio_anterior = _restar_un_anio(fecha_inicio)
+    fin_anterior = _restar_un_anio(fecha_fin)
+
+    filas_por_fecha = _totales_por_fecha(
+        establecimiento_ids,
+        [(fecha_inicio, fecha_fin), (inicio_anterior, fin_anterior)],
     )
+    filas_actuales = [
+        fila for fila in filas_por_fecha if fecha_inicio <= fila.fecha <= fecha_fin
+    ]
+    filas_anio_anterior = [
+        fila for fila in filas_por_fecha if inicio_anterior <= fila.fecha <= fin_anterior
+    ]
 
-    puntos_actuales = [_puntos_reunion(reunion) for reunion in reuniones_actuales]
-    puntos_anteriores = [_puntos_reunion(reunion) for reunion in reuniones_anio_anterior]
-    promedio_actual = _promedio(puntos_actuales)
-    promedio_anterior = _promedio(puntos_anteriores)
+    reuniones_actuales = sum(fila.reuniones for fila in filas_actuales)
+    total_puntos = sum(int(fila.puntos or 0) for fila in filas_actuales)
+    promedio_actual = _promedio_acumulado(total_puntos, reuniones_actuales)
+    promedio_anterior = _promedio_acumulado(
+        sum(int(fila.puntos or 0) for fila in filas_anio_anterior),
+        sum(fila.reuniones for fila in filas_anio_anterior),
+    )
 
     if promedio_anterior > 0:
         variacion_anual = round(
@@ -1166,7 +1226,7 @@ def _construir_payload_analitica(establecimiento_ids, fecha_inicio, fecha_fin):
         variacion_anual = None
 
     resumen_items = _resumen_categorias_e_items(
-        [reunion.id for reunion in reuniones_actuales]
+        establecimiento_ids, fecha_inicio, fecha_fin
     )
 
     return {
@@ -1177,22 +1237,28 @@ def _construir_payload_analitica(establecimiento_ids, fecha_inicio, fecha_fin):
             "fecha_fin_anio_anterior": _restar_un_anio(fecha_fin).isoformat(),
         },
         "kpis": {
-            "promedio_semanal": _promedio_por_semana(reuniones_actuales),
-            "promedio_mensual": _promedio_por_mes(reuniones_actuales),
+            "promedio_semanal": _promedio_de_grupos(
+                _acumular_por(filas_actuales, lambda fecha: fecha.isocalendar()[:2])
+            ),
+            "promedio_mensual": _promedio_de_grupos(
+                _acumular_por(filas_actuales, lambda fecha: (fecha.year, fecha.month))
+            ),
             "promedio_actual": promedio_actual,
             "promedio_anio_anterior": promedio_anterior,
             "variacion_anual": variacion_anual,
-            "reuniones": len(reuniones_actuales),
-            "total_puntos": sum(puntos_actuales),
+            "reuniones": reuniones_actuales,
+            "total_puntos": total_puntos,
             "total_infracciones": sum(
-                _infracciones_reunion(reunion) for reunion in reuniones_actuales
+                int(fila.infracciones or 0) for fila in filas_actuales
             ),
         },
         "series": {
             "movimiento_mensual": _serie_mensual(
-                reuniones_actuales, reuniones_anio_anterior, fecha_inicio, fecha_fin
+                filas_actuales, filas_anio_anterior, fecha_inicio, fecha_fin
+            ),
+            "restaurantes": _barras_restaurantes(
+                establecimiento_ids, fecha_inicio, fecha_fin
             ),
-            "restaurantes": _barras_restaurantes(reuniones_actuales),
             "categorias": resumen_items["categorias"],
         },
         "reportes": {
@@ -1318,16 +1384,103 @@ def api_analitica():
             return jsonify({"error": error[0]}), error[1]
 
         fecha_inicio, fecha_fin = _parsear_rango_analitica()
+
+        # Rango cuyas semanas ya no reciben reuniones: respuesta guardada
+        rango_cerrado = fecha_fin < limite_reglamento_cerrado(datetime.utcnow().date())
+        if rango_cerrado:
+            clave_snapshot = clave_periodo(
+                "reglamento_analitica",
+                fecha_inicio,
+                fecha_fin,
+                sorted(establecimiento_ids),
+            )
+            version_snapshot = versiones(VERSION_REGLAMENTO)
+            contenido = cache_periodos.obtener(clave_snapshot, version_snapshot)
+            if contenido is not None:
+                return current_app.response_class(contenido, mimetype="application/json")
+
         payload = _construir_payload_analitica(
             establecimiento_ids, fecha_inicio, fecha_fin
         )
-        return jsonify(payload)
+        respuesta = jsonify(payload)
+        if rango_cerrado and not _hay_reuniones_pendientes(
+            establecimiento_ids, _restar_un_anio(fecha_inicio), fecha_fin
+        ):
+            cache_periodos.guardar(clave_snapshot, version_snapshot, respuesta.get_data())
+        return respuesta
 
     except Exception:
         current_app.logger.exception("Error generando analítica de reglamento")
         return jsonify({"error": "Error interno al generar analítica."}), 500
 
 
+@reglamento_bp.route("/api/evaluacion-semanal")
+@login_required
+def api_evaluacion_semanal():
+    """Items automáticos (A-01, A-02, A-03) de todos los establecimientos de una semana.
+
+    Prepara las reuniones del lunes: por defecto evalúa la semana anterior;
+    ``fecha`` elige la semana que la contiene y ``establecimiento_id`` filtra.
+    """
+    try:
+        if not _usuario_puede_gestionar_reglamento():
+            return jsonify({"error": "No autorizado para ver la evaluación semanal."}), 403
+
+        establecimientos, establecimiento_ids, error = (
+            _resolver_filtro_establecimientos_analitica()
+        )
+        if error:
+            return jsonify({"error": error[0]}), error[1]
+
+        fecha = _parsear_fecha_iso(request.args.get("fecha")) or (
+            datetime.now().date() - timedelta(days=7)
+        )
+        fecha_inicio, fecha_fin = rango_semana(fecha)
+
+        resultado = evaluacion_semanal(establecimiento_ids, fecha_inicio, fecha_fin)
+        nombres = {
+            establecimiento.id: establecimiento.nombre
+            for establecimiento in establecimientos
+        }
+
+        filas = []
+        for establecimiento_id in establecimiento_ids:
+            datos = resultado[establecimiento_id]
+            calificacion = datos["calificacion"]
+            filas.append(
+                {
+                    "establecimiento_id": establecimiento_id,
+                    "establecimiento": nombres.get(establecimiento_id),
+                    "calificacion_semanal": calificacion,
+                    "reincidencias": datos["reincidencias"],
+                    "items": {
+                        codigo: _evaluar_item_automatico_semanal(
+                            codigo,
+                            calificacion["calificacion"] if calificacion else None,
+                            datos["reincidencias"],
+                        )
+                        for codigo in sorted(CODIGOS_AUTOMATICOS_SEMANALES)
+                    },
+                }
+            )
+
+        return jsonify(
+            {
+                "semana": {
+                    "fecha_inicio": fecha_inicio.isoformat(),
+                    "fecha_fin": fecha_fin.isoformat(),
+                    "semana": fecha_inicio.isocalendar().week,
+                    "ano": fecha_inicio.isocalendar().year,
+                },
+                "establecimientos": filas,
+            }
+        )
+
+    except Exception:
+        current_app.logger.exception("Error calculando la evaluación semanal del reglamento")
+        return jsonify({"error": "Error interno al calcular la evaluación semanal."}), 500
+
+
 @reglamento_bp.route("/crear-reunion", methods=["POST"])
 @login_required
 def crear_reunion():
@@ -1461,10 +1614,10 @@ def ver_reunion(reunion_id):
         resultado_calificacion_semanal = None
         resultado_reincidencias_semanales = None
         if any(_es_item_automatico_semanal(item) for item in items_reunion):
-            resultado_calificacion_semanal = _calcular_calificacion_semanal_establecimiento(
-                reunion.establecimiento_id, reunion.fecha_inicio_semana, reunion.fecha_fin_semana
-            )
-            resultado_reincidencias_semanales = _calcular_reincidencias_semanales(
+            (
+                resultado_calificacion_semanal,
+                resultado_reincidencias_semanales,
+            ) = evaluacion_semanal_establecimiento(
                 reunion.establecimiento_id, reunion.fecha_inicio_semana, reunion.fecha_fin_semana
             )
 
@@ -1756,12 +1909,10 @@ def guardar_evaluacion():
         resultado_calificacion_semanal = None
         resultado_reincidencias_semanales = None
         if hay_items_automaticos:
-            resultado_calificacion_semanal = _calcular_calificacion_semanal_establecimiento(
-                reunion.establecimiento_id,
-                reunion.fecha_inicio_semana,
-                reunion.fecha_fin_semana,
-            )
-            resultado_reincidencias_semanales = _calcular_reincidencias_semanales(
+            (
+                resultado_calificacion_semanal,
+                resultado_reincidencias_semanales,
+            ) = evaluacion_semanal_establecimiento(
                 reunion.establecimiento_id,
                 reunion.fecha_inicio_semana,
                 reunion.fecha_fin_semana,
@@ -68,6 +68,13 @@ class EncargadoEstablecimiento(db.Model):
         lazy=True,
     )
 
+    # Asignaciones vigentes de un usuario (permisos y vistas del encargado)
+    __table_args__ = (
+        db.Index(
+            "idx_encargados_usuario_activo_inicio", "usuario_id", "activo", "fecha_inicio"
+        ),
+    )
+
 
 class JefeEstablecimiento(db.Model):
     __tablename__ = "jefes_establecimientos"
@@ -87,6 +94,11 @@ class JefeEstablecimiento(db.Model):
     usuario = db.relationship("Usuario", backref="jefes_asignados", lazy=True)
     establecimiento = db.relationship("Establecimiento", backref="jefes_asignados_establecimiento", lazy=True)
 
+    # Asignaciones vigentes de un usuario (permisos del jefe)
+    __table_args__ = (
+        db.Index("idx_jefes_usuario_activo_inicio", "usuario_id", "activo", "fecha_inicio"),
+    )
+
 
 class FirmaEncargadoPorJefe(db.Model):
     __tablename__ = "firmas_encargados_por_jefe"
@@ -287,6 +299,50 @@ class PlanSemanal(db.Model):
     # Índice único para evitar duplicados por establecimiento/semana/año
     __table_args__ = (
         db.UniqueConstraint('establecimiento_id', 'semana', 'ano', name='unique_plan_semanal'),
+        # Planes de una semana para todos los establecimientos
+        db.Index('idx_plan_semanal_ano_semana', 'ano', 'semana'),
+    )
+
+
+class ResumenSemanalEstablecimiento(db.Model):
+    """Inspecciones completadas de un establecimiento agregadas por semana.
+
+    Una semana que cruza dos meses tiene una fila por mes: el dashboard semanal
+    suma las filas de la semana y el mensual las del mes. Se mantiene en
+    app.services.resumen_semanal.
+    """
+
+    __tablename__ = "resumen_semanal_establecimiento"
+    id = db.Column(db.Integer, primary_key=True)
+    establecimiento_id = db.Column(
+        db.Integer, db.ForeignKey("establecimientos.id"), nullable=False
+    )
+    inicio_semana = db.Column(db.Date, nullable=False)  # lunes
+    inicio_mes = db.Column(db.Date, nullable=False)  # día 1 del mes
+    inspecciones_completadas = db.Column(db.Integer, nullable=False, default=0)
+    suma_puntajes = db.Column(db.DECIMAL(10, 2), nullable=False, default=0)
+    # Solo inspecciones con porcentaje de cumplimiento (promedio del dashboard)
+    suma_cumplimiento = db.Column(db.DECIMAL(10, 2), nullable=False, default=0)
+    inspecciones_con_cumplimiento = db.Column(db.Integer, nullable=False, default=0)
+    criticos_fallados = db.Column(db.Integer, nullable=False, default=0)
+    items_calificados = db.Column(db.Integer, nullable=False, default=0)
+    # Sin llave foránea: la fila se recalcula después de borrar la inspección
+    inspeccion_reciente_id = db.Column(db.Integer)
+    calificacion_reciente = db.Column(db.String(20))
+    puntaje_reciente = db.Column(db.Integer)
+    inspecciones = db.Column(db.JSON)  # detalle por inspección, en orden
+    updated_at = db.Column(
+        db.TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+
+    __table_args__ = (
+        db.UniqueConstraint(
+            "establecimiento_id",
+            "inicio_semana",
+            "inicio_mes",
+            name="unique_resumen_semanal",
+        ),
+        db.Index("idx_resumen_semanal_mes", "inicio_mes", "establecimiento_id"),
     )
 
 
@@ -391,6 +447,19 @@ class Inspeccion(db.Model):
     detalles = db.relationship("InspeccionDetalle", backref="inspeccion", lazy=True)
     evidencias = db.relationship("EvidenciaInspeccion", backref="inspeccion", lazy=True)
 
+    # Rutas de acceso reales: metas semanales por establecimiento, dashboards por
+    # rango de fechas y la búsqueda paginada por (fecha, created_at, id)
+    __table_args__ = (
+        db.Index(
+            "idx_inspecciones_establecimiento_estado_fecha",
+            "establecimiento_id",
+            "estado",
+            "fecha",
+        ),
+        db.Index("idx_inspecciones_estado_fecha", "estado", "fecha"),
+        db.Index("idx_inspecciones_fecha_creacion", "fecha", "created_at", "id"),
+    )
+
 
 class InspeccionDetalle(db.Model):
     __tablename__ = "inspeccion_detalles"
@@ -407,6 +476,8 @@ class InspeccionDetalle(db.Model):
     created_at = db.Column(db.TIMESTAMP, default=datetime.utcnow)
     item_establecimiento = db.relationship("ItemEvaluacionEstablecimiento")
 
+    __table_args__ = (db.Index("idx_inspeccion_detalles_inspeccion", "inspeccion_id"),)
+
 
 class EvidenciaInspeccion(db.Model):
     __tablename__ = "evidencias_inspeccion"
@@ -484,6 +484,9 @@ def obtener_informes():
         inspector_id=inspector_id,
         encargado_id=encargado_id,
         estado=estado,
+        page=request.args.get("page", type=int),
+        per_page=request.args.get("per_page", type=int),
+        stream=request.args.get("stream") in {"1", "true", "True"},
     )
 
 
@@ -512,6 +515,9 @@ def filtrar_inspecciones():
         inspector_id=inspector_id,
         encargado_id=encargado_id,
         estado=estado,
+        page=request.args.get("page", type=int),
+        per_page=request.args.get("per_page", type=int),
+        stream=request.args.get("stream") in {"1", "true", "True"},
     )
 
 
@@ -924,10 +930,9 @@ def obtener_estadisticas_establecimiento(establecimiento_id):
     import traceback
 
     try:
-        from app.models.Inspecciones_models import (
-            Establecimiento, Inspeccion, ItemEvaluacionEstablecimiento,
-            EncargadoEstablecimiento, JefeEstablecimiento
-        )
+        from datetime import datetime
+        from app.models.Inspecciones_models import Establecimiento
+        from app.services.estadisticas_establecimiento import estadisticas_establecimiento
 
         # Verificar que el establecimiento existe
         establecimiento = Establecimiento.query.get(establecimiento_id)
@@ -939,45 +944,24 @@ def obtener_estadisticas_establecimiento(establecimiento_id):
         if user_role not in ["Administrador", "Inspector"]:
             return jsonify({"error": "No autorizado"}), 403
 
-        # Obtener estadísticas
-        inspecciones_total = Inspeccion.query.filter_by(establecimiento_id=establecimiento_id).count()
-        encargados_total = EncargadoEstablecimiento.query.filter_by(establecimiento_id=establecimiento_id).count()
-        jefes_total = JefeEstablecimiento.query.filter_by(establecimiento_id=establecimiento_id).count()
-        evaluaciones_total = ItemEvaluacionEstablecimiento.query.filter_by(establecimiento_id=establecimiento_id).count()
-
-        # Inspecciones por estado
-        inspecciones_pendientes = Inspeccion.query.filter_by(
-            establecimiento_id=establecimiento_id, estado="pendiente"
-        ).count()
-        inspecciones_proceso = Inspeccion.query.filter_by(
-            establecimiento_id=establecimiento_id, estado="en_proceso"
-        ).count()
-        inspecciones_completadas = Inspeccion.query.filter_by(
-            establecimiento_id=establecimiento_id, estado="completada"
-        ).count()
-
-        # Inspecciones recientes (últimos 30 días)
-        from datetime import datetime, timedelta
-        fecha_limite = datetime.utcnow() - timedelta(days=30)
-        inspecciones_recientes = Inspeccion.query.filter(
-            Inspeccion.establecimiento_id == establecimiento_id,
-            Inspeccion.created_at >= fecha_limite
-        ).count()
+        # Obtener estadísticas (una consulta, compartidas con el jefe)
+        datos = estadisticas_establecimiento(establecimiento_id)
+        inspecciones = datos["inspecciones"]
 
         estadisticas = {
             "totales": {
-                "inspecciones": inspecciones_total,
-                "encargados": encargados_total,
-                "jefes": jefes_total,
-                "evaluaciones": evaluaciones_total
+                "inspecciones": inspecciones["total"],
+                "encargados": datos["encargados"]["total"],
+                "jefes": datos["jefes"],
+                "evaluaciones": datos["evaluaciones"]
             },
             "inspecciones_por_estado": {
-                "pendientes": inspecciones_pendientes,
-                "en_proceso": inspecciones_proceso,
-                "completadas": inspecciones_completadas
+                "pendientes": inspecciones["pendientes"],
+                "en_proceso": inspecciones["en_proceso"],
+                "completadas": inspecciones["completadas"]
             },
-            "inspecciones_recientes": inspecciones_recientes,
-            "fecha_actualizacion": datetime.utcnow().isoformat()
+            "inspecciones_recientes": inspecciones["recientes"],
+            "fecha_actualizacion": datetime.utcfromtimestamp(datos["generado"]).isoformat()
         }
 
         return jsonify(estadisticas), 200
@@ -1145,7 +1129,8 @@ def eliminar_establecimiento(establecimiento_id):
     try:
         from app.models.Inspecciones_models import (
             Establecimiento, Inspeccion, ItemEvaluacionEstablecimiento,
-            EncargadoEstablecimiento, PlanSemanal, FirmaEncarg
+            EncargadoEstablecimiento, PlanSemanal, FirmaEncargadoPorJefe,
+            JefeEstablecimiento, ResumenSemanalEstablecimiento
         )
         from app.extensions import db
 
@@ -1171,6 +1156,9 @@ def eliminar_establecimiento(establecimiento_id):
         # 3. Eliminar planes semanales
         PlanSemanal.query.filter_by(establecimiento_id=establecimiento_id).delete()
 
+        # 3b. Eliminar resumen semanal
+        ResumenSemanalEstablecimiento.query.filter_by(establecimiento_id=establecimiento_id).delete()
+
         # 4. Eliminar firmas de encargados
         FirmaEncargadoPorJefe.query.filter_by(establecimiento_id=establecimiento_id).delete()
 
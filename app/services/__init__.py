@@ -1 +1 @@
-"""Servicios de integración externos (Encuestas, etc.)."""
+"""Servicios de la aplicación: integraciones externas (Encuestas) y estado compartido."""
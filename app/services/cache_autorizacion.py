@@ -0,0 +1,226 @@
+"""Caché de autorización por establecimiento.
+
+Los eventos de Socket.IO validaban el acceso en cada mensaje, con una consulta
+a la base de datos por evento. Aquí el conjunto de establecimientos autorizados
+se resuelve una vez por conexión (``sid``) y se reutiliza mientras no cambien
+las asignaciones.
+
+Las peticiones HTTP usan ``establecimientos_autorizados``: el conjunto se
+memoriza en ``flask.g`` durante la petición (rutas, medios y controladores lo
+piden varias veces) y, entre peticiones, por ``(user_id, rol)`` durante
+``AUTORIZACION_CACHE_TTL_SEGUNDOS``. El TTL corto y el día de la consulta en
+la entrada cubren las asignaciones que empiezan o terminan por fecha sin que
+nadie escriba en la base.
+
+La invalidación usa una *versión de asignaciones* guardada en el estado
+compartido: cualquier commit que cree, modifique o borre un
+``Establecimiento``, ``EncargadoEstablecimiento`` o ``JefeEstablecimiento``
+la renueva, y cada worker descarta sus entradas al ver una versión distinta.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Callable, Iterable, Optional
+
+from flask import g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.services.estado_compartido import estado_compartido
+
+
+_versiones = estado_compartido.espacio("versiones_cache")
+_CLAVE_ASIGNACIONES = "asignaciones"
+_MARCA_SESION = "invalidar_asignaciones"
+_MEMO_PETICION = "_establecimientos_autorizados"
+
+
+def version_asignaciones() -> Optional[int]:
+    return _versiones.get(_CLAVE_ASIGNACIONES)
+
+
+def invalidar_asignaciones() -> None:
+    """Renueva la versión; se usa el reloj para no repetir una versión caducada."""
+    _versiones[_CLAVE_ASIGNACIONES] = time.time_ns()
+
+
+class AutorizacionesSocket:
+    """Establecimientos autorizados e inspecciones ya resueltas por conexión."""
+
+    def __init__(self):
+        self._entradas: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _entrada(self, sid: str, user_id, user_role) -> Optional[dict[str, Any]]:
+        entrada = self._entradas.get(sid)
+        if (
+            entrada is None
+            or entrada["usuario"] != (user_id, user_role)
+            or entrada["version"] != version_asignaciones()
+        ):
+            return None
+        return entrada
+
+    def establecimientos(
+        self, sid: str, user_id, user_role, cargar: Callable[[], Iterable[int]]
+    ) -> frozenset:
+        with self._lock:
+            entrada = self._entrada(sid, user_id, user_role)
+            if entrada is not None:
+                return entrada["establecimientos"]
+
+        version = version_asignaciones()
+        establecimientos = frozenset(cargar())
+        with self._lock:
+            self._entradas[sid] = {
+                "usuario": (user_id, user_role),
+                "version": version,
+                "establecimientos": establecimientos,
+                "inspecciones": {},
+            }
+        return establecimientos
+
+    def establecimiento_de_inspeccion(
+        self, sid: str, inspeccion_id: int, cargar: Callable[[], Optional[int]]
+    ) -> Optional[int]:
+        """Una inspección no cambia de establecimiento: se resuelve una vez por conexión."""
+        with self._lock:
+            entrada = self._entradas.get(sid)
+            if entrada is not None and inspeccion_id in entrada["inspecciones"]:
+                return entrada["inspecciones"][inspeccion_id]
+
+        establecimiento_id = cargar()
+        if establecimiento_id is not None:
+            with self._lock:
+                entrada = self._entradas.get(sid)
+                if entrada is not None:
+                    entrada["inspecciones"][inspeccion_id] = establecimiento_id
+        return establecimiento_id
+
+    def olvidar(self, sid: str) -> None:
+        with self._lock:
+            self._entradas.pop(sid, None)
+
+
+autorizaciones_socket = AutorizacionesSocket()
+
+
+class EstablecimientosAutorizados:
+    """Establecimientos autorizados por (usuario, rol), por petición y entre peticiones."""
+
+    def __init__(self, ttl_segundos: int = 60, max_entradas: int = 1024):
+        self.ttl_segundos = ttl_segundos
+        self.max_entradas = max_entradas
+        self._entradas: OrderedDict[tuple, tuple] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _vigente(self, clave: tuple) -> Optional[tuple]:
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return None
+            version, dia, expira, establecimientos = entrada
+            if (
+                version != version_asignaciones()
+                or dia != date.today()
+                or expira <= time.monotonic()
+            ):
+                del self._entradas[clave]
+                return None
+            self._entradas.move_to_end(clave)
+            return establecimientos
+
+    def _guardar(self, clave: tuple, version, dia: date, establecimientos: tuple) -> None:
+        if self.ttl_segundos <= 0:
+            return
+        with self._lock:
+            self._entradas[clave] = (
+                version,
+                dia,
+                time.monotonic() + self.ttl_segundos,
+                establecimientos,
+            )
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def obtener(self, user_id, user_role, cargar: Callable[[], Iterable[int]]) -> list:
+        """Lista nueva en cada llamada: quien la reciba puede modificarla."""
+        clave = (user_id, user_role)
+        memo = g.setdefault(_MEMO_PETICION, {}) if has_app_context() else None
+        if memo is not None and clave in memo:
+            return list(memo[clave])
+
+        establecimientos = self._vigente(clave)
+        if establecimientos is None:
+            # Versión y día leídos antes de cargar: si cambian, la entrada ya nace vieja
+            version = version_asignaciones()
+            dia = date.today()
+            establecimientos = tuple(cargar())
+            self._guardar(clave, version, dia, establecimientos)
+
+        if memo is not None:
+            memo[clave] = establecimientos
+        return list(establecimientos)
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+
+
+establecimientos_autorizados = EstablecimientosAutorizados()
+
+
+def _olvidar_memo_peticion() -> None:
+    if has_app_context():
+        g.pop(_MEMO_PETICION, None)
+
+
+def _modelos_asignacion() -> tuple[type, ...]:
+    from app.models.Inspecciones_models import (
+        EncargadoEstablecimiento,
+        Establecimiento,
+        JefeEstablecimiento,
+    )
+
+    return (Establecimiento, EncargadoEstablecimiento, JefeEstablecimiento)
+
+
+def _marcar_si_cambian_asignaciones(session, flush_context) -> None:
+    modelos = _modelos_asignacion()
+    for instancia in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instancia, modelos):
+            session.info[_MARCA_SESION] = True
+            return
+
+
+def _invalidar_tras_commit(session) -> None:
+    if session.info.pop(_MARCA_SESION, False):
+        invalidar_asignaciones()
+        # La petición que cambió las asignaciones ve el resultado nuevo
+        _olvidar_memo_peticion()
+
+
+def _descartar_marca(session, transaction) -> None:
+    if transaction.parent is None:
+        session.info.pop(_MARCA_SESION, None)
+
+
+def init_app(app) -> None:
+    establecimientos_autorizados.ttl_segundos = app.config.get(
+        "AUTORIZACION_CACHE_TTL_SEGUNDOS", 60
+    )
+    registrar_invalidacion()
+
+
+def registrar_invalidacion() -> None:
+    """Escucha los commits del ORM para invalidar las autorizaciones en caché."""
+    if event.contains(Session, "after_flush", _marcar_si_cambian_asignaciones):
+        return
+    event.listen(Session, "after_flush", _marcar_si_cambian_asignaciones)
+    event.listen(Session, "after_commit", _invalidar_tras_commit)
+    event.listen(Session, "after_transaction_end", _descartar_marca)
@@ -0,0 +1,205 @@
+"""Instantáneas de periodos cerrados de los dashboards.
+
+Las semanas y meses ya terminados del dashboard del plan semanal, y los
+rangos pasados de la analítica del reglamento, se recalculaban en cada
+consulta aunque su resultado ya no cambia. Aquí se guarda la respuesta JSON
+ya serializada de un periodo cerrado, con clave por alcance (establecimientos
+que ve el usuario), filtro y periodo; navegar el historial es una búsqueda
+por clave.
+
+Cada worker guarda sus instantáneas en un LRU acotado
+(``CACHE_PERIODOS_MAX_ENTRADAS``). La invalidación usa versiones en el estado
+compartido, igual que ``cache_autorizacion``: un commit que toca datos de un
+periodo ya cerrado (p. ej. ``editar_puntuacion_inspeccion`` sobre una
+inspección pasada, la meta de una semana pasada o una reunión evaluada)
+renueva la versión correspondiente y cada worker descarta lo que tenía. Las
+escrituras del periodo en curso no invalidan nada.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import event, inspect as inspeccionar_instancia
+from sqlalchemy.orm import Session
+
+from app.services.cache_autorizacion import version_asignaciones
+from app.services.checklist_tiempo_real import huella
+from app.services.estado_compartido import estado_compartido
+
+
+_versiones = estado_compartido.espacio("versiones_cache")
+VERSION_INSPECCIONES = "periodos_inspecciones"
+VERSION_REGLAMENTO = "periodos_reglamento"
+_MARCA_SESION = "invalidar_periodos"
+
+
+def version(nombre: str) -> Optional[int]:
+    return _versiones.get(nombre)
+
+
+def invalidar(nombre: str) -> None:
+    _versiones[nombre] = time.time_ns()
+
+
+def versiones(nombre: str) -> tuple:
+    """Versiones de las que depende una instantánea (datos y asignaciones)."""
+    return (version(nombre), version_asignaciones())
+
+
+def clave_periodo(*partes: Any) -> str:
+    return huella(partes)
+
+
+class CachePeriodos:
+    """Respuestas serializadas de periodos cerrados, por worker."""
+
+    def __init__(self, max_entradas: int = 256):
+        self.max_entradas = max_entradas
+        self._entradas: OrderedDict[str, tuple[tuple, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave: str, version_actual: tuple) -> Optional[bytes]:
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return None
+            if entrada[0] != version_actual:
+                del self._entradas[clave]
+                return None
+            self._entradas.move_to_end(clave)
+            return entrada[1]
+
+    def guardar(self, clave: str, version_calculo: tuple, contenido: bytes) -> None:
+        """``version_calculo`` es la leída antes de calcular: si cambió, no se usará."""
+        if self.max_entradas <= 0:
+            return
+        with self._lock:
+            self._entradas[clave] = (version_calculo, contenido)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+
+
+cache_periodos = CachePeriodos()
+
+
+def _hoy_con_margen() -> date:
+    # Un día de margen cubre la diferencia entre la fecha UTC y la de Lima
+    return datetime.utcnow().date() + timedelta(days=1)
+
+
+def limite_inspecciones_cerradas(hoy: Optional[date] = None) -> date:
+    """Fechas anteriores pertenecen a una semana o un mes ya terminados."""
+    hoy = hoy or _hoy_con_margen()
+    return max(hoy - timedelta(days=hoy.weekday()), hoy.replace(day=1))
+
+
+def limite_reglamento_cerrado(hoy: Optional[date] = None) -> date:
+    """Semanas anteriores ya no reciben reuniones (se crean la semana siguiente)."""
+    hoy = hoy or _hoy_con_margen()
+    return hoy - timedelta(days=hoy.weekday()) - timedelta(weeks=1)
+
+
+def _valores(instancia, campo: str) -> set:
+    """Valor actual y anterior de un campo (lo carga si estaba expirado)."""
+    historial = inspeccionar_instancia(instancia).attrs[campo].history
+    valores = {*historial.unchanged, *historial.added, *historial.deleted}
+    if not valores:
+        valores = {getattr(instancia, campo)}
+    return valores - {None}
+
+
+def _alguna_anterior(fechas: Iterable, limite: date) -> bool:
+    return any(fecha < limite for fecha in fechas)
+
+
+def _inicio_semana_plan(ano: int, semana: int) -> Optional[date]:
+    try:
+        return date.fromisocalendar(ano, semana, 1)
+    except ValueError:
+        return None
+
+
+def _versiones_afectadas(session, instancia) -> set[str]:
+    from app.models.Inspecciones_models import (
+        ConfiguracionEvaluacion,
+        EvaluacionReglamento,
+        Inspeccion,
+        InspeccionDetalle,
+        ItemEvaluacionBase,
+        ItemReglamentoRestaurante,
+        PlanSemanal,
+        ReunionItemReglamento,
+        ReunionReglamento,
+    )
+
+    if isinstance(instancia, Inspeccion):
+        if _alguna_anterior(_valores(instancia, "fecha"), limite_inspecciones_cerradas()):
+            return {VERSION_INSPECCIONES}
+    elif isinstance(instancia, InspeccionDetalle):
+        inspeccion = session.get(Inspeccion, instancia.inspeccion_id)
+        if inspeccion is None or _alguna_anterior(
+            _valores(inspeccion, "fecha"), limite_inspecciones_cerradas()
+        ):
+            return {VERSION_INSPECCIONES}
+    elif isinstance(instancia, PlanSemanal):
+        # evaluaciones_realizadas lo reescribe el propio dashboard; solo cuenta la meta
+        if instancia in session.dirty and not (
+            inspeccionar_instancia(instancia).attrs.evaluaciones_meta.history.has_changes()
+        ):
+            return set()
+        inicio = _inicio_semana_plan(instancia.ano, instancia.semana)
+        if inicio is None or inicio < limite_inspecciones_cerradas():
+            return {VERSION_INSPECCIONES}
+    elif isinstance(instancia, (ConfiguracionEvaluacion, ItemEvaluacionBase)):
+        # Umbrales de calificación y riesgo de los items (reincidencias semanales)
+        return {VERSION_INSPECCIONES}
+    elif isinstance(instancia, ReunionReglamento):
+        fechas = _valores(instancia, "fecha_inicio_semana") | _valores(instancia, "fecha_reunion")
+        if _alguna_anterior(fechas, limite_reglamento_cerrado()):
+            return {VERSION_REGLAMENTO}
+    elif isinstance(instancia, (EvaluacionReglamento, ReunionItemReglamento)):
+        reunion = session.get(ReunionReglamento, instancia.reunion_id)
+        if reunion is None or _alguna_anterior(
+            _valores(reunion, "fecha_inicio_semana"), limite_reglamento_cerrado()
+        ):
+            return {VERSION_REGLAMENTO}
+    elif isinstance(instancia, ItemReglamentoRestaurante):
+        return {VERSION_REGLAMENTO}
+    return set()
+
+
+def _marcar_periodos_cerrados(session, flush_context, instancias) -> None:
+    afectadas = set()
+    for instancia in (*session.new, *session.dirty, *session.deleted):
+        afectadas |= _versiones_afectadas(session, instancia)
+    if afectadas:
+        session.info.setdefault(_MARCA_SESION, set()).update(afectadas)
+
+
+def _invalidar_tras_commit(session) -> None:
+    for nombre in session.info.pop(_MARCA_SESION, ()):
+        invalidar(nombre)
+
+
+def _descartar_marca(session, transaction) -> None:
+    if transaction.parent is None:
+        session.info.pop(_MARCA_SESION, None)
+
+
+def init_app(app) -> None:
+    cache_periodos.max_entradas = app.config.get("CACHE_PERIODOS_MAX_ENTRADAS", 256)
+    if event.contains(Session, "before_flush", _marcar_periodos_cerrados):
+        return
+    event.listen(Session, "before_flush", _marcar_periodos_cerrados)
+    event.listen(Session, "after_commit", _invalidar_tras_commit)
+    event.listen(Session, "after_transaction_end", _descartar_marca)
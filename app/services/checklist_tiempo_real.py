@@ -0,0 +1,249 @@
+"""Protocolo de parches para el checklist en tiempo real.
+
+El estado vivo de cada establecimiento (``datos_tiempo_real``) lleva un número
+de secuencia ``seq`` que crece en uno con cada cambio efectivo. En lugar de
+difundir el estado completo, el servidor emite ``checklist_parche`` con solo
+los campos de items que cambiaron::
+
+    {
+        "establecimiento_id": 7,
+        "seq": 42,
+        "items": {"15": {"rating": 3}, "16": {"observacion": None}},
+        "items_eliminados": ["20"],
+        "observaciones": "...",   # solo si cambiaron
+        "resumen": {...},
+    }
+
+Un campo con valor ``None`` se elimina del item. El cliente aplica un parche si
+``seq`` es exactamente el siguiente al último visto, ignora los ya vistos y
+pide una instantánea (``solicitar_snapshot_checklist``) cuando detecta un hueco.
+
+Los últimos parches de cada establecimiento se guardan en un búfer circular
+(``historial_checklist``). Al reconectar, el cliente envía su último ``seq`` y
+recibe solo los parches perdidos; si el búfer ya no cubre el hueco se le manda
+la instantánea completa. Una secuencia nueva (tras limpiar el estado) arranca
+desde el reloj en milisegundos para no repetir números ya vistos por un cliente.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from typing import Any, Optional
+
+from app.services.estado_compartido import estado_compartido
+
+
+EVENTO_PARCHE = "checklist_parche"
+EVENTO_SNAPSHOT = "checklist_snapshot"
+EVENTO_REANUDACION = "checklist_reanudacion"
+
+historial_checklist = estado_compartido.espacio("historial_checklist")
+
+
+def huella(valor: Any) -> str:
+    """Huella estable del contenido (JSON canónico + BLAKE2b de 128 bits)."""
+    texto = json.dumps(
+        valor, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str
+    )
+    return hashlib.blake2b(texto.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def huellas_items(items: Optional[dict]) -> dict[str, str]:
+    """Huella por item, ignorando campos ``None`` igual que ``diferencia_items``."""
+    return {str(item_id): huella(_campos(datos)) for item_id, datos in (items or {}).items()}
+
+
+def _campos(item: Any) -> Any:
+    if not isinstance(item, dict):
+        return item
+    return {campo: valor for campo, valor in item.items() if valor is not None}
+
+
+def diferencia_items(
+    anteriores: Optional[dict], actuales: Optional[dict]
+) -> tuple[dict, list]:
+    """Devuelve ``(cambios, eliminados)`` para pasar de ``anteriores`` a ``actuales``."""
+    anteriores = anteriores or {}
+    actuales = actuales or {}
+
+    cambios: dict[str, Any] = {}
+    for item_id, datos in actuales.items():
+        previo = _campos(anteriores.get(item_id))
+        nuevo = _campos(datos)
+        if previo == nuevo:
+            continue
+        if not isinstance(previo, dict) or not isinstance(nuevo, dict):
+            cambios[item_id] = nuevo
+            continue
+        campos = {
+            campo: valor for campo, valor in nuevo.items() if previo.get(campo) != valor
+        }
+        campos.update({campo: None for campo in previo if campo not in nuevo})
+        cambios[item_id] = campos
+
+    eliminados = [item_id for item_id in anteriores if item_id not in actuales]
+    return cambios, eliminados
+
+
+def aplicar_diferencia_items(
+    items: Optional[dict], cambios: Optional[dict], eliminados: Optional[list] = None
+) -> dict:
+    """Aplica una diferencia de items y devuelve un diccionario nuevo."""
+    resultado = dict(items or {})
+    for item_id in eliminados or []:
+        resultado.pop(str(item_id), None)
+
+    for item_id, campos in (cambios or {}).items():
+        item_id = str(item_id)
+        if not isinstance(campos, dict):
+            resultado[item_id] = campos
+            continue
+        item = dict(resultado.get(item_id) or {})
+        for campo, valor in campos.items():
+            if valor is None:
+                item.pop(campo, None)
+            else:
+                item[campo] = valor
+        resultado[item_id] = item
+    return resultado
+
+
+def construir_parche(
+    estado: Optional[dict], items: Optional[dict], observaciones: Optional[str] = None
+) -> dict:
+    """Compara el estado guardado con los items/observaciones nuevos.
+
+    ``None`` significa "sin cambios" para ese campo. Devuelve un parche vacío
+    si no hay cambios efectivos.
+    """
+    estado = estado or {}
+    parche: dict[str, Any] = {}
+
+    if items is not None:
+        cambios, eliminados = diferencia_items(estado.get("items"), items)
+        if cambios:
+            parche["items"] = cambios
+        if eliminados:
+            parche["items_eliminados"] = eliminados
+
+    if observaciones is not None and observaciones != (estado.get("observaciones") or ""):
+        parche["observaciones"] = observaciones
+
+    return parche
+
+
+def parche_modifica_items(parche: dict) -> bool:
+    return bool(parche.get("items") or parche.get("items_eliminados"))
+
+
+def reiniciar_confirmacion(estado: dict) -> None:
+    """La confirmación del encargado deja de valer si cambian los puntajes."""
+    if estado.get("confirmada_por_encargado"):
+        estado["confirmada_por_encargado"] = False
+        estado["confirmador_id"] = None
+        estado["confirmador_nombre"] = None
+        estado["confirmador_rol"] = None
+        estado["fecha_confirmacion"] = None
+
+
+def registrar_parche(estado: Optional[dict], parche: dict, recalculado: bool = False) -> dict:
+    """Aplica ``parche`` sobre ``estado``, avanza ``seq`` y lo anota en el parche.
+
+    ``recalculado`` indica que quien aplica el parche ya dejó en
+    ``calculo_resumen`` las huellas y aportes de los items nuevos (el
+    autoguardado); si no, las huellas de los items tocados se descartan.
+    """
+    estado = estado or {}
+    if parche_modifica_items(parche):
+        estado["items"] = aplicar_diferencia_items(
+            estado.get("items"), parche.get("items"), parche.get("items_eliminados")
+        )
+        # Cambio sin recalcular el resumen (socket): las huellas de los items
+        # tocados dejan de valer y el próximo autoguardado recalcula su aporte
+        huellas = None if recalculado else (estado.get("calculo_resumen") or {}).get("huellas")
+        if huellas:
+            for item_id in [*parche.get("items", {}), *parche.get("items_eliminados", [])]:
+                huellas.pop(str(item_id), None)
+    if "observaciones" in parche:
+        estado["observaciones"] = parche["observaciones"]
+    if "resumen" in parche:
+        estado["resumen"] = parche["resumen"]
+
+    seq_previo = estado.get("seq")
+    estado["seq"] = int(seq_previo) + 1 if seq_previo else int(time.time() * 1000)
+    parche["seq"] = estado["seq"]
+    return estado
+
+
+def mensaje_parche(establecimiento_id: int, parche: dict, estado: Optional[dict], **campos) -> dict:
+    """Evento ``checklist_parche`` tal como se difunde y se guarda en el historial."""
+    return {
+        **parche,
+        "establecimiento_id": establecimiento_id,
+        **datos_confirmacion(estado),
+        **campos,
+    }
+
+
+def anotar_parche(establecimiento_id: int, mensaje: dict, limite: int) -> None:
+    """Agrega el parche al búfer circular del establecimiento."""
+    if limite <= 0:
+        return
+    seq = mensaje["seq"]
+
+    def agregar(historial):
+        # Con varios workers dos parches pueden anotarse fuera de orden
+        historial = [anterior for anterior in historial or [] if anterior.get("seq") != seq]
+        historial.append(mensaje)
+        historial.sort(key=lambda anterior: anterior["seq"])
+        return historial[-limite:]
+
+    historial_checklist.actualizar(f"establecimiento_{establecimiento_id}", agregar)
+
+
+def parches_desde(establecimiento_id: int, ultimo_seq: int, seq_actual: int) -> Optional[list]:
+    """Parches posteriores a ``ultimo_seq`` o ``None`` si el historial no cubre el hueco."""
+    if ultimo_seq == seq_actual:
+        return []
+    if ultimo_seq > seq_actual:
+        return None
+
+    historial = historial_checklist.get(f"establecimiento_{establecimiento_id}") or []
+    pendientes = [
+        mensaje for mensaje in historial if ultimo_seq < mensaje.get("seq", 0) <= seq_actual
+    ]
+    esperado = ultimo_seq + 1
+    for mensaje in pendientes:
+        if mensaje["seq"] != esperado:
+            return None
+        esperado += 1
+    return pendientes if esperado == seq_actual + 1 else None
+
+
+def datos_confirmacion(estado: Optional[dict]) -> dict:
+    """Campos de confirmación del encargado que viajan con cada parche."""
+    estado = estado or {}
+    return {
+        "confirmada_por_encargado": bool(estado.get("confirmada_por_encargado")),
+        "confirmador_nombre": estado.get("confirmador_nombre"),
+        "confirmador_rol": estado.get("confirmador_rol"),
+        "firma_data": estado.get("firma_encargado"),
+        "firma_temporal": bool(estado.get("firma_temporal")),
+    }
+
+
+def snapshot(establecimiento_id: int, estado: Optional[dict]) -> dict:
+    """Estado completo con su ``seq`` para clientes que perdieron parches."""
+    estado = estado or {}
+    return {
+        "establecimiento_id": establecimiento_id,
+        "seq": int(estado.get("seq") or 0),
+        "items": estado.get("items") or {},
+        "observaciones": estado.get("observaciones") or "",
+        "resumen": estado.get("resumen") or {},
+        "inspector_id": estado.get("inspector_id"),
+        "timestamp": estado.get("ultima_actualizacion") or estado.get("timestamp"),
+        **datos_confirmacion(estado),
+    }
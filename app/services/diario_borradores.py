@@ -0,0 +1,297 @@
+"""Diario en disco (append-only) de los borradores de inspección.
+
+Con el backend ``memoria`` los autoguardados de ``guardar_inspeccion_parcial``
+solo vivían en el proceso: un despliegue o una caída borraba todos los
+checklists en curso. ``BackendConDiario`` envuelve al backend y anota cada
+escritura de los espacios indicados como una línea JSON::
+
+    {"t": 1760000000.0, "e": "datos_tiempo_real", "k": "establecimiento_3", "v": {...}}
+
+``"v": null`` marca un borrado, también cuando el tope de bytes del backend
+expulsa la entrada, y ``"toque": true`` (sin valor) mueve la marca de una
+clave vigente cuando se renueva su TTL sin reescribirla. Las líneas se encolan en O(1) y las escribe un
+hilo aparte, así que la petición nunca espera al disco. Ese mismo hilo compacta
+el archivo (última versión de cada clave) cuando crece más de
+``ESTADO_TIEMPO_REAL_DIARIO_COMPACTAR_MB`` y al arrancar se reproduce para
+reconstruir el estado. Líneas truncadas por una caída se ignoran.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Iterable, Optional
+
+
+_FIN = object()
+
+
+def _linea(espacio: str, clave: str, valor: Any) -> str:
+    return json.dumps(
+        {"t": time.time(), "e": espacio, "k": clave, "v": valor},
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=str,
+    ) + "\n"
+
+
+def _linea_toque(espacio: str, clave: str) -> str:
+    return json.dumps(
+        {"t": time.time(), "e": espacio, "k": clave, "toque": True},
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ) + "\n"
+
+
+class DiarioBorradores:
+    """Archivo append-only con escritor y compactación en segundo plano."""
+
+    def __init__(
+        self,
+        ruta: str,
+        compactar_bytes: int = 16 * 1024 * 1024,
+        ttl_segundos: Optional[float] = None,
+    ):
+        self.ruta = os.path.abspath(ruta)
+        self.compactar_bytes = compactar_bytes
+        self.ttl_segundos = ttl_segundos or None
+        self._cola: "queue.Queue[Any]" = queue.Queue()
+        self._hilo: Optional[threading.Thread] = None
+        self._archivo = None
+        self._bytes_desde_compactacion = 0
+        self._anotadas = 0
+        self._compactaciones = 0
+        directorio = os.path.dirname(self.ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+    # ----- lectura -----
+
+    def _leer_vigentes(self) -> dict[tuple[str, str], tuple[float, Any]]:
+        """Última versión de cada clave, sin borrados ni entradas vencidas."""
+        vigentes: dict[tuple[str, str], tuple[float, Any]] = {}
+        if not os.path.exists(self.ruta):
+            return vigentes
+
+        with open(self.ruta, "r", encoding="utf-8") as archivo:
+            for linea in archivo:
+                try:
+                    registro = json.loads(linea)
+                    llave = (registro["e"], registro["k"])
+                except (ValueError, KeyError, TypeError):
+                    continue  # línea truncada o corrupta
+                if registro.get("toque"):
+                    if llave in vigentes:
+                        vigentes[llave] = (registro.get("t") or 0, vigentes[llave][1])
+                elif registro.get("v") is None:
+                    vigentes.pop(llave, None)
+                else:
+                    vigentes[llave] = (registro.get("t") or 0, registro["v"])
+
+        if self.ttl_segundos:
+            limite = time.time() - self.ttl_segundos
+            vigentes = {
+                llave: dato for llave, dato in vigentes.items() if dato[0] > limite
+            }
+        return vigentes
+
+    def reproducir(self, guardar: Callable[[str, str, Any, float], None]) -> int:
+        """Carga el diario con ``guardar(espacio, clave, valor, marca)`` y lo compacta.
+
+        ``marca`` es el momento de la escritura original: el TTL sigue contando
+        desde ahí y no desde el arranque.
+        """
+        vigentes = self._leer_vigentes()
+        for (espacio, clave), (marca, valor) in sorted(
+            vigentes.items(), key=lambda elemento: elemento[1][0]
+        ):
+            guardar(espacio, clave, valor, marca)
+        self._reescribir(vigentes)
+        return len(vigentes)
+
+    # ----- escritura -----
+
+    def anotar(self, espacio: str, clave: str, valor: Any) -> None:
+        """Encola la escritura; no toca el disco en el hilo que llama."""
+        self._cola.put(_linea(espacio, clave, valor))
+
+    def anotar_toque(self, espacio: str, clave: str) -> None:
+        """Encola la renovación del TTL de ``clave`` sin repetir su valor."""
+        self._cola.put(_linea_toque(espacio, clave))
+
+    def iniciar(self) -> None:
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        self._hilo = threading.Thread(
+            target=self._escribir, name="diario-borradores", daemon=True
+        )
+        self._hilo.start()
+        atexit.register(self.cerrar)
+
+    def _abrir(self):
+        if self._archivo is None:
+            self._archivo = open(self.ruta, "a", encoding="utf-8")
+        return self._archivo
+
+    def _escribir(self) -> None:
+        while True:
+            linea = self._cola.get()
+            if linea is _FIN:
+                break
+
+            # Escribir de una vez todo lo que se haya acumulado
+            lote = [linea]
+            terminar = False
+            while True:
+                try:
+                    siguiente = self._cola.get_nowait()
+                except queue.Empty:
+                    break
+                if siguiente is _FIN:
+                    terminar = True
+                    break
+                lote.append(siguiente)
+
+            try:
+                archivo = self._abrir()
+                texto = "".join(lote)
+                archivo.write(texto)
+                archivo.flush()
+                self._anotadas += len(lote)
+                self._bytes_desde_compactacion += len(texto.encode("utf-8"))
+                if (
+                    self.compactar_bytes
+                    and self._bytes_desde_compactacion >= self.compactar_bytes
+                ):
+                    self.compactar()
+            except Exception as exc:  # noqa: BLE001
+                print(f"⚠️ Error escribiendo diario de borradores: {exc}")
+
+            if terminar:
+                break
+
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
+
+    def _reescribir(self, vigentes: dict[tuple[str, str], tuple[float, Any]]) -> None:
+        temporal = f"{self.ruta}.tmp"
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            for (espacio, clave), (marca, valor) in vigentes.items():
+                archivo.write(
+                    json.dumps(
+                        {"t": marca, "e": espacio, "k": clave, "v": valor},
+                        ensure_ascii=False,
+                        separators=(",", ":"),
+                        default=str,
+                    )
+                    + "\n"
+                )
+            archivo.flush()
+            os.fsync(archivo.fileno())
+
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
+        os.replace(temporal, self.ruta)
+        self._bytes_desde_compactacion = 0
+
+    def compactar(self) -> None:
+        """Reescribe el diario con la última versión de cada clave (hilo escritor)."""
+        if self._archivo is not None:
+            self._archivo.flush()
+        self._reescribir(self._leer_vigentes())
+        self._compactaciones += 1
+
+    def cerrar(self) -> None:
+        if self._hilo is not None and self._hilo.is_alive():
+            self._cola.put(_FIN)
+            self._hilo.join(timeout=5)
+        self._hilo = None
+
+    def estadisticas(self) -> dict[str, Any]:
+        return {
+            "ruta": self.ruta,
+            "bytes": os.path.getsize(self.ruta) if os.path.exists(self.ruta) else 0,
+            "pendientes": self._cola.qsize(),
+            "anotadas": self._anotadas,
+            "compactaciones": self._compactaciones,
+        }
+
+
+class BackendConDiario:
+    """Envuelve un backend y anota en el diario las escrituras de ``espacios``."""
+
+    def __init__(self, backend, diario: DiarioBorradores, espacios: Iterable[str]):
+        self.backend = backend
+        self.diario = diario
+        self.espacios = frozenset(espacios)
+        # Mantiene el orden del diario igual al orden real de escritura por clave
+        self._lock = threading.RLock()
+        if hasattr(backend, "al_expulsar"):
+            backend.al_expulsar = self._anotar_expulsion
+
+    def _anotar_expulsion(self, espacio: str, clave: str) -> None:
+        if espacio in self.espacios:
+            self.diario.anotar(espacio, clave, None)
+
+    @property
+    def nombre(self) -> str:
+        return self.backend.nombre
+
+    def obtener(self, espacio: str, clave: str) -> Any:
+        return self.backend.obtener(espacio, clave)
+
+    def elementos(self, espacio: str) -> list[tuple[str, Any]]:
+        return self.backend.elementos(espacio)
+
+    def existe(self, espacio: str, clave: str) -> bool:
+        return self.backend.existe(espacio, clave)
+
+    # Las escrituras de otros espacios también toman el lock: pueden expulsar
+    # una entrada durable y esa baja debe quedar en orden en el diario
+
+    def guardar(self, espacio: str, clave: str, valor: Any) -> None:
+        with self._lock:
+            self.backend.guardar(espacio, clave, valor)
+            if espacio in self.espacios:
+                self.diario.anotar(espacio, clave, valor)
+
+    def tocar(self, espacio: str, clave: str) -> bool:
+        if espacio not in self.espacios:
+            return self.backend.tocar(espacio, clave)
+        with self._lock:
+            tocado = self.backend.tocar(espacio, clave)
+            if tocado:
+                self.diario.anotar_toque(espacio, clave)
+            return tocado
+
+    def eliminar(self, espacio: str, clave: str) -> bool:
+        if espacio not in self.espacios:
+            return self.backend.eliminar(espacio, clave)
+        with self._lock:
+            eliminado = self.backend.eliminar(espacio, clave)
+            if eliminado:
+                self.diario.anotar(espacio, clave, None)
+            return eliminado
+
+    def actualizar(self, espacio: str, clave: str, funcion) -> Any:
+        with self._lock:
+            nuevo = self.backend.actualizar(espacio, clave, funcion)
+            if espacio in self.espacios:
+                self.diario.anotar(espacio, clave, nuevo)
+            return nuevo
+
+    def barrer(self) -> int:
+        return self.backend.barrer()
+
+    def estadisticas(self) -> dict[str, Any]:
+        return {**self.backend.estadisticas(), "diario": self.diario.estadisticas()}
+
+    def cerrar(self) -> None:
+        self.diario.cerrar()
+        self.backend.cerrar()
@@ -0,0 +1,163 @@
+"""Agrupación de emisiones de Socket.IO.
+
+Guardar un checklist de 100 items emitía un ``item_actualizado`` por item a
+cada miembro de la sala. Aquí se juntan en un solo evento
+``items_actualizados``::
+
+    {
+        "inspeccion_id": 12,
+        "items": [{"item_id": 5, "rating": 3, ...}, ...],
+        "observaciones": "...",   # solo si cambiaron
+        "actualizado_por": "Inspector",
+        "timestamp": "...",
+    }
+
+- ``LoteEmisiones``: una instancia por petición. Acumula items y eventos y
+  los envía con ``enviar()`` después del commit; si la transacción falla se
+  descarta y nadie ve cambios que no quedaron guardados.
+- ``agrupador_items``: para los handlers de Socket.IO, junta lo que llega a una
+  sala durante ``SOCKETIO_VENTANA_EMISION_MS`` y lo emite en un único mensaje.
+- ``gestor_cola_socketio``: cola de mensajes con la que la app Flask publica
+  hacia el gateway asyncio (``app.socket_gateway``).
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Optional
+
+import socketio as python_socketio
+
+from app.extensions import socketio
+
+
+EVENTO_ITEMS = "items_actualizados"
+CANAL_COLA = "flask-socketio"  # canal por defecto de Flask-SocketIO
+
+
+def gestor_cola_socketio(url: str, solo_publicar: bool = False, asincrono: bool = False):
+    """Gestor de la cola de mensajes compartida por la app Flask y el gateway.
+
+    Elige la misma clase que Flask-SocketIO según el esquema de ``url``; el
+    gateway asyncio usa las variantes ``Async*``.
+    """
+    if asincrono:
+        if url.startswith(("redis://", "rediss://")):
+            return python_socketio.AsyncRedisManager(
+                url, channel=CANAL_COLA, write_only=solo_publicar
+            )
+        if url.startswith(("amqp://", "amqps://")):
+            return python_socketio.AsyncAioPikaManager(
+                url, channel=CANAL_COLA, write_only=solo_publicar
+            )
+        raise RuntimeError(
+            f"El gateway asyncio solo admite colas redis:// o amqp:// (recibido {url!r})"
+        )
+
+    if url.startswith(("redis://", "rediss://")):
+        clase = python_socketio.RedisManager
+    elif url.startswith("kafka://"):
+        clase = python_socketio.KafkaManager
+    elif url.startswith("zmq"):
+        clase = python_socketio.ZmqManager
+    else:
+        clase = python_socketio.KombuManager
+    return clase(url, channel=CANAL_COLA, write_only=solo_publicar)
+
+
+def _mensaje_items(contexto: dict, items: list) -> dict:
+    return {**contexto, "items": items}
+
+
+class LoteEmisiones:
+    """Emisiones pendientes de una petición, enviadas juntas tras el commit."""
+
+    def __init__(self):
+        self._items: dict[str, dict[str, Any]] = {}
+        self._eventos: list[tuple[str, Any, dict]] = []
+
+    def agregar_item(self, room: str, item: dict, **contexto) -> None:
+        """Anota un item para ``items_actualizados``; el último valor por item gana."""
+        pendiente = self._items.setdefault(room, {"contexto": {}, "items": {}})
+        pendiente["contexto"].update(contexto)
+        if item is not None:
+            pendiente["items"][str(item["item_id"])] = item
+
+    def emitir(self, evento: str, datos: Any, **kwargs) -> None:
+        """Encola un evento cualquiera para enviarlo en ``enviar()``."""
+        self._eventos.append((evento, datos, kwargs))
+
+    def descartar(self) -> None:
+        self._items.clear()
+        self._eventos.clear()
+
+    def enviar(self) -> int:
+        """Emite lo acumulado y devuelve cuántos mensajes salieron."""
+        enviados = 0
+        for room, pendiente in self._items.items():
+            if pendiente["items"] or pendiente["contexto"].get("observaciones") is not None:
+                socketio.emit(
+                    EVENTO_ITEMS,
+                    _mensaje_items(pendiente["contexto"], list(pendiente["items"].values())),
+                    to=room,
+                )
+                enviados += 1
+        for evento, datos, kwargs in self._eventos:
+            socketio.emit(evento, datos, **kwargs)
+            enviados += 1
+        self.descartar()
+        return enviados
+
+
+class AgrupadorItems:
+    """Junta las actualizaciones de items por sala durante una ventana de tiempo."""
+
+    def __init__(self):
+        self._pendientes: dict[tuple[str, Optional[str]], dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def agregar(
+        self,
+        room: str,
+        item: Optional[dict],
+        ventana_segundos: float,
+        skip_sid: Optional[str] = None,
+        **contexto,
+    ) -> None:
+        if ventana_segundos <= 0:
+            socketio.emit(
+                EVENTO_ITEMS,
+                _mensaje_items(contexto, [item] if item is not None else []),
+                to=room,
+                skip_sid=skip_sid,
+            )
+            return
+
+        llave = (room, skip_sid)
+        with self._lock:
+            pendiente = self._pendientes.get(llave)
+            programar = pendiente is None
+            if programar:
+                pendiente = self._pendientes[llave] = {"contexto": {}, "items": {}}
+            pendiente["contexto"].update(contexto)
+            if item is not None:
+                pendiente["items"][str(item["item_id"])] = item
+
+        if programar:
+            socketio.start_background_task(self._vaciar_tras, llave, ventana_segundos)
+
+    def _vaciar_tras(self, llave: tuple[str, Optional[str]], ventana_segundos: float) -> None:
+        socketio.sleep(ventana_segundos)
+        with self._lock:
+            pendiente = self._pendientes.pop(llave, None)
+        if pendiente:
+            room, skip_sid = llave
+            socketio.emit(
+                EVENTO_ITEMS,
+                _mensaje_items(pendiente["contexto"], list(pendiente["items"].values())),
+                to=room,
+                skip_sid=skip_sid,
+            )
+
+
+agrupador_items = AgrupadorItems()
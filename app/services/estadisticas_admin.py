@@ -0,0 +1,214 @@
+"""Instantánea de las estadísticas del dashboard de administración.
+
+El dashboard de administración hacía unas ocho consultas ``COUNT`` por visita
+(usuarios por rol, activos y en línea, establecimientos, establecimientos con
+encargado, inspecciones del mes y pendientes, jefes) más el recorrido con
+outer join de las alertas. Aquí se calculan con dos consultas de agregación
+condicional (usuarios agrupados por rol; inspecciones con subconsultas
+escalares para establecimientos, encargados y jefes) y una tercera solo si hay
+establecimientos sin encargado, para listar sus nombres.
+
+El resultado se guarda en el estado compartido (``snapshots_admin``) y un hilo
+lo renueva cada ``ADMIN_ESTADISTICAS_SEGUNDOS``: el dashboard se pinta desde
+memoria y las visitas no compiten con los endpoints de inspección. El hilo
+arranca con la primera visita y no consulta la base si nadie abrió el
+dashboard en los últimos minutos; con varios workers, el que encuentra la
+instantánea ya renovada por otro no la recalcula. Con 0 segundos no hay
+instantánea y cada visita calcula.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import and_, case, exists, func, or_, select
+
+from app.extensions import db
+from app.services.estado_compartido import estado_compartido
+
+
+_snapshots = estado_compartido.espacio("snapshots_admin")
+_CLAVE_DASHBOARD = "dashboard"
+# Sin visitas durante este tiempo el hilo deja de consultar la base
+_INACTIVIDAD_SEGUNDOS = 600
+
+
+def _contar(condicion):
+    return func.coalesce(func.sum(case((condicion, 1), else_=0)), 0)
+
+
+def calcular_estadisticas() -> dict:
+    """Estadísticas generales y alertas del sistema (dos o tres consultas)."""
+    from app.models.Inspecciones_models import (
+        EncargadoEstablecimiento,
+        Establecimiento,
+        Inspeccion,
+        JefeEstablecimiento,
+    )
+    from app.models.Usuario_models import Rol, Usuario
+
+    hoy = datetime.now().date()
+    inicio_mes = hoy.replace(day=1)
+    fecha_limite_atraso = hoy - timedelta(days=7)
+
+    usuarios = (
+        db.session.query(
+            Rol.nombre,
+            _contar(Usuario.activo == True).label("activos"),
+            _contar(Usuario.en_linea == True).label("en_linea"),
+        )
+        .select_from(Usuario)
+        .outerjoin(Rol, Rol.id == Usuario.rol_id)
+        .group_by(Rol.nombre)
+        .order_by(Rol.nombre)
+        .all()
+    )
+
+    tiene_encargado = exists().where(
+        EncargadoEstablecimiento.establecimiento_id == Establecimiento.id,
+        EncargadoEstablecimiento.activo == True,
+    )
+    pendiente = Inspeccion.estado == "pendiente"
+    totales = db.session.execute(
+        select(
+            _contar(Inspeccion.fecha >= inicio_mes).label("inspecciones_mes"),
+            _contar(pendiente).label("inspecciones_pendientes"),
+            _contar(and_(pendiente, Inspeccion.fecha <= fecha_limite_atraso)).label(
+                "inspecciones_atrasadas"
+            ),
+            select(func.count(Establecimiento.id))
+            .where(Establecimiento.activo == True)
+            .scalar_subquery()
+            .label("total_establecimientos"),
+            select(func.count(func.distinct(EncargadoEstablecimiento.establecimiento_id)))
+            .where(EncargadoEstablecimiento.activo == True)
+            .scalar_subquery()
+            .label("establecimientos_con_encargado"),
+            select(func.count(Establecimiento.id))
+            .where(Establecimiento.activo == True, ~tiene_encargado)
+            .scalar_subquery()
+            .label("establecimientos_sin_encargado"),
+            select(func.count(JefeEstablecimiento.id))
+            .where(JefeEstablecimiento.activo == True)
+            .scalar_subquery()
+            .label("total_jefes"),
+        ).where(or_(Inspeccion.fecha >= inicio_mes, pendiente))
+    ).one()
+
+    alertas = []
+    if totales.establecimientos_sin_encargado:
+        sin_encargado = [
+            nombre
+            for (nombre,) in db.session.query(Establecimiento.nombre)
+            .filter(Establecimiento.activo == True, ~tiene_encargado)
+            .all()
+        ]
+        alertas.append(
+            {
+                "tipo": "warning",
+                "titulo": "Establecimientos sin Encargado",
+                "mensaje": f"{len(sin_encargado)} establecimientos no tienen encargado asignado",
+                "detalles": sin_encargado,
+            }
+        )
+    if totales.inspecciones_atrasadas:
+        alertas.append(
+            {
+                "tipo": "danger",
+                "titulo": "Inspecciones Atrasadas",
+                "mensaje": f"{int(totales.inspecciones_atrasadas)} inspecciones pendientes por más de 7 días",
+            }
+        )
+
+    return {
+        "generado": time.time(),
+        "estadisticas": {
+            "usuarios_por_rol": {
+                nombre: int(activos) for nombre, activos, _ in usuarios if nombre and activos
+            },
+            "total_usuarios": sum(int(activos) for _, activos, _ in usuarios),
+            "total_establecimientos": int(totales.total_establecimientos or 0),
+            "establecimientos_con_encargado": int(totales.establecimientos_con_encargado or 0),
+            "inspecciones_mes": int(totales.inspecciones_mes),
+            "inspecciones_pendientes": int(totales.inspecciones_pendientes),
+            "usuarios_en_linea": sum(int(en_linea) for _, _, en_linea in usuarios),
+            "total_jefes": int(totales.total_jefes or 0),
+        },
+        "alertas": alertas,
+    }
+
+
+class SnapshotAdmin:
+    """Instantánea compartida del dashboard, renovada por un hilo del worker."""
+
+    def __init__(self, intervalo_segundos: int = 60):
+        self.intervalo_segundos = intervalo_segundos
+        self._ultimo_uso = 0.0
+        self._hilo: Optional[threading.Thread] = None
+        self._detener = threading.Event()
+        self._lock = threading.Lock()
+
+    def _vigente(self, snapshot: Optional[dict]) -> bool:
+        return (
+            snapshot is not None
+            and time.time() - snapshot.get("generado", 0) < self.intervalo_segundos
+        )
+
+    def refrescar(self) -> dict:
+        snapshot = calcular_estadisticas()
+        _snapshots[_CLAVE_DASHBOARD] = snapshot
+        return snapshot
+
+    def obtener(self, app) -> dict:
+        """Instantánea actual; calcula solo si no hay o quedó vieja por inactividad."""
+        if self.intervalo_segundos <= 0:
+            return calcular_estadisticas()
+
+        self._ultimo_uso = time.monotonic()
+        self._iniciar(app)
+        snapshot = _snapshots.get(_CLAVE_DASHBOARD)
+        if (
+            snapshot is None
+            or time.time() - snapshot.get("generado", 0) > 2 * self.intervalo_segundos
+        ):
+            snapshot = self.refrescar()
+        return snapshot
+
+    def _iniciar(self, app) -> None:
+        with self._lock:
+            if self._hilo is not None and self._hilo.is_alive():
+                return
+            self._detener.clear()
+            self._hilo = threading.Thread(
+                target=self._bucle, args=(app,), name="snapshot-admin", daemon=True
+            )
+            self._hilo.start()
+
+    def _bucle(self, app) -> None:
+        while not self._detener.wait(self.intervalo_segundos):
+            if time.monotonic() - self._ultimo_uso > _INACTIVIDAD_SEGUNDOS:
+                continue
+            with app.app_context():
+                try:
+                    if not self._vigente(_snapshots.get(_CLAVE_DASHBOARD)):
+                        self.refrescar()
+                except Exception as exc:  # noqa: BLE001
+                    app.logger.warning("No se pudo renovar el snapshot admin: %s", exc)
+                finally:
+                    db.session.remove()
+
+    def detener(self) -> None:
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=1)
+            self._hilo = None
+
+
+snapshot_admin = SnapshotAdmin()
+
+
+def init_app(app) -> None:
+    snapshot_admin.intervalo_segundos = app.config.get("ADMIN_ESTADISTICAS_SEGUNDOS", 60)
@@ -0,0 +1,236 @@
+"""Contadores de un establecimiento en una sola consulta.
+
+La API de estadísticas del inspector (``/api/establecimientos/<id>/estadisticas``)
+hacía siete ``COUNT`` separados (inspecciones totales y por estado, recientes,
+encargados, jefes, items) y el dashboard y el reporte del jefe repetían casi
+lo mismo: el reporte ejecutaba la misma agregación tres veces para el mes, el
+trimestre y el año. Aquí se calculan todos los contadores con una consulta de
+agregación condicional sobre las inspecciones del establecimiento, unida a la
+agregación de sus encargados y con subconsultas escalares para jefes e items.
+
+El resultado se guarda por establecimiento en el estado compartido
+(``estadisticas_establecimiento``) durante
+``ESTADISTICAS_ESTABLECIMIENTO_TTL_SEGUNDOS`` y como mucho hasta el fin del
+día (los periodos se cuentan desde hoy). Un commit que crea, borra o cambia
+el estado, la fecha o el cumplimiento de una inspección, o que toca sus
+encargados, jefes o items, descarta la entrada de ese establecimiento en
+todos los workers.
+"""
+
+from __future__ import annotations
+
+import time
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, case, event, func, inspect as inspeccionar_instancia, select, true
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.services.estado_compartido import estado_compartido
+
+
+_estadisticas = estado_compartido.espacio("estadisticas_establecimiento")
+_MARCA_SESION = "invalidar_estadisticas_establecimiento"
+# Días hacia atrás (sin contar el límite) de cada periodo del reporte del jefe
+PERIODOS_REPORTE = (("mes", 30), ("trimestre", 90), ("año", 365))
+DIAS_RECIENTES = 30
+# Campos de la inspección que cambian algún contador
+_CAMPOS_INSPECCION = ("establecimiento_id", "estado", "fecha", "porcentaje_cumplimiento")
+
+
+def _contar(condicion):
+    return func.coalesce(func.sum(case((condicion, 1), else_=0)), 0)
+
+
+def _promedio(condicion, valor):
+    return func.avg(case((condicion, valor), else_=None))
+
+
+def _redondear(valor) -> float:
+    return round(float(valor or 0), 1)
+
+
+def calcular_estadisticas_establecimiento(establecimiento_id: int) -> dict:
+    """Todos los contadores de un establecimiento (una consulta)."""
+    from app.models.Inspecciones_models import (
+        EncargadoEstablecimiento,
+        Inspeccion,
+        ItemEvaluacionEstablecimiento,
+        JefeEstablecimiento,
+    )
+
+    hoy = date.today()
+    inicio_mes = hoy.replace(day=1)
+    limite_recientes = datetime.utcnow() - timedelta(days=DIAS_RECIENTES)
+    completada = Inspeccion.estado == "completada"
+    del_mes = Inspeccion.fecha >= inicio_mes
+
+    columnas = [
+        func.count(Inspeccion.id).label("total"),
+        _contar(Inspeccion.estado == "pendiente").label("pendientes"),
+        _contar(Inspeccion.estado == "en_proceso").label("en_proceso"),
+        _contar(completada).label("completadas"),
+        _contar(Inspeccion.created_at >= limite_recientes).label("recientes"),
+        # Mes calendario (dashboard del jefe); "mes" de PERIODOS_REPORTE son 30 días
+        _contar(del_mes).label("del_mes"),
+        _promedio(and_(completada, del_mes), Inspeccion.porcentaje_cumplimiento).label(
+            "promedio_del_mes"
+        ),
+    ]
+    for nombre, dias in PERIODOS_REPORTE:
+        en_periodo = Inspeccion.fecha > hoy - timedelta(days=dias)
+        columnas += [
+            _contar(en_periodo).label(f"total_{nombre}"),
+            _contar(and_(en_periodo, completada)).label(f"completadas_{nombre}"),
+            _promedio(and_(en_periodo, completada), Inspeccion.porcentaje_cumplimiento).label(
+                f"promedio_{nombre}"
+            ),
+        ]
+    inspecciones = (
+        select(*columnas).where(Inspeccion.establecimiento_id == establecimiento_id).subquery()
+    )
+
+    activo = EncargadoEstablecimiento.activo == True
+    encargados = (
+        select(
+            func.count(EncargadoEstablecimiento.id).label("encargados_total"),
+            _contar(activo).label("encargados_activos"),
+            _contar(EncargadoEstablecimiento.activo == False).label("encargados_inactivos"),
+            _contar(
+                and_(activo, EncargadoEstablecimiento.fecha_habilitacion.isnot(None))
+            ).label("firmas_registradas"),
+            _contar(
+                and_(activo, EncargadoEstablecimiento.fecha_habilitacion.is_(None))
+            ).label("firmas_pendientes"),
+        )
+        .where(EncargadoEstablecimiento.establecimiento_id == establecimiento_id)
+        .subquery()
+    )
+
+    # Cada subconsulta agregada devuelve una sola fila: el join es 1 x 1
+    fila = db.session.execute(
+        select(
+            inspecciones,
+            encargados,
+            select(func.count(JefeEstablecimiento.id))
+            .where(JefeEstablecimiento.establecimiento_id == establecimiento_id)
+            .scalar_subquery()
+            .label("jefes"),
+            select(func.count(ItemEvaluacionEstablecimiento.id))
+            .where(ItemEvaluacionEstablecimiento.establecimiento_id == establecimiento_id)
+            .scalar_subquery()
+            .label("evaluaciones"),
+        ).select_from(inspecciones.join(encargados, true()))
+    ).one()
+
+    return {
+        "inspecciones": {
+            "total": int(fila.total),
+            "pendientes": int(fila.pendientes),
+            "en_proceso": int(fila.en_proceso),
+            "completadas": int(fila.completadas),
+            "recientes": int(fila.recientes),
+            "mes": int(fila.del_mes),
+            "promedio_cumplimiento_mes": _redondear(fila.promedio_del_mes),
+        },
+        "periodos": {
+            nombre: {
+                "total_inspecciones": int(getattr(fila, f"total_{nombre}")),
+                "completadas": int(getattr(fila, f"completadas_{nombre}")),
+                "promedio_cumplimiento": _redondear(getattr(fila, f"promedio_{nombre}")),
+            }
+            for nombre, _ in PERIODOS_REPORTE
+        },
+        "encargados": {
+            "total": int(fila.encargados_total or 0),
+            "activos": int(fila.encargados_activos or 0),
+            "inactivos": int(fila.encargados_inactivos or 0),
+            "firmas_registradas": int(fila.firmas_registradas or 0),
+            "firmas_pendientes": int(fila.firmas_pendientes or 0),
+        },
+        "jefes": int(fila.jefes or 0),
+        "evaluaciones": int(fila.evaluaciones or 0),
+    }
+
+
+def estadisticas_establecimiento(establecimiento_id: int) -> dict:
+    """Contadores del establecimiento, desde el estado compartido si siguen vigentes.
+
+    Incluye ``generado`` (epoch) con el momento del cálculo.
+    """
+    clave = str(establecimiento_id)
+    hoy = date.today().isoformat()
+    ttl_segundos = current_app.config.get("ESTADISTICAS_ESTABLECIMIENTO_TTL_SEGUNDOS", 300)
+    if ttl_segundos > 0:
+        guardado = _estadisticas.get(clave)
+        if (
+            guardado is not None
+            and guardado.get("dia") == hoy
+            and time.time() - guardado.get("generado", 0) < ttl_segundos
+        ):
+            return guardado
+
+    resultado = calcular_estadisticas_establecimiento(establecimiento_id)
+    resultado["generado"] = time.time()
+    resultado["dia"] = hoy
+    if ttl_segundos > 0:
+        _estadisticas[clave] = resultado
+    return resultado
+
+
+def invalidar(establecimiento_id: int) -> None:
+    _estadisticas.descartar(str(establecimiento_id))
+
+
+def _establecimientos(instancia) -> set:
+    """Establecimiento actual y anterior de una instancia."""
+    historial = inspeccionar_instancia(instancia).attrs.establecimiento_id.history
+    valores = {*historial.unchanged, *historial.added, *historial.deleted}
+    if not valores:
+        valores = {instancia.establecimiento_id}
+    return valores - {None}
+
+
+def _cambia_contadores(session, instancia) -> bool:
+    from app.models.Inspecciones_models import Inspeccion
+
+    if not isinstance(instancia, Inspeccion) or instancia not in session.dirty:
+        return True
+    estado = inspeccionar_instancia(instancia)
+    return any(estado.attrs[campo].history.has_changes() for campo in _CAMPOS_INSPECCION)
+
+
+def _marcar_establecimientos(session, flush_context, instancias) -> None:
+    from app.models.Inspecciones_models import (
+        EncargadoEstablecimiento,
+        Inspeccion,
+        ItemEvaluacionEstablecimiento,
+        JefeEstablecimiento,
+    )
+
+    modelos = (Inspeccion, EncargadoEstablecimiento, JefeEstablecimiento, ItemEvaluacionEstablecimiento)
+    afectados = set()
+    for instancia in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instancia, modelos) and _cambia_contadores(session, instancia):
+            afectados |= _establecimientos(instancia)
+    if afectados:
+        session.info.setdefault(_MARCA_SESION, set()).update(afectados)
+
+
+def _invalidar_tras_commit(session) -> None:
+    for establecimiento_id in session.info.pop(_MARCA_SESION, ()):
+        invalidar(establecimiento_id)
+
+
+def _descartar_marca(session, transaction) -> None:
+    if transaction.parent is None:
+        session.info.pop(_MARCA_SESION, None)
+
+
+def init_app(app) -> None:
+    if event.contains(Session, "before_flush", _marcar_establecimientos):
+        return
+    event.listen(Session, "before_flush", _marcar_establecimientos)
+    event.listen(Session, "after_commit", _invalidar_tras_commit)
+    event.listen(Session, "after_transaction_end", _descartar_marca)
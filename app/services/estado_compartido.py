@@ -0,0 +1,657 @@
+"""Almacén compartido para el estado vivo de las inspecciones.
+
+Reemplaza los diccionarios de módulo ``inspecciones_temporales`` y
+``datos_tiempo_real``. Cada uno es un *espacio* (vista tipo dict) sobre un
+backend intercambiable:
+
+- ``memoria``: diccionario del proceso protegido con un lock (un solo worker).
+- ``sqlite``: archivo SQLite en modo WAL compartido por todos los workers de
+  gunicorn del mismo host, sin servicios externos.
+
+Los valores deben ser serializables a JSON. Como el backend puede vivir fuera
+del proceso, mutar un valor leído no lo persiste: para leer-modificar-escribir
+se usa ``espacio.actualizar(clave, funcion)``, que es atómico en ambos backends.
+
+Con ``memoria`` los espacios de ``ESPACIOS_DURABLES`` se anotan además en un
+diario en disco (``ESTADO_TIEMPO_REAL_DIARIO``) que se reproduce al arrancar.
+
+Las entradas caducan ``ESTADO_TIEMPO_REAL_TTL_MINUTOS`` después de su última
+escritura (o de ``espacio.tocar(clave)``) y el total se limita a ``ESTADO_TIEMPO_REAL_MAX_MB`` expulsando las
+menos usadas. Un hilo en segundo plano purga las vencidas; los contadores se
+consultan con ``estado_compartido.estadisticas()``.
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+from app.services.diario_borradores import BackendConDiario, DiarioBorradores
+
+
+BACKEND_MEMORIA = "memoria"
+BACKEND_SQLITE = "sqlite"
+
+# Espacios que deben sobrevivir a un reinicio (borradores y checklist en vivo)
+ESPACIOS_DURABLES = ("inspecciones_temporales", "datos_tiempo_real")
+
+_SIN_VALOR = object()
+
+
+def _serializar(valor: Any) -> str:
+    return json.dumps(valor, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+class _Entrada:
+    __slots__ = ("texto", "tamano", "expira")
+
+    def __init__(self, texto: str, expira: Optional[float]):
+        self.texto = texto
+        self.tamano = len(texto.encode("utf-8"))
+        self.expira = expira
+
+
+class BackendMemoria:
+    """Backend en memoria del proceso. Solo es coherente con un worker.
+
+    Guarda cada valor serializado, con TTL desde su última escritura y
+    expulsión LRU cuando el total supera ``max_bytes``. ``al_expulsar``
+    recibe ``(espacio, clave)`` de cada entrada expulsada.
+    """
+
+    nombre = BACKEND_MEMORIA
+
+    def __init__(self, ttl_segundos: Optional[float] = None, max_bytes: Optional[int] = None):
+        self.ttl_segundos = ttl_segundos or None
+        self.max_bytes = max_bytes or None
+        self._entradas: OrderedDict[tuple[str, str], _Entrada] = OrderedDict()
+        self._bytes = 0
+        self._expulsiones = 0
+        self._expiraciones = 0
+        self._lock = threading.RLock()
+        self.al_expulsar: Optional[Callable[[str, str], None]] = None
+
+    def _vigente(self, llave: tuple[str, str], ahora: float) -> Optional[_Entrada]:
+        entrada = self._entradas.get(llave)
+        if entrada is None:
+            return None
+        if entrada.expira is not None and entrada.expira <= ahora:
+            self._quitar(llave)
+            self._expiraciones += 1
+            return None
+        self._entradas.move_to_end(llave)
+        return entrada
+
+    def _quitar(self, llave: tuple[str, str]) -> bool:
+        entrada = self._entradas.pop(llave, None)
+        if entrada is None:
+            return False
+        self._bytes -= entrada.tamano
+        return True
+
+    def obtener(self, espacio: str, clave: str) -> Any:
+        with self._lock:
+            entrada = self._vigente((espacio, clave), time.time())
+            return _SIN_VALOR if entrada is None else json.loads(entrada.texto)
+
+    def guardar(
+        self, espacio: str, clave: str, valor: Any, escrito: Optional[float] = None
+    ) -> None:
+        """Guarda ``valor``; ``escrito`` (epoch) fija desde cuándo corre el TTL.
+
+        Por defecto es ahora; al reproducir el diario se pasa la marca original
+        para que reiniciar el proceso no prolongue la vida de las entradas.
+        """
+        texto = _serializar(valor)
+        with self._lock:
+            llave = (espacio, clave)
+            self._quitar(llave)
+            if escrito is None:
+                escrito = time.time()
+            expira = escrito + self.ttl_segundos if self.ttl_segundos else None
+            entrada = _Entrada(texto, expira)
+            self._entradas[llave] = entrada
+            self._bytes += entrada.tamano
+
+            # LRU: la entrada recién escrita nunca se expulsa
+            while self.max_bytes and self._bytes > self.max_bytes and len(self._entradas) > 1:
+                llave_antigua = next(iter(self._entradas))
+                self._quitar(llave_antigua)
+                self._expulsiones += 1
+                if self.al_expulsar is not None:
+                    self.al_expulsar(*llave_antigua)
+
+    def tocar(self, espacio: str, clave: str) -> bool:
+        """Reinicia el TTL de la entrada sin reescribirla. Devuelve si existía."""
+        with self._lock:
+            ahora = time.time()
+            entrada = self._vigente((espacio, clave), ahora)
+            if entrada is None:
+                return False
+            if self.ttl_segundos:
+                entrada.expira = ahora + self.ttl_segundos
+            return True
+
+    def existe(self, espacio: str, clave: str) -> bool:
+        with self._lock:
+            entrada = self._entradas.get((espacio, clave))
+            return entrada is not None and (
+                entrada.expira is None or entrada.expira > time.time()
+            )
+
+    def eliminar(self, espacio: str, clave: str) -> bool:
+        with self._lock:
+            return self._quitar((espacio, clave))
+
+    def elementos(self, espacio: str) -> list[tuple[str, Any]]:
+        with self._lock:
+            ahora = time.time()
+            return [
+                (clave, json.loads(entrada.texto))
+                for (espacio_entrada, clave), entrada in list(self._entradas.items())
+                if espacio_entrada == espacio
+                and (entrada.expira is None or entrada.expira > ahora)
+            ]
+
+    def actualizar(
+        self, espacio: str, clave: str, funcion: Callable[[Optional[Any]], Any]
+    ) -> Any:
+        with self._lock:
+            actual = self.obtener(espacio, clave)
+            nuevo = funcion(None if actual is _SIN_VALOR else actual)
+            if nuevo is None:
+                self.eliminar(espacio, clave)
+            else:
+                self.guardar(espacio, clave, nuevo)
+            return copy.deepcopy(nuevo)
+
+    def barrer(self) -> int:
+        """Elimina las entradas vencidas. Devuelve cuántas se quitaron."""
+        with self._lock:
+            ahora = time.time()
+            vencidas = [
+                llave
+                for llave, entrada in self._entradas.items()
+                if entrada.expira is not None and entrada.expira <= ahora
+            ]
+            for llave in vencidas:
+                self._quitar(llave)
+            self._expiraciones += len(vencidas)
+            return len(vencidas)
+
+    def estadisticas(self) -> dict[str, Any]:
+        with self._lock:
+            por_espacio: dict[str, int] = {}
+            for espacio, _ in self._entradas:
+                por_espacio[espacio] = por_espacio.get(espacio, 0) + 1
+            return {
+                "backend": self.nombre,
+                "entradas": len(self._entradas),
+                "entradas_por_espacio": por_espacio,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_segundos": self.ttl_segundos,
+                "expulsiones": self._expulsiones,
+                "expiraciones": self._expiraciones,
+            }
+
+    def cerrar(self) -> None:
+        pass
+
+
+class BackendSQLite:
+    """Backend sobre un archivo SQLite en modo WAL.
+
+    Cada hilo mantiene su propia conexión. Las escrituras de
+    ``actualizar`` se hacen dentro de ``BEGIN IMMEDIATE`` para que dos
+    workers no pisen el mismo estado. El TTL se mide con la columna
+    ``actualizado``; el tope de bytes expulsa las filas menos recientes.
+    El tamaño de cada fila va en ``tamano`` y unos triggers llevan el total
+    en ``estado_compartido_bytes`` dentro de la misma transacción, así el
+    tope no recorre la tabla en cada escritura.
+    """
+
+    nombre = BACKEND_SQLITE
+
+    def __init__(
+        self,
+        ruta: str,
+        timeout_segundos: float = 5.0,
+        ttl_segundos: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        self.ruta = os.path.abspath(ruta)
+        self.timeout_segundos = timeout_segundos
+        self.ttl_segundos = ttl_segundos or None
+        self.max_bytes = max_bytes or None
+        self._local = threading.local()
+        # Contadores del proceso actual; los demás workers llevan los suyos
+        self._expulsiones = 0
+        self._expiraciones = 0
+        self._lock_contadores = threading.Lock()
+        directorio = os.path.dirname(self.ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self._crear_esquema()
+
+    def _conexion(self) -> sqlite3.Connection:
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is not None and getattr(self._local, "pid", None) == os.getpid():
+            return conexion
+
+        conexion = sqlite3.connect(
+            self.ruta,
+            timeout=self.timeout_segundos,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.execute("PRAGMA synchronous=NORMAL")
+        conexion.execute(f"PRAGMA busy_timeout={int(self.timeout_segundos * 1000)}")
+        self._local.conexion = conexion
+        self._local.pid = os.getpid()
+        return conexion
+
+    def _crear_esquema(self) -> None:
+        def crear(conexion: sqlite3.Connection) -> None:
+            conexion.execute(
+                """
+                CREATE TABLE IF NOT EXISTS estado_compartido (
+                    espacio TEXT NOT NULL,
+                    clave TEXT NOT NULL,
+                    valor TEXT NOT NULL,
+                    actualizado REAL NOT NULL,
+                    tamano INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (espacio, clave)
+                )
+                """
+            )
+            conexion.execute(
+                "CREATE INDEX IF NOT EXISTS idx_estado_compartido_actualizado "
+                "ON estado_compartido (actualizado)"
+            )
+            columnas = {fila[1] for fila in conexion.execute("PRAGMA table_info(estado_compartido)")}
+            if "tamano" not in columnas:
+                # Archivo creado por una versión sin la columna
+                conexion.execute(
+                    "ALTER TABLE estado_compartido ADD COLUMN tamano INTEGER NOT NULL DEFAULT 0"
+                )
+                conexion.execute(
+                    "UPDATE estado_compartido SET tamano = LENGTH(CAST(valor AS BLOB))"
+                )
+
+            conexion.execute(
+                """
+                CREATE TABLE IF NOT EXISTS estado_compartido_bytes (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    total INTEGER NOT NULL
+                )
+                """
+            )
+            conexion.execute(
+                "INSERT OR IGNORE INTO estado_compartido_bytes (id, total) "
+                "SELECT 1, COALESCE(SUM(tamano), 0) FROM estado_compartido"
+            )
+            for nombre, evento, ajuste in (
+                ("estado_compartido_bytes_alta", "INSERT", "+ NEW.tamano"),
+                ("estado_compartido_bytes_baja", "DELETE", "- OLD.tamano"),
+                ("estado_compartido_bytes_cambio", "UPDATE OF tamano", "+ NEW.tamano - OLD.tamano"),
+            ):
+                conexion.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS {nombre} AFTER {evento} ON estado_compartido "
+                    f"BEGIN UPDATE estado_compartido_bytes SET total = total {ajuste} WHERE id = 1; END"
+                )
+
+        # Varios workers pueden arrancar a la vez sobre el mismo archivo
+        self._en_transaccion(crear)
+
+    def _limite_vigencia(self) -> float:
+        return time.time() - self.ttl_segundos if self.ttl_segundos else float("-inf")
+
+    def _contar(self, expulsiones: int = 0, expiraciones: int = 0) -> None:
+        if expulsiones or expiraciones:
+            with self._lock_contadores:
+                self._expulsiones += expulsiones
+                self._expiraciones += expiraciones
+
+    def _leer(self, conexion: sqlite3.Connection, espacio: str, clave: str) -> Any:
+        fila = conexion.execute(
+            "SELECT valor FROM estado_compartido "
+            "WHERE espacio = ? AND clave = ? AND actualizado > ?",
+            (espacio, clave, self._limite_vigencia()),
+        ).fetchone()
+        return _SIN_VALOR if fila is None else json.loads(fila[0])
+
+    def _escribir(
+        self, conexion: sqlite3.Connection, espacio: str, clave: str, valor: Any
+    ) -> None:
+        texto = _serializar(valor)
+        conexion.execute(
+            """
+            INSERT INTO estado_compartido (espacio, clave, valor, actualizado, tamano)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(espacio, clave) DO UPDATE SET
+                valor = excluded.valor,
+                actualizado = excluded.actualizado,
+                tamano = excluded.tamano
+            """,
+            (espacio, clave, texto, time.time(), len(texto.encode("utf-8"))),
+        )
+        if self.max_bytes:
+            self._aplicar_tope(conexion, espacio, clave)
+
+    def _aplicar_tope(
+        self, conexion: sqlite3.Connection, espacio: str, clave: str
+    ) -> None:
+        (total,) = conexion.execute(
+            "SELECT total FROM estado_compartido_bytes WHERE id = 1"
+        ).fetchone()
+        exceso = total - self.max_bytes
+        expulsadas = 0
+        while exceso > 0:
+            # Por tandas, en orden del índice de ``actualizado``
+            filas = conexion.execute(
+                "SELECT espacio, clave, tamano FROM estado_compartido "
+                "WHERE NOT (espacio = ? AND clave = ?) ORDER BY actualizado LIMIT 32",
+                (espacio, clave),
+            ).fetchall()
+            if not filas:
+                break
+            for espacio_fila, clave_fila, tamano in filas:
+                conexion.execute(
+                    "DELETE FROM estado_compartido WHERE espacio = ? AND clave = ?",
+                    (espacio_fila, clave_fila),
+                )
+                exceso -= tamano
+                expulsadas += 1
+                if exceso <= 0:
+                    break
+        self._contar(expulsiones=expulsadas)
+
+    def _en_transaccion(self, operacion: Callable[[sqlite3.Connection], Any]) -> Any:
+        conexion = self._conexion()
+        conexion.execute("BEGIN IMMEDIATE")
+        try:
+            resultado = operacion(conexion)
+            conexion.execute("COMMIT")
+        except Exception:
+            conexion.execute("ROLLBACK")
+            raise
+        return resultado
+
+    def obtener(self, espacio: str, clave: str) -> Any:
+        return self._leer(self._conexion(), espacio, clave)
+
+    def existe(self, espacio: str, clave: str) -> bool:
+        fila = self._conexion().execute(
+            "SELECT 1 FROM estado_compartido "
+            "WHERE espacio = ? AND clave = ? AND actualizado > ?",
+            (espacio, clave, self._limite_vigencia()),
+        ).fetchone()
+        return fila is not None
+
+    def guardar(self, espacio: str, clave: str, valor: Any) -> None:
+        if self.max_bytes:
+            self._en_transaccion(lambda conexion: self._escribir(conexion, espacio, clave, valor))
+        else:
+            self._escribir(self._conexion(), espacio, clave, valor)
+
+    def tocar(self, espacio: str, clave: str) -> bool:
+        cursor = self._conexion().execute(
+            "UPDATE estado_compartido SET actualizado = ? "
+            "WHERE espacio = ? AND clave = ? AND actualizado > ?",
+            (time.time(), espacio, clave, self._limite_vigencia()),
+        )
+        return cursor.rowcount > 0
+
+    def eliminar(self, espacio: str, clave: str) -> bool:
+        cursor = self._conexion().execute(
+            "DELETE FROM estado_compartido WHERE espacio = ? AND clave = ?",
+            (espacio, clave),
+        )
+        return cursor.rowcount > 0
+
+    def elementos(self, espacio: str) -> list[tuple[str, Any]]:
+        filas = self._conexion().execute(
+            "SELECT clave, valor FROM estado_compartido WHERE espacio = ? AND actualizado > ?",
+            (espacio, self._limite_vigencia()),
+        ).fetchall()
+        return [(clave, json.loads(valor)) for clave, valor in filas]
+
+    def actualizar(
+        self, espacio: str, clave: str, funcion: Callable[[Optional[Any]], Any]
+    ) -> Any:
+        def operacion(conexion: sqlite3.Connection) -> Any:
+            actual = self._leer(conexion, espacio, clave)
+            nuevo = funcion(None if actual is _SIN_VALOR else actual)
+            if nuevo is None:
+                conexion.execute(
+                    "DELETE FROM estado_compartido WHERE espacio = ? AND clave = ?",
+                    (espacio, clave),
+                )
+            else:
+                self._escribir(conexion, espacio, clave, nuevo)
+            return nuevo
+
+        return self._en_transaccion(operacion)
+
+    def barrer(self) -> int:
+        """Elimina las filas vencidas. Devuelve cuántas se quitaron."""
+        if not self.ttl_segundos:
+            return 0
+        cursor = self._conexion().execute(
+            "DELETE FROM estado_compartido WHERE actualizado <= ?",
+            (self._limite_vigencia(),),
+        )
+        self._contar(expiraciones=cursor.rowcount)
+        return cursor.rowcount
+
+    def estadisticas(self) -> dict[str, Any]:
+        filas = self._conexion().execute(
+            "SELECT espacio, COUNT(*), COALESCE(SUM(tamano), 0) "
+            "FROM estado_compartido GROUP BY espacio"
+        ).fetchall()
+        with self._lock_contadores:
+            expulsiones, expiraciones = self._expulsiones, self._expiraciones
+        return {
+            "backend": self.nombre,
+            "ruta": self.ruta,
+            "entradas": sum(fila[1] for fila in filas),
+            "entradas_por_espacio": {fila[0]: fila[1] for fila in filas},
+            "bytes": sum(fila[2] for fila in filas),
+            "max_bytes": self.max_bytes,
+            "ttl_segundos": self.ttl_segundos,
+            "expulsiones": expulsiones,
+            "expiraciones": expiraciones,
+        }
+
+    def cerrar(self) -> None:
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is not None:
+            conexion.close()
+            self._local.conexion = None
+
+
+class EspacioEstado:
+    """Vista tipo diccionario sobre un espacio del backend configurado."""
+
+    def __init__(self, almacen: "AlmacenEstado", nombre: str):
+        self._almacen = almacen
+        self.nombre = nombre
+
+    @property
+    def _backend(self):
+        return self._almacen.backend
+
+    def get(self, clave: str, default: Any = None) -> Any:
+        valor = self._backend.obtener(self.nombre, clave)
+        return default if valor is _SIN_VALOR else valor
+
+    def __getitem__(self, clave: str) -> Any:
+        valor = self._backend.obtener(self.nombre, clave)
+        if valor is _SIN_VALOR:
+            raise KeyError(clave)
+        return valor
+
+    def __setitem__(self, clave: str, valor: Any) -> None:
+        self._backend.guardar(self.nombre, clave, valor)
+
+    def __delitem__(self, clave: str) -> None:
+        if not self._backend.eliminar(self.nombre, clave):
+            raise KeyError(clave)
+
+    def __contains__(self, clave: str) -> bool:
+        return self._backend.existe(self.nombre, clave)
+
+    def pop(self, clave: str, default: Any = None) -> Any:
+        valor = self._backend.obtener(self.nombre, clave)
+        if valor is _SIN_VALOR:
+            return default
+        self._backend.eliminar(self.nombre, clave)
+        return valor
+
+    def tocar(self, clave: str) -> bool:
+        """Reinicia la caducidad de ``clave`` sin reescribir su valor.
+
+        Devuelve ``False`` si la clave no existe (o ya venció).
+        """
+        return self._backend.tocar(self.nombre, clave)
+
+    def descartar(self, clave: str) -> None:
+        """Elimina ``clave`` si existe, sin leer su valor."""
+        self._backend.eliminar(self.nombre, clave)
+
+    def items(self) -> list[tuple[str, Any]]:
+        return self._backend.elementos(self.nombre)
+
+    def keys(self) -> list[str]:
+        return [clave for clave, _ in self.items()]
+
+    def actualizar(
+        self, clave: str, funcion: Callable[[Optional[Any]], Any]
+    ) -> Any:
+        """Lee, transforma y guarda ``clave`` de forma atómica.
+
+        ``funcion`` recibe una copia del valor actual (o ``None``) y devuelve el
+        nuevo valor; si devuelve ``None`` la clave se elimina.
+        """
+        return self._backend.actualizar(self.nombre, clave, funcion)
+
+
+class AlmacenEstado:
+    """Punto único de configuración de los espacios de estado compartido."""
+
+    def __init__(self):
+        self.backend = BackendMemoria()
+        self._espacios: dict[str, EspacioEstado] = {}
+        self._barrido_hilo: Optional[threading.Thread] = None
+        self._barrido_detener = threading.Event()
+
+    def espacio(self, nombre: str) -> EspacioEstado:
+        if nombre not in self._espacios:
+            self._espacios[nombre] = EspacioEstado(self, nombre)
+        return self._espacios[nombre]
+
+    def configurar(self, backend) -> None:
+        anterior = self.backend
+        self.backend = backend
+        if anterior is not backend:
+            anterior.cerrar()
+
+    def barrer(self) -> int:
+        return self.backend.barrer()
+
+    def estadisticas(self) -> dict[str, Any]:
+        return self.backend.estadisticas()
+
+    def iniciar_barrido(self, intervalo_segundos: float) -> None:
+        """Arranca (una sola vez por proceso) el hilo que purga entradas vencidas."""
+        if intervalo_segundos <= 0:
+            return
+        if self._barrido_hilo is not None and self._barrido_hilo.is_alive():
+            return
+
+        self._barrido_detener.clear()
+
+        def _bucle():
+            while not self._barrido_detener.wait(intervalo_segundos):
+                try:
+                    self.barrer()
+                except Exception as exc:  # noqa: BLE001
+                    print(f"⚠️ Error barriendo estado compartido: {exc}")
+
+        self._barrido_hilo = threading.Thread(
+            target=_bucle, name="estado-compartido-barrido", daemon=True
+        )
+        self._barrido_hilo.start()
+
+    def detener_barrido(self) -> None:
+        self._barrido_detener.set()
+        if self._barrido_hilo is not None:
+            self._barrido_hilo.join(timeout=1)
+            self._barrido_hilo = None
+
+    def _configurar_memoria(self, app, ttl_segundos, max_bytes) -> None:
+        actual = self.backend
+        memoria = actual.backend if isinstance(actual, BackendConDiario) else actual
+        if isinstance(memoria, BackendMemoria):
+            memoria.ttl_segundos = ttl_segundos
+            memoria.max_bytes = max_bytes
+        else:
+            memoria = BackendMemoria(ttl_segundos=ttl_segundos, max_bytes=max_bytes)
+
+        # SQLite ya persiste en disco; el diario solo hace falta en memoria
+        if not app.config.get("ESTADO_TIEMPO_REAL_DIARIO") or app.config.get("TESTING"):
+            self.configurar(memoria)
+            return
+        if isinstance(actual, BackendConDiario):
+            return
+
+        diario = DiarioBorradores(
+            app.config["ESTADO_TIEMPO_REAL_DIARIO_RUTA"],
+            compactar_bytes=(app.config.get("ESTADO_TIEMPO_REAL_DIARIO_COMPACTAR_MB") or 0) * 1024 * 1024,
+            ttl_segundos=ttl_segundos,
+        )
+        # Antes de reproducir: lo que el tope expulse al cargar también se anota
+        con_diario = BackendConDiario(memoria, diario, ESPACIOS_DURABLES)
+        recuperadas = diario.reproducir(memoria.guardar)
+        if recuperadas:
+            print(f"📒 Estado vivo recuperado del diario: {recuperadas} entradas")
+        diario.iniciar()
+        self.configurar(con_diario)
+
+    def init_app(self, app) -> None:
+        tipo = (app.config.get("ESTADO_TIEMPO_REAL_BACKEND") or BACKEND_MEMORIA).lower()
+        ttl_minutos = app.config.get("ESTADO_TIEMPO_REAL_TTL_MINUTOS") or 0
+        max_mb = app.config.get("ESTADO_TIEMPO_REAL_MAX_MB") or 0
+        ttl_segundos = ttl_minutos * 60 or None
+        max_bytes = max_mb * 1024 * 1024 or None
+
+        if tipo == BACKEND_SQLITE:
+            self.configurar(
+                BackendSQLite(
+                    app.config["ESTADO_TIEMPO_REAL_RUTA"],
+                    ttl_segundos=ttl_segundos,
+                    max_bytes=max_bytes,
+                )
+            )
+        elif tipo == BACKEND_MEMORIA:
+            self._configurar_memoria(app, ttl_segundos, max_bytes)
+        else:
+            raise RuntimeError(
+                f"ESTADO_TIEMPO_REAL_BACKEND desconocido: {tipo!r} "
+                f"(usa '{BACKEND_MEMORIA}' o '{BACKEND_SQLITE}')."
+            )
+
+        if ttl_segundos and not app.config.get("TESTING"):
+            self.iniciar_barrido(app.config.get("ESTADO_TIEMPO_REAL_BARRIDO_SEGUNDOS") or 0)
+        app.extensions["estado_compartido"] = self
+
+
+estado_compartido = AlmacenEstado()
@@ -0,0 +1,253 @@
+"""Evaluación automática semanal del reglamento (A-01, A-02 y A-03).
+
+Los items automáticos de la reunión semanal dependen de dos resultados de
+los checklists de la semana evaluada:
+
+- la calificación semanal (EXCELENTE/MUY BIEN/REGULAR/MALO), que suma
+  puntaje, items calificados y críticos de todas las inspecciones completadas;
+- las reincidencias: items del checklist que fallaron dos o más veces.
+
+Antes se calculaban por establecimiento cada vez que se abría o guardaba una
+reunión, trayendo cada detalle a Python para contar fallas. Aquí se calculan
+para todos los establecimientos a la vez, con GROUP BY/HAVING en la base: dos
+consultas agrupadas por establecimiento y una por (establecimiento, item).
+
+Las reuniones evalúan casi siempre una semana ya cerrada; ese resultado se
+guarda en ``cache_periodos`` para todos los establecimientos y abrir las
+reuniones del lunes no repite el cálculo. Una edición de inspecciones de esa
+semana renueva la versión de periodos y el resultado se vuelve a calcular.
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import date, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import and_, func, not_, or_
+
+from app.extensions import db
+from app.services.cache_periodos import (
+    VERSION_INSPECCIONES,
+    cache_periodos,
+    clave_periodo,
+    limite_inspecciones_cerradas,
+    versiones,
+)
+from app.services.puntuacion import (
+    RATING_CRITICO_NO_CUMPLE,
+    calificacion_global,
+    critico_sql,
+)
+
+
+FALLAS_REINCIDENCIA = 2
+
+
+def rango_semana(fecha: date) -> tuple[date, date]:
+    """Lunes y domingo de la semana de ``fecha``."""
+    inicio = fecha - timedelta(days=fecha.weekday())
+    return inicio, inicio + timedelta(days=6)
+
+
+def _filtros_inspecciones(fecha_inicio, fecha_fin, establecimiento_ids):
+    from app.models.Inspecciones_models import Inspeccion
+
+    filtros = [
+        Inspeccion.estado == "completada",
+        Inspeccion.fecha >= fecha_inicio,
+        Inspeccion.fecha <= fecha_fin,
+    ]
+    if establecimiento_ids is not None:
+        filtros.append(Inspeccion.establecimiento_id.in_(list(establecimiento_ids)))
+    return filtros
+
+
+def calificaciones_semanales(
+    fecha_inicio: date, fecha_fin: date, establecimiento_ids: Optional[Iterable[int]] = None
+) -> dict[int, dict]:
+    """{establecimiento_id: calificación semanal} de los que tienen inspecciones.
+
+    Una sola calificación para toda la semana con la fórmula del Bloque C
+    (una inspección crítica fallada suma +7 igual que en un solo checklist).
+    """
+    from app.models.Inspecciones_models import Inspeccion, InspeccionDetalle
+
+    filtros = _filtros_inspecciones(fecha_inicio, fecha_fin, establecimiento_ids)
+    totales = (
+        db.session.query(
+            Inspeccion.establecimiento_id,
+            func.count(Inspeccion.id),
+            func.sum(func.coalesce(Inspeccion.puntaje_total, 0)),
+            func.sum(func.coalesce(Inspeccion.puntos_criticos_perdidos, 0)),
+        )
+        .filter(*filtros)
+        .group_by(Inspeccion.establecimiento_id)
+        .all()
+    )
+    if not totales:
+        return {}
+
+    items_calificados = dict(
+        db.session.query(Inspeccion.establecimiento_id, func.count(InspeccionDetalle.id))
+        .join(Inspeccion, InspeccionDetalle.inspeccion_id == Inspeccion.id)
+        .filter(*filtros)
+        .group_by(Inspeccion.establecimiento_id)
+        .all()
+    )
+
+    resultado = {}
+    for establecimiento_id, num_inspecciones, puntaje, criticos in totales:
+        puntaje_total_sum = float(puntaje or 0)
+        items_calificados_sum = int(items_calificados.get(establecimiento_id, 0))
+        criticos_sum = int(criticos or 0)
+        resultado[establecimiento_id] = {
+            "calificacion": calificacion_global(
+                puntaje_total_sum, items_calificados_sum, criticos_sum
+            ),
+            "num_inspecciones": num_inspecciones,
+            "puntaje_total_sum": puntaje_total_sum,
+            "items_calificados_sum": items_calificados_sum,
+            "criticos_sum": criticos_sum,
+        }
+    return resultado
+
+
+def reincidencias_semanales(
+    fecha_inicio: date, fecha_fin: date, establecimiento_ids: Optional[Iterable[int]] = None
+) -> dict[int, dict]:
+    """{establecimiento_id: reincidencias} de los que tienen items reincidentes.
+
+    Un detalle es falla si es crítico con rating 8 o no crítico con rating
+    distinto de 1; un item reincide si falla ``FALLAS_REINCIDENCIA`` veces.
+    """
+    from app.models.Inspecciones_models import (
+        Inspeccion,
+        InspeccionDetalle,
+        ItemEvaluacionBase,
+        ItemEvaluacionEstablecimiento,
+    )
+
+    critico = critico_sql(ItemEvaluacionBase.riesgo)
+    fallas_por_item = (
+        db.session.query(
+            Inspeccion.establecimiento_id.label("establecimiento_id"),
+            func.count(InspeccionDetalle.id).label("fallas"),
+        )
+        .join(Inspeccion, InspeccionDetalle.inspeccion_id == Inspeccion.id)
+        .join(
+            ItemEvaluacionEstablecimiento,
+            InspeccionDetalle.item_establecimiento_id == ItemEvaluacionEstablecimiento.id,
+        )
+        .join(
+            ItemEvaluacionBase,
+            ItemEvaluacionEstablecimiento.item_base_id == ItemEvaluacionBase.id,
+        )
+        .filter(
+            *_filtros_inspecciones(fecha_inicio, fecha_fin, establecimiento_ids),
+            InspeccionDetalle.rating.isnot(None),
+            or_(
+                and_(critico, InspeccionDetalle.rating == RATING_CRITICO_NO_CUMPLE),
+                and_(not_(critico), InspeccionDetalle.rating != 1),
+            ),
+        )
+        .group_by(Inspeccion.establecimiento_id, ItemEvaluacionBase.id)
+        .having(func.count(InspeccionDetalle.id) >= FALLAS_REINCIDENCIA)
+        .subquery()
+    )
+
+    filas = (
+        db.session.query(
+            fallas_por_item.c.establecimiento_id,
+            func.count(),
+            func.sum(fallas_por_item.c.fallas),
+        )
+        .group_by(fallas_por_item.c.establecimiento_id)
+        .all()
+    )
+    return {
+        establecimiento_id: {
+            "items_reincidentes": int(items),
+            "incumplimientos_reincidentes": int(fallas or 0),
+        }
+        for establecimiento_id, items, fallas in filas
+    }
+
+
+def _sin_reincidencias() -> dict:
+    return {"items_reincidentes": 0, "incumplimientos_reincidentes": 0}
+
+
+def calcular_evaluacion_semanal(
+    fecha_inicio: date, fecha_fin: date, establecimiento_ids: Optional[Iterable[int]] = None
+) -> dict[int, dict]:
+    """{establecimiento_id: {"calificacion", "reincidencias"}} en una pasada.
+
+    Solo incluye establecimientos con inspecciones completadas en el rango;
+    para el resto la calificación es ``None`` y no hay reincidencias.
+    """
+    if establecimiento_ids is not None:
+        establecimiento_ids = list(establecimiento_ids)
+        if not establecimiento_ids:
+            return {}
+
+    calificaciones = calificaciones_semanales(fecha_inicio, fecha_fin, establecimiento_ids)
+    if not calificaciones:
+        return {}
+    reincidencias = reincidencias_semanales(fecha_inicio, fecha_fin, establecimiento_ids)
+    return {
+        establecimiento_id: {
+            "calificacion": calificacion,
+            "reincidencias": reincidencias.get(establecimiento_id, _sin_reincidencias()),
+        }
+        for establecimiento_id, calificacion in calificaciones.items()
+    }
+
+
+def evaluacion_semanal_todos(fecha_inicio: date, fecha_fin: date) -> dict[int, dict]:
+    """Resultado de todos los establecimientos, guardado si la semana ya cerró."""
+    if fecha_fin >= limite_inspecciones_cerradas():
+        return calcular_evaluacion_semanal(fecha_inicio, fecha_fin)
+
+    clave = clave_periodo("evaluacion_semanal_reglamento", fecha_inicio, fecha_fin)
+    version_calculo = versiones(VERSION_INSPECCIONES)
+    contenido = cache_periodos.obtener(clave, version_calculo)
+    if contenido is not None:
+        return {int(clave_est): valor for clave_est, valor in json.loads(contenido).items()}
+
+    resultado = calcular_evaluacion_semanal(fecha_inicio, fecha_fin)
+    cache_periodos.guardar(clave, version_calculo, json.dumps(resultado).encode("utf-8"))
+    return resultado
+
+
+def evaluacion_semanal(
+    establecimiento_ids: Iterable[int], fecha_inicio: date, fecha_fin: date
+) -> dict[int, dict]:
+    """Resultado de los establecimientos indicados.
+
+    En semanas cerradas sale del cálculo conjunto de todos los establecimientos;
+    en la semana en curso se calcula solo para los indicados.
+    """
+    establecimiento_ids = list(establecimiento_ids)
+    if fecha_fin < limite_inspecciones_cerradas():
+        resultado = evaluacion_semanal_todos(fecha_inicio, fecha_fin)
+    else:
+        resultado = calcular_evaluacion_semanal(fecha_inicio, fecha_fin, establecimiento_ids)
+
+    return {
+        establecimiento_id: resultado.get(
+            establecimiento_id,
+            {"calificacion": None, "reincidencias": _sin_reincidencias()},
+        )
+        for establecimiento_id in establecimiento_ids
+    }
+
+
+def evaluacion_semanal_establecimiento(
+    establecimiento_id: int, fecha_inicio: date, fecha_fin: date
+) -> tuple[Optional[dict], dict]:
+    """(calificación semanal o ``None``, reincidencias) de un establecimiento."""
+    datos = evaluacion_semanal([establecimiento_id], fecha_inicio, fecha_fin)[
+        establecimiento_id
+    ]
+    return datos["calificacion"], datos["reincidencias"]
@@ -0,0 +1,173 @@
+"""Instrumentación SQL por petición.
+
+Cada petición HTTP cuenta sus consultas, el tiempo que pasó en la base y la
+*huella* de cada sentencia (el SQL con literales, parámetros y listas ``IN``
+normalizados, así ``SELECT ... WHERE id = ?`` es la misma huella para todos los
+ids). Al responder:
+
+- agrega la cabecera ``Server-Timing`` (``db`` con consultas y tiempo, ``app``
+  con el tiempo total), visible en la pestaña de red del navegador;
+- registra una línea JSON con ruta, estado, consultas, tiempo y las huellas
+  que más se repitieron;
+- si una misma huella se ejecutó más de ``SQL_REPETICIONES_MAX`` veces, que es
+  el patrón N+1 de las cargas perezosas (``inspeccion.detalles``,
+  ``encargado.usuario``...), lo registra como advertencia y, en modo debug o
+  de pruebas, además emite ``ConsultasRepetidasWarning``.
+
+Los eventos de Socket.IO y los scripts no tienen petición y no se miden.
+Se desactiva con ``SQL_INSTRUMENTACION=false``.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import time
+import warnings
+from collections import Counter
+from typing import Optional
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+_ATRIBUTO_G = "_estadisticas_sql"
+_INICIOS_CONEXION = "instrumentacion_sql_inicios"
+_MAX_SQL_REGISTRADO = 300
+
+_LITERAL_TEXTO = re.compile(r"'(?:[^']|'')*'")
+_LITERAL_NUMERO = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_LISTA_PARAMETROS = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))*\s*\)")
+_PARAMETRO = re.compile(r"%\(\w+\)s|%s|:\w+")
+_ESPACIOS = re.compile(r"\s+")
+
+
+class ConsultasRepetidasWarning(UserWarning):
+    """Una misma sentencia se ejecutó demasiadas veces en una petición (N+1)."""
+
+
+def huella_sql(sentencia: str) -> str:
+    """SQL normalizado: mismo texto para la misma forma de consulta."""
+    texto = _LITERAL_TEXTO.sub("?", sentencia)
+    texto = _PARAMETRO.sub("?", texto)
+    texto = _LITERAL_NUMERO.sub("?", texto)
+    texto = _LISTA_PARAMETROS.sub("(?)", texto)
+    return _ESPACIOS.sub(" ", texto).strip()
+
+
+class EstadisticasSQL:
+    """Consultas de una petición."""
+
+    __slots__ = ("inicio", "consultas", "tiempo_db", "huellas")
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.tiempo_db = 0.0
+        self.huellas: Counter[str] = Counter()
+
+    def registrar(self, sentencia: str, duracion: float) -> None:
+        self.consultas += 1
+        self.tiempo_db += duracion
+        self.huellas[huella_sql(sentencia)] += 1
+
+    def repetidas(self, maximo: int) -> list[tuple[str, int]]:
+        """Huellas ejecutadas más de ``maximo`` veces, de la más repetida a la menos."""
+        return [
+            (huella, veces)
+            for huella, veces in self.huellas.most_common()
+            if veces > maximo
+        ]
+
+    def server_timing(self) -> str:
+        total_ms = (time.perf_counter() - self.inicio) * 1000
+        return (
+            f'db;dur={self.tiempo_db * 1000:.1f};desc="{self.consultas} consultas", '
+            f"app;dur={total_ms:.1f}"
+        )
+
+    def resumen(self, maximo: int) -> dict:
+        return {
+            "metodo": request.method,
+            "ruta": request.path,
+            "endpoint": request.endpoint,
+            "consultas": self.consultas,
+            "consultas_distintas": len(self.huellas),
+            "tiempo_db_ms": round(self.tiempo_db * 1000, 1),
+            "tiempo_total_ms": round((time.perf_counter() - self.inicio) * 1000, 1),
+            "repetidas": [
+                {"veces": veces, "sql": huella[:_MAX_SQL_REGISTRADO]}
+                for huella, veces in self.huellas.most_common(3)
+                if veces > 1
+            ],
+            "n_mas_uno": bool(self.repetidas(maximo)),
+        }
+
+
+def estadisticas_actuales() -> Optional[EstadisticasSQL]:
+    if not has_request_context():
+        return None
+    return g.get(_ATRIBUTO_G)
+
+
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany) -> None:
+    if estadisticas_actuales() is not None:
+        conn.info.setdefault(_INICIOS_CONEXION, []).append(time.perf_counter())
+
+
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany) -> None:
+    estadisticas = estadisticas_actuales()
+    inicios = conn.info.get(_INICIOS_CONEXION)
+    if estadisticas is None or not inicios:
+        return
+    estadisticas.registrar(statement, time.perf_counter() - inicios.pop())
+
+
+def _descartar_inicio(contexto) -> None:
+    # Una consulta fallida no llega a after_cursor_execute
+    conexion = contexto.connection
+    inicios = conexion.info.get(_INICIOS_CONEXION) if conexion is not None else None
+    if inicios:
+        inicios.pop()
+
+
+def _iniciar_peticion() -> None:
+    g.setdefault(_ATRIBUTO_G, EstadisticasSQL())
+
+
+def _cerrar_peticion(response):
+    estadisticas = g.pop(_ATRIBUTO_G, None)
+    if estadisticas is None:
+        return response
+
+    maximo = current_app.config.get("SQL_REPETICIONES_MAX", 10)
+    response.headers.add("Server-Timing", estadisticas.server_timing())
+
+    resumen = estadisticas.resumen(maximo)
+    resumen["estado"] = response.status_code
+    repetidas = estadisticas.repetidas(maximo)
+    if not repetidas:
+        current_app.logger.debug("sql %s", json.dumps(resumen, ensure_ascii=False))
+        return response
+
+    current_app.logger.warning("sql %s", json.dumps(resumen, ensure_ascii=False))
+    if current_app.debug or current_app.testing:
+        huella, veces = repetidas[0]
+        warnings.warn(
+            f"{request.method} {request.path}: la misma consulta se ejecutó {veces} "
+            f"veces (máximo {maximo}): {huella[:_MAX_SQL_REGISTRADO]}",
+            ConsultasRepetidasWarning,
+        )
+    return response
+
+
+def init_app(app) -> None:
+    if not app.config.get("SQL_INSTRUMENTACION", True):
+        return
+    if not event.contains(Engine, "before_cursor_execute", _antes_de_ejecutar):
+        event.listen(Engine, "before_cursor_execute", _antes_de_ejecutar)
+        event.listen(Engine, "after_cursor_execute", _despues_de_ejecutar)
+        event.listen(Engine, "handle_error", _descartar_inicio)
+    app.before_request(_iniciar_peticion)
+    app.after_request(_cerrar_peticion)
@@ -0,0 +1,121 @@
+"""Obtener o crear planes semanales en bloque.
+
+``obtener_o_crear_plan_semanal`` hacía un SELECT y, si no había plan, un
+INSERT con COMMIT por cada (establecimiento, semana, año). Se llamaba dentro
+de bucles, confirmaba a mitad de petición lo que el llamador llevaba hecho, y
+dos inspectores que abrían la aplicación a la vez podían chocar con
+``unique_plan_semanal`` (IntegrityError y petición fallida).
+
+Aquí se leen todos los planes pedidos en una consulta y los que faltan se
+insertan juntos en un INSERT de varias filas que ignora los duplicados
+(``ON DUPLICATE KEY UPDATE`` sin cambios en MySQL, ``ON CONFLICT DO NOTHING``
+en SQLite y PostgreSQL). Si otro worker creó el mismo plan, el INSERT no
+falla y la relectura devuelve el suyo: la meta queda la del primero que lo
+creó. No se hace commit; los planes creados se confirman con la transacción
+del llamador, que con el número de planes insertados sabe si hace falta.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable
+
+from sqlalchemy import and_, insert, or_
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from app.extensions import db
+
+
+META_SEMANAL_POR_DEFECTO = 3
+_COLUMNAS_UNICAS = ("establecimiento_id", "semana", "ano")
+
+ClavePlan = tuple[int, int, int]
+
+
+def meta_semanal_default() -> int:
+    """Meta por defecto actual; se congela en cada plan nuevo."""
+    from app.models.Inspecciones_models import ConfiguracionEvaluacion
+
+    config_meta = ConfiguracionEvaluacion.query.filter_by(clave="meta_semanal_default").first()
+    return int(config_meta.valor) if config_meta else META_SEMANAL_POR_DEFECTO
+
+
+def _consultar(claves: list[ClavePlan], bloquear: bool = False) -> dict:
+    from app.models.Inspecciones_models import PlanSemanal
+
+    por_semana: dict[tuple[int, int], list[int]] = {}
+    for establecimiento_id, semana, ano in claves:
+        por_semana.setdefault((semana, ano), []).append(establecimiento_id)
+
+    consulta = PlanSemanal.query.filter(
+        or_(
+            *(
+                and_(
+                    PlanSemanal.semana == semana,
+                    PlanSemanal.ano == ano,
+                    PlanSemanal.establecimiento_id.in_(establecimiento_ids),
+                )
+                for (semana, ano), establecimiento_ids in por_semana.items()
+            )
+        )
+    )
+    if bloquear:
+        # Lectura con bloqueo compartido: en REPEATABLE READ (MySQL) ve también
+        # los planes que otra transacción confirmó después de nuestra primera lectura
+        consulta = consulta.with_for_update(read=True)
+    return {(plan.establecimiento_id, plan.semana, plan.ano): plan for plan in consulta.all()}
+
+
+def _insertar_sin_duplicados(filas: list[dict]) -> None:
+    from app.models.Inspecciones_models import PlanSemanal
+
+    dialecto = db.session.get_bind(PlanSemanal).dialect.name
+    if dialecto in ("mysql", "mariadb"):
+        sentencia = mysql.insert(PlanSemanal)
+        sentencia = sentencia.on_duplicate_key_update(id=PlanSemanal.id)
+    elif dialecto == "postgresql":
+        sentencia = postgresql.insert(PlanSemanal).on_conflict_do_nothing(
+            index_elements=list(_COLUMNAS_UNICAS)
+        )
+    elif dialecto == "sqlite":
+        sentencia = sqlite.insert(PlanSemanal).on_conflict_do_nothing(
+            index_elements=list(_COLUMNAS_UNICAS)
+        )
+    else:
+        sentencia = insert(PlanSemanal)
+    db.session.execute(sentencia, filas)
+
+
+def obtener_o_crear_planes(claves: Iterable[ClavePlan]) -> tuple[dict, int]:
+    """({(establecimiento_id, semana, ano): PlanSemanal}, creados), creando los que falten.
+
+    Una consulta si todos existen; si faltan, un INSERT de varias filas y una
+    relectura de los faltantes. ``creados`` es cuántos planes faltaban (0 si no
+    hubo INSERT y no hay nada que confirmar). No hace commit.
+    """
+    claves = list(
+        dict.fromkeys(
+            (int(establecimiento_id), int(semana), int(ano))
+            for establecimiento_id, semana, ano in claves
+        )
+    )
+    if not claves:
+        return {}, 0
+
+    planes = _consultar(claves)
+    faltantes = [clave for clave in claves if clave not in planes]
+    if faltantes:
+        meta_default = meta_semanal_default()
+        _insertar_sin_duplicados(
+            [
+                {
+                    "establecimiento_id": establecimiento_id,
+                    "semana": semana,
+                    "ano": ano,
+                    "evaluaciones_meta": meta_default,  # Meta congelada para este plan
+                    "evaluaciones_realizadas": 0,
+                }
+                for establecimiento_id, semana, ano in faltantes
+            ]
+        )
+        planes.update(_consultar(faltantes, bloquear=True))
+    return planes, len(faltantes)
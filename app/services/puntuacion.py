@@ -0,0 +1,373 @@
+"""Puntuación de los items del checklist por nivel de riesgo.
+
+Un item crítico se califica 1 (cumple) u 8 (no cumple); los demás 1, 2 o 3.
+Cada calificación aporta su valor como puntaje, un porcentaje de
+cumplimiento y, si es un crítico no cumplido, un punto crítico perdido. La
+calificación global (EXCELENTE/MUY BIEN/REGULAR/MALO) sale de los puntos por
+encima del mínimo.
+
+Antes cada consulta de la configuración armaba diccionarios nuevos y cada
+item pasaba por ella; aquí las tablas se calculan una vez al importar y son
+de solo lectura (``tabla_calificacion``). Quien necesite devolver la
+configuración en una respuesta pide una copia con
+``configuracion_calificacion``.
+
+``puntuar_lote`` y ``resumir_por_grupo`` califican muchos pares (riesgo,
+rating) a la vez para dashboards y recálculos de miles de inspecciones: con
+NumPy instalado usan índices sobre las tablas y ``bincount``; sin NumPy, el
+mismo resultado con un bucle sobre las tablas precalculadas.
+
+``aportes_sql`` y ``puntaje_maximo_sql`` traducen las mismas tablas a
+expresiones ``CASE`` para sumar los puntajes en la base sin traer los items.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Hashable, Iterable, Mapping, Optional, Sequence
+
+from sqlalchemy import and_, case, func, null
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional
+    np = None
+
+
+RIESGO_CRITICO = "Crítico"
+RATING_CRITICO_NO_CUMPLE = 8
+_RATING_MAXIMO = 8
+
+
+def _congelar(configuracion: dict) -> Mapping[str, Any]:
+    return MappingProxyType(
+        {
+            clave: (
+                frozenset(valor)
+                if isinstance(valor, set)
+                else MappingProxyType(valor)
+                if isinstance(valor, dict)
+                else valor
+            )
+            for clave, valor in configuracion.items()
+        }
+    )
+
+
+CONFIGURACION_CRITICO = _congelar(
+    {
+        "puntaje_minimo": 1,
+        "puntaje_maximo": 8,
+        "opciones_validas": {1, 8},
+        "etiquetas_calificacion": {1: "Cumple", 8: "No cumple"},
+        "porcentaje_por_rating": {1: 100, 8: 0},
+    }
+)
+CONFIGURACION_GENERAL = _congelar(
+    {
+        "puntaje_minimo": 1,
+        "puntaje_maximo": 3,
+        "opciones_validas": {1, 2, 3},
+        "etiquetas_calificacion": {1: "Excelente", 2: "Bueno", 3: "Regular"},
+        "porcentaje_por_rating": {1: 100, 2: 75, 3: 50},
+    }
+)
+# Índice 0: riesgo no crítico, 1: crítico
+_CONFIGURACIONES = (CONFIGURACION_GENERAL, CONFIGURACION_CRITICO)
+
+
+def _aportes(critico: int) -> dict[int, tuple[float, float, int]]:
+    configuracion = _CONFIGURACIONES[critico]
+    return {
+        rating: (
+            float(rating),
+            float(configuracion["porcentaje_por_rating"][rating]),
+            1 if critico and rating == RATING_CRITICO_NO_CUMPLE else 0,
+        )
+        for rating in configuracion["opciones_validas"]
+    }
+
+
+# (puntaje, porcentaje de cumplimiento, críticos no conformes) por rating válido
+_APORTES = (_aportes(0), _aportes(1))
+_RATINGS_VALIDOS = tuple(sorted({rating for aportes in _APORTES for rating in aportes}))
+
+
+@lru_cache(maxsize=64)
+def _indice_riesgo(riesgo) -> int:
+    return 1 if (riesgo or "").strip() == RIESGO_CRITICO else 0
+
+
+def es_critico(riesgo) -> bool:
+    return _indice_riesgo(riesgo) == 1
+
+
+def tabla_calificacion(riesgo) -> Mapping[str, Any]:
+    """Configuración de calificación del riesgo (compartida, de solo lectura)."""
+    return _CONFIGURACIONES[_indice_riesgo(riesgo)]
+
+
+def configuracion_calificacion(riesgo) -> dict:
+    """Copia modificable de la configuración, para incluirla en una respuesta."""
+    return {
+        clave: (
+            set(valor)
+            if isinstance(valor, frozenset)
+            else dict(valor)
+            if isinstance(valor, Mapping)
+            else valor
+        )
+        for clave, valor in tabla_calificacion(riesgo).items()
+    }
+
+
+def puntaje_maximo(riesgo) -> int:
+    return tabla_calificacion(riesgo)["puntaje_maximo"]
+
+
+def puntaje_maximo_posible(riesgos: Iterable) -> int:
+    return sum(_CONFIGURACIONES[_indice_riesgo(riesgo)]["puntaje_maximo"] for riesgo in riesgos)
+
+
+def _rating_entero(rating) -> Optional[int]:
+    try:
+        return int(rating)
+    except (TypeError, ValueError):
+        return None
+
+
+def aporte_rating(riesgo, rating) -> Optional[tuple[float, float, int]]:
+    """(puntaje, porcentaje, críticos no conformes) o ``None`` si el rating no es válido."""
+    rating_normalizado = _rating_entero(rating)
+    if rating_normalizado is None:
+        return None
+    return _APORTES[_indice_riesgo(riesgo)].get(rating_normalizado)
+
+
+def metricas_rating(riesgo, rating) -> Optional[dict]:
+    """Métricas de un item calificado o ``None`` si el rating no es válido."""
+    rating_normalizado = _rating_entero(rating)
+    if rating_normalizado is None:
+        return None
+    indice = _indice_riesgo(riesgo)
+    aporte = _APORTES[indice].get(rating_normalizado)
+    if aporte is None:
+        return None
+    return {
+        "rating": rating_normalizado,
+        "puntaje": aporte[0],
+        "puntaje_maximo": float(_CONFIGURACIONES[indice]["puntaje_maximo"]),
+        "porcentaje_cumplimiento": aporte[1],
+        "criticos_no_conformes": aporte[2],
+    }
+
+
+def calificacion_global(puntaje_total, items_calificados, criticos_fallados=0) -> str:
+    """EXCELENTE/MUY BIEN/REGULAR/MALO según puntos extra sobre el mínimo.
+
+    Umbrales: Excelente 0-1, Muy bien 2-6, Regular 7-14, Malo >14. Con algún
+    ítem crítico fallado nunca sale Excelente ni Muy bien (un crítico fallado
+    ya suma +7, pero el bloqueo es explícito).
+    """
+    puntos_extra = max(0, round(puntaje_total) - items_calificados)
+
+    if criticos_fallados > 0:
+        return "REGULAR" if puntos_extra <= 14 else "MALO"
+
+    if puntos_extra <= 1:
+        return "EXCELENTE"
+    elif puntos_extra <= 6:
+        return "MUY BIEN"
+    elif puntos_extra <= 14:
+        return "REGULAR"
+    return "MALO"
+
+
+def _tablas_numpy():
+    """Matrices [riesgo, rating] de validez, puntaje, porcentaje y críticos."""
+    forma = (len(_CONFIGURACIONES), _RATING_MAXIMO + 1)
+    valido = np.zeros(forma, dtype=bool)
+    puntaje = np.zeros(forma)
+    porcentaje = np.zeros(forma)
+    criticos = np.zeros(forma, dtype=np.int64)
+    for indice, aportes in enumerate(_APORTES):
+        for rating, (puntos, porcentaje_rating, critico) in aportes.items():
+            valido[indice, rating] = True
+            puntaje[indice, rating] = puntos
+            porcentaje[indice, rating] = porcentaje_rating
+            criticos[indice, rating] = critico
+    for matriz in (valido, puntaje, porcentaje, criticos):
+        matriz.setflags(write=False)
+    return valido, puntaje, porcentaje, criticos
+
+
+_TABLAS_NUMPY = _tablas_numpy() if np is not None else None
+
+
+def _indices(riesgos: Sequence, ratings: Sequence) -> tuple[list[int], list[int]]:
+    if len(riesgos) != len(ratings):
+        raise ValueError("riesgos y ratings deben tener el mismo largo")
+    indices_riesgo = [_indice_riesgo(riesgo) for riesgo in riesgos]
+    indices_rating = []
+    for rating in ratings:
+        rating_normalizado = _rating_entero(rating)
+        indices_rating.append(
+            rating_normalizado
+            if rating_normalizado is not None and 0 <= rating_normalizado <= _RATING_MAXIMO
+            else -1
+        )
+    return indices_riesgo, indices_rating
+
+
+def _lote_numpy(riesgos: Sequence, ratings: Sequence):
+    indices_riesgo, indices_rating = _indices(riesgos, ratings)
+    filas = np.asarray(indices_riesgo, dtype=np.int64)
+    columnas = np.asarray(indices_rating, dtype=np.int64)
+    en_rango = columnas >= 0
+    columnas = np.where(en_rango, columnas, 0)
+    valido_tabla, puntaje, porcentaje, criticos = _TABLAS_NUMPY
+    valido = valido_tabla[filas, columnas] & en_rango
+    return (
+        valido,
+        np.where(valido, puntaje[filas, columnas], 0.0),
+        np.where(valido, porcentaje[filas, columnas], 0.0),
+        np.where(valido, criticos[filas, columnas], 0),
+    )
+
+
+def puntuar_lote(riesgos: Sequence, ratings: Sequence) -> dict[str, list]:
+    """Aporte de cada par (riesgo, rating), en listas paralelas.
+
+    Devuelve ``valido``, ``puntaje``, ``porcentaje`` y ``criticos``; un rating
+    inválido o ``None`` queda con ``valido`` en falso y aportes en cero.
+    """
+    if _TABLAS_NUMPY is not None:
+        valido, puntaje, porcentaje, criticos = _lote_numpy(riesgos, ratings)
+        return {
+            "valido": valido.tolist(),
+            "puntaje": puntaje.tolist(),
+            "porcentaje": porcentaje.tolist(),
+            "criticos": criticos.tolist(),
+        }
+
+    resultado = {"valido": [], "puntaje": [], "porcentaje": [], "criticos": []}
+    for indice, rating in zip(*_indices(riesgos, ratings)):
+        aporte = _APORTES[indice].get(rating)
+        resultado["valido"].append(aporte is not None)
+        puntos, porcentaje_rating, critico = aporte or (0.0, 0.0, 0)
+        resultado["puntaje"].append(puntos)
+        resultado["porcentaje"].append(porcentaje_rating)
+        resultado["criticos"].append(critico)
+    return resultado
+
+
+def _totales_vacios() -> dict:
+    return {
+        "puntaje_total": 0.0,
+        "suma_porcentaje": 0.0,
+        "puntos_criticos_perdidos": 0,
+        "items_calificados": 0,
+    }
+
+
+def resumir_por_grupo(
+    grupos: Sequence[Hashable], riesgos: Sequence, ratings: Sequence
+) -> dict[Hashable, dict]:
+    """Totales por grupo (p. ej. inspección) de muchos items a la vez.
+
+    {grupo: {"puntaje_total", "suma_porcentaje", "puntos_criticos_perdidos",
+    "items_calificados"}}; solo cuentan los ratings válidos, pero todo grupo
+    presente aparece en el resultado.
+    """
+    if len(grupos) != len(riesgos):
+        raise ValueError("grupos y riesgos deben tener el mismo largo")
+    orden = list(dict.fromkeys(grupos))
+    if not orden:
+        return {}
+
+    if _TABLAS_NUMPY is not None:
+        posicion = {grupo: indice for indice, grupo in enumerate(orden)}
+        indices_grupo = np.fromiter(
+            (posicion[grupo] for grupo in grupos), dtype=np.int64, count=len(grupos)
+        )
+        valido, puntaje, porcentaje, criticos = _lote_numpy(riesgos, ratings)
+        tamano = len(orden)
+        puntaje = np.bincount(indices_grupo, weights=puntaje, minlength=tamano)
+        porcentaje = np.bincount(indices_grupo, weights=porcentaje, minlength=tamano)
+        criticos = np.bincount(indices_grupo, weights=criticos, minlength=tamano)
+        calificados = np.bincount(indices_grupo[valido], minlength=tamano)
+        return {
+            grupo: {
+                "puntaje_total": float(puntaje[indice]),
+                "suma_porcentaje": float(porcentaje[indice]),
+                "puntos_criticos_perdidos": int(criticos[indice]),
+                "items_calificados": int(calificados[indice]),
+            }
+            for indice, grupo in enumerate(orden)
+        }
+
+    totales = {grupo: _totales_vacios() for grupo in orden}
+    for grupo, indice, rating in zip(grupos, *_indices(riesgos, ratings)):
+        aporte = _APORTES[indice].get(rating)
+        if aporte is None:
+            continue
+        total = totales[grupo]
+        total["puntaje_total"] += aporte[0]
+        total["suma_porcentaje"] += aporte[1]
+        total["puntos_criticos_perdidos"] += aporte[2]
+        total["items_calificados"] += 1
+    return totales
+
+
+def resumir_lote(riesgos: Sequence, ratings: Sequence) -> dict:
+    """Totales de un solo conjunto de items (ver ``resumir_por_grupo``)."""
+    if not riesgos:
+        if ratings:
+            raise ValueError("riesgos y ratings deben tener el mismo largo")
+        return _totales_vacios()
+    return resumir_por_grupo([0] * len(riesgos), riesgos, ratings)[0]
+
+
+def rating_efectivo_sql(rating, score):
+    """``rating`` o, si es NULL, la parte entera de ``score`` (como ``int()``).
+
+    Solo se traducen los valores que algún riesgo acepta; el resto queda NULL.
+    Usa rangos en lugar de ``FLOOR`` para no depender de la versión de SQLite.
+    """
+    return case(
+        (rating.isnot(None), rating),
+        *((and_(score >= valor, score < valor + 1), valor) for valor in _RATINGS_VALIDOS),
+        else_=null(),
+    )
+
+
+def critico_sql(riesgo):
+    """Misma regla que ``_indice_riesgo``: riesgo sin espacios (NULL = vacío)."""
+    return func.trim(func.coalesce(riesgo, "")) == RIESGO_CRITICO
+
+
+def aportes_sql(riesgo, rating) -> tuple:
+    """(puntaje, porcentaje, críticos) como expresiones SQL; NULL si el rating no es válido.
+
+    ``COUNT`` sobre el puntaje cuenta los items calificados.
+    """
+    critico = critico_sql(riesgo)
+    columnas = []
+    for posicion in range(3):
+        casos = [
+            (and_(critico, rating == valor), aporte[posicion])
+            for valor, aporte in sorted(_APORTES[1].items())
+        ]
+        # Un crítico con rating no válido no cae en las opciones generales
+        casos.append((critico, null()))
+        casos += [(rating == valor, aporte[posicion]) for valor, aporte in sorted(_APORTES[0].items())]
+        columnas.append(case(*casos, else_=null()))
+    return tuple(columnas)
+
+
+def puntaje_maximo_sql(riesgo):
+    return case(
+        (critico_sql(riesgo), CONFIGURACION_CRITICO["puntaje_maximo"]),
+        else_=CONFIGURACION_GENERAL["puntaje_maximo"],
+    )
@@ -0,0 +1,351 @@
+"""Resumen semanal de inspecciones por establecimiento.
+
+El dashboard del plan semanal leía en cada carga todas las inspecciones
+completadas del periodo. Ahora lee ``resumen_semanal_establecimiento``: una
+fila por *fragmento* (establecimiento, semana, mes), porque una semana que
+cruza dos meses debe poder sumarse tanto en la vista semanal como en la
+mensual.
+
+El resumen se mantiene dentro de la misma transacción que completa,
+recalifica, mueve o borra una inspección:
+
+- ``before_flush`` anota los fragmentos que tocan las inspecciones cambiadas,
+  con sus valores anteriores de fecha, establecimiento y estado;
+- ``before_commit`` recalcula esos fragmentos desde las inspecciones
+  completadas que contienen (unas pocas por semana).
+
+Si el recálculo falla, la excepción sale del commit y la transacción no se
+confirma: la inspección y su resumen se guardan juntos o no se guardan.
+``reconstruir_resumen_semanal`` (``python reconstruir_resumen_semanal.py``)
+rehace el resumen completo tras cambiar los umbrales de calificación.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, event, func, insert, inspect as inspeccionar_instancia
+from sqlalchemy.orm import Session
+
+from app.services.puntuacion import calificacion_global
+
+
+_MARCA_SESION = "resumen_semanal_pendiente"
+_LOTE_IDS = 1000
+
+# Campos de Inspeccion que alteran el resumen
+_CAMPOS_RESUMEN = (
+    "estado",
+    "fecha",
+    "establecimiento_id",
+    "puntaje_total",
+    "porcentaje_cumplimiento",
+    "puntos_criticos_perdidos",
+    "hora_inicio",
+    "created_at",
+)
+
+
+def fragmento(establecimiento_id: int, fecha: date) -> tuple[int, date, date]:
+    """Clave (establecimiento, lunes de la semana, día 1 del mes) de una fecha."""
+    return (
+        establecimiento_id,
+        fecha - timedelta(days=fecha.weekday()),
+        fecha.replace(day=1),
+    )
+
+
+def rango_fragmento(inicio_semana: date, inicio_mes: date) -> tuple[date, date]:
+    """Fechas que cubre un fragmento: la semana recortada al mes."""
+    siguiente_mes = (inicio_mes.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return (
+        max(inicio_semana, inicio_mes),
+        min(inicio_semana + timedelta(days=6), siguiente_mes - timedelta(days=1)),
+    )
+
+
+def _consulta_inspecciones(session):
+    from app.models.Inspecciones_models import Inspeccion
+
+    return session.query(
+        Inspeccion.id,
+        Inspeccion.establecimiento_id,
+        Inspeccion.fecha,
+        Inspeccion.hora_inicio,
+        Inspeccion.created_at,
+        Inspeccion.puntaje_total,
+        Inspeccion.porcentaje_cumplimiento,
+        Inspeccion.puntos_criticos_perdidos,
+    ).filter(Inspeccion.estado == "completada")
+
+
+def _items_por_inspeccion(session, inspeccion_ids: list[int]) -> dict[int, int]:
+    from app.models.Inspecciones_models import InspeccionDetalle
+
+    items = {}
+    for inicio in range(0, len(inspeccion_ids), _LOTE_IDS):
+        lote = inspeccion_ids[inicio : inicio + _LOTE_IDS]
+        items.update(
+            session.query(InspeccionDetalle.inspeccion_id, func.count(InspeccionDetalle.id))
+            .filter(InspeccionDetalle.inspeccion_id.in_(lote))
+            .group_by(InspeccionDetalle.inspeccion_id)
+            .all()
+        )
+    return items
+
+
+def _orden(inspeccion) -> tuple:
+    return (inspeccion.fecha, inspeccion.created_at or datetime.min)
+
+
+def _valores_fragmento(inspecciones: list, items_por_inspeccion: dict[int, int]) -> dict:
+    """Columnas del resumen para las inspecciones completadas de un fragmento."""
+
+    def calificacion(inspeccion):
+        if inspeccion.puntaje_total is None:
+            return None
+        return calificacion_global(
+            inspeccion.puntaje_total,
+            items_por_inspeccion.get(inspeccion.id, 0),
+            inspeccion.puntos_criticos_perdidos or 0,
+        )
+
+    cumplimientos = [
+        inspeccion.porcentaje_cumplimiento
+        for inspeccion in inspecciones
+        if inspeccion.porcentaje_cumplimiento
+    ]
+    reciente = max(inspecciones, key=_orden)
+
+    return {
+        "inspecciones_completadas": len(inspecciones),
+        "suma_puntajes": sum(
+            inspeccion.puntaje_total or 0 for inspeccion in inspecciones
+        ),
+        "suma_cumplimiento": sum(cumplimientos),
+        "inspecciones_con_cumplimiento": len(cumplimientos),
+        "criticos_fallados": sum(
+            inspeccion.puntos_criticos_perdidos or 0 for inspeccion in inspecciones
+        ),
+        "items_calificados": sum(
+            items_por_inspeccion.get(inspeccion.id, 0) for inspeccion in inspecciones
+        ),
+        "inspeccion_reciente_id": reciente.id,
+        "calificacion_reciente": calificacion(reciente),
+        "puntaje_reciente": (
+            round(reciente.puntaje_total) if reciente.puntaje_total is not None else None
+        ),
+        "inspecciones": [
+            {
+                "id": inspeccion.id,
+                "fecha": inspeccion.fecha.isoformat(),
+                "hora_inicio": (
+                    inspeccion.hora_inicio.strftime("%H:%M")
+                    if inspeccion.hora_inicio
+                    else None
+                ),
+                "puntaje_total": (
+                    round(inspeccion.puntaje_total)
+                    if inspeccion.puntaje_total is not None
+                    else None
+                ),
+                "calificacion": calificacion(inspeccion),
+            }
+            for inspeccion in sorted(inspecciones, key=_orden)
+        ],
+    }
+
+
+def resumir_inspecciones(inspecciones: Iterable, items_por_inspeccion: dict[int, int]) -> dict:
+    """{fragmento: columnas del resumen} para inspecciones completadas."""
+    por_fragmento: dict[tuple, list] = {}
+    for inspeccion in inspecciones:
+        por_fragmento.setdefault(
+            fragmento(inspeccion.establecimiento_id, inspeccion.fecha), []
+        ).append(inspeccion)
+    return {
+        clave: _valores_fragmento(lista, items_por_inspeccion)
+        for clave, lista in por_fragmento.items()
+    }
+
+
+def recalcular_fragmento(
+    session, establecimiento_id: int, inicio_semana: date, inicio_mes: date
+) -> None:
+    """Rehace la fila de un fragmento (la borra si ya no tiene inspecciones)."""
+    from app.models.Inspecciones_models import Inspeccion, ResumenSemanalEstablecimiento
+
+    desde, hasta = rango_fragmento(inicio_semana, inicio_mes)
+    inspecciones = (
+        _consulta_inspecciones(session)
+        .filter(
+            Inspeccion.establecimiento_id == establecimiento_id,
+            Inspeccion.fecha >= desde,
+            Inspeccion.fecha <= hasta,
+        )
+        .order_by(Inspeccion.fecha, Inspeccion.id)
+        .all()
+    )
+    resumen = (
+        session.query(ResumenSemanalEstablecimiento)
+        .filter_by(
+            establecimiento_id=establecimiento_id,
+            inicio_semana=inicio_semana,
+            inicio_mes=inicio_mes,
+        )
+        .with_for_update()
+        .first()
+    )
+
+    if not inspecciones:
+        if resumen is not None:
+            session.delete(resumen)
+        return
+
+    valores = _valores_fragmento(
+        inspecciones,
+        _items_por_inspeccion(session, [inspeccion.id for inspeccion in inspecciones]),
+    )
+    if resumen is None:
+        resumen = ResumenSemanalEstablecimiento(
+            establecimiento_id=establecimiento_id,
+            inicio_semana=inicio_semana,
+            inicio_mes=inicio_mes,
+        )
+        session.add(resumen)
+    for campo, valor in valores.items():
+        setattr(resumen, campo, valor)
+
+
+def reconstruir_resumen_semanal(
+    session, desde: Optional[date] = None, establecimiento_id: Optional[int] = None
+) -> int:
+    """Rehace el resumen desde el historial y devuelve las filas escritas.
+
+    ``desde`` se lleva al lunes de su semana para no dejar fragmentos a medias.
+    No hace commit.
+    """
+    from app.models.Inspecciones_models import Inspeccion, ResumenSemanalEstablecimiento
+
+    borrar = delete(ResumenSemanalEstablecimiento)
+    consulta = _consulta_inspecciones(session)
+    if desde is not None:
+        desde = desde - timedelta(days=desde.weekday())
+        borrar = borrar.where(ResumenSemanalEstablecimiento.inicio_semana >= desde)
+        consulta = consulta.filter(Inspeccion.fecha >= desde)
+    if establecimiento_id is not None:
+        borrar = borrar.where(
+            ResumenSemanalEstablecimiento.establecimiento_id == establecimiento_id
+        )
+        consulta = consulta.filter(Inspeccion.establecimiento_id == establecimiento_id)
+
+    inspecciones = consulta.order_by(Inspeccion.fecha, Inspeccion.id).all()
+    resumenes = resumir_inspecciones(
+        inspecciones,
+        _items_por_inspeccion(session, [inspeccion.id for inspeccion in inspecciones]),
+    )
+
+    session.execute(borrar)
+    filas = [
+        {
+            "establecimiento_id": clave[0],
+            "inicio_semana": clave[1],
+            "inicio_mes": clave[2],
+            **valores,
+        }
+        for clave, valores in resumenes.items()
+    ]
+    if filas:
+        session.execute(insert(ResumenSemanalEstablecimiento), filas)
+    return len(filas)
+
+
+def _fragmento_si_completada(estado, establecimiento_id, fecha) -> set[tuple]:
+    if estado != "completada" or not establecimiento_id or not fecha:
+        return set()
+    return {fragmento(establecimiento_id, fecha)}
+
+
+def _anotar_fragmentos(session, flush_context, instancias) -> None:
+    """Anota los fragmentos de cada inspección cambiada, antes y después.
+
+    La versión guardada se lee de la base (todavía sin el flush) y no del
+    historial de atributos: si la instancia estaba expirada por un commit
+    anterior, el historial no conoce los valores previos.
+    """
+    from app.models.Inspecciones_models import Inspeccion
+
+    cambiadas = []
+    for instancia in (*session.new, *session.dirty, *session.deleted):
+        if not isinstance(instancia, Inspeccion):
+            continue
+        if (
+            instancia in session.dirty
+            and instancia not in session.deleted
+            and not any(
+                inspeccionar_instancia(instancia).attrs[campo].history.has_changes()
+                for campo in _CAMPOS_RESUMEN
+            )
+        ):
+            continue
+        cambiadas.append(instancia)
+    if not cambiadas:
+        return
+
+    ids_guardados = [
+        identidad[0]
+        for identidad in (inspeccionar_instancia(instancia).identity for instancia in cambiadas)
+        if identidad is not None
+    ]
+    guardadas = {}
+    if ids_guardados:
+        with session.no_autoflush:
+            guardadas = {
+                fila.id: fila
+                for fila in session.query(
+                    Inspeccion.id, Inspeccion.estado, Inspeccion.establecimiento_id, Inspeccion.fecha
+                ).filter(Inspeccion.id.in_(ids_guardados))
+            }
+
+    fragmentos = set()
+    for instancia in cambiadas:
+        identidad = inspeccionar_instancia(instancia).identity
+        guardada = guardadas.get(identidad[0]) if identidad is not None else None
+        if guardada is not None:
+            fragmentos |= _fragmento_si_completada(
+                guardada.estado, guardada.establecimiento_id, guardada.fecha
+            )
+        if instancia not in session.deleted:
+            fragmentos |= _fragmento_si_completada(
+                instancia.estado, instancia.establecimiento_id, instancia.fecha
+            )
+
+    if fragmentos:
+        session.info.setdefault(_MARCA_SESION, set()).update(fragmentos)
+
+
+def _recalcular_antes_de_commit(session) -> None:
+    # Lo que falte enviar puede anotar fragmentos
+    session.flush()
+    fragmentos = session.info.pop(_MARCA_SESION, None)
+    if not fragmentos:
+        return
+    # Sin try: un fallo aborta el commit junto con la inspección
+    for clave in sorted(fragmentos):
+        recalcular_fragmento(session, *clave)
+
+
+def _descartar_marca(session, transaction) -> None:
+    # Solo la transacción externa; los savepoints y el flush abren subtransacciones
+    if transaction.parent is None:
+        session.info.pop(_MARCA_SESION, None)
+
+
+def registrar_resumen_semanal() -> None:
+    """Escucha los commits del ORM para mantener el resumen semanal."""
+    if event.contains(Session, "before_flush", _anotar_fragmentos):
+        return
+    event.listen(Session, "before_flush", _anotar_fragmentos)
+    event.listen(Session, "before_commit", _recalcular_antes_de_commit)
+    event.listen(Session, "after_transaction_end", _descartar_marca)
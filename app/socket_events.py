@@ -1,263 +1,454 @@
-from flask_socketio import SocketIO, emit, join_room, leave_room
-from flask import session
+"""Eventos de Socket.IO del checklist en tiempo real.
+
+Los handlers reciben una *conexión* (``sid``, ``sesion``, ``emit``, ``unir``,
+``salir``) en lugar de usar directamente ``flask_socketio``. Así los mismos
+eventos sirven al servidor de Flask-SocketIO (``ConexionFlask``) y al gateway
+asyncio de ``app.socket_gateway``.
+"""
+
+from flask_socketio import emit, join_room, leave_room
+from flask import current_app, request, session
 from app.extensions import socketio
-from app.controllers.inspecciones_controller import datos_tiempo_real, InspeccionesController
+from app.controllers.inspecciones_controller import datos_tiempo_real, huellas_borrador, InspeccionesController
 from app.models.Inspecciones_models import Inspeccion
+from app.services.cache_autorizacion import autorizaciones_socket
+from app.services.emisiones_socket import agrupador_items
+from app.services.checklist_tiempo_real import (
+    EVENTO_PARCHE,
+    EVENTO_REANUDACION,
+    EVENTO_SNAPSHOT,
+    anotar_parche,
+    aplicar_diferencia_items,
+    construir_parche,
+    mensaje_parche,
+    parche_modifica_items,
+    parches_desde,
+    registrar_parche,
+    reiniciar_confirmacion,
+    snapshot,
+)
+
+
+EVENTOS_SOCKET = {}
+
+
+def evento_socket(nombre):
+    """Registra un handler ``handler(conexion, data)`` para el evento ``nombre``."""
+    def registrar(handler):
+        EVENTOS_SOCKET[nombre] = handler
+        return handler
+    return registrar
+
+
+class ConexionFlask:
+    """Conexión atendida por Flask-SocketIO dentro de su contexto de evento."""
+
+    @property
+    def sid(self):
+        return request.sid
+
+    @property
+    def sesion(self):
+        return session
+
+    def emit(self, evento, datos, to=None, include_self=True, broadcast=False):
+        opciones = {'include_self': include_self}
+        if to is not None:
+            opciones['to'] = to
+        if broadcast:
+            opciones['broadcast'] = True
+        emit(evento, datos, **opciones)
+
+    def unir(self, room):
+        join_room(room)
 
-
-def _usuario_tiene_acceso_establecimiento(establecimiento_id):
-    user_id = session.get("user_id")
-    user_role = session.get("user_role")
-    return InspeccionesController._usuario_tiene_acceso_establecimiento(
-        user_id, user_role, establecimiento_id
+    def salir(self, room):
+        leave_room(room)
+
+
+def _establecimientos_autorizados(conexion):
+    """Conjunto autorizado de la conexión, resuelto una vez y reutilizado por evento."""
+    user_id = conexion.sesion.get("user_id")
+    user_role = conexion.sesion.get("user_role")
+    return autorizaciones_socket.establecimientos(
+        conexion.sid,
+        user_id,
+        user_role,
+        lambda: InspeccionesController._obtener_establecimientos_autorizados(
+            user_id, user_role
+        ),
     )
 
 
-def _usuario_tiene_acceso_inspeccion(inspeccion_id):
-    if not inspeccion_id:
+def _usuario_tiene_acceso_establecimiento(conexion, establecimiento_id):
+    try:
+        establecimiento_id = int(establecimiento_id)
+    except (TypeError, ValueError):
         return False
+    return establecimiento_id in _establecimientos_autorizados(conexion)
+
 
+def _establecimiento_de_inspeccion(inspeccion_id):
     inspeccion = Inspeccion.query.get(inspeccion_id)
-    if not inspeccion:
+    return inspeccion.establecimiento_id if inspeccion else None
+
+
+def _usuario_tiene_acceso_inspeccion(conexion, inspeccion_id):
+    if not inspeccion_id:
+        return False
+
+    try:
+        inspeccion_id = int(inspeccion_id)
+    except (TypeError, ValueError):
+        return False
+
+    establecimiento_id = autorizaciones_socket.establecimiento_de_inspeccion(
+        conexion.sid,
+        inspeccion_id,
+        lambda: _establecimiento_de_inspeccion(inspeccion_id),
+    )
+    if not establecimiento_id:
         return False
 
-    return _usuario_tiene_acceso_establecimiento(inspeccion.establecimiento_id)
+    return _usuario_tiene_acceso_establecimiento(conexion, establecimiento_id)
 
-@socketio.on('connect')
-def handle_connect():
-    emit('connected', {'mensaje': 'Conectado exitosamente'})
 
-@socketio.on('join_inspeccion')
-def on_join_inspeccion(data):
+def _ventana_emision_segundos():
+    return current_app.config.get('SOCKETIO_VENTANA_EMISION_MS', 0) / 1000.0
+
+
+@evento_socket('connect')
+def handle_connect(conexion, data=None):
+    if conexion.sesion.get('user_id'):
+        _establecimientos_autorizados(conexion)
+    conexion.emit('connected', {'mensaje': 'Conectado exitosamente'})
+
+@evento_socket('join_inspeccion')
+def on_join_inspeccion(conexion, data):
     """Cliente se une a la sala de una inspección específica"""
     inspeccion_id = data.get('inspeccion_id')
-    user_role = session.get('user_role')
-    user_id = session.get('user_id')
-    
+    user_role = conexion.sesion.get('user_role')
+
     if not inspeccion_id:
-        emit('error', {'msg': 'ID de inspección requerido'})
+        conexion.emit('error', {'msg': 'ID de inspección requerido'})
         return
 
-    if not _usuario_tiene_acceso_inspeccion(inspeccion_id):
-        emit('error', {'msg': 'No autorizado para esta inspección'})
+    if not _usuario_tiene_acceso_inspeccion(conexion, inspeccion_id):
+        conexion.emit('error', {'msg': 'No autorizado para esta inspección'})
         return
-    
+
     room = f"inspeccion_{inspeccion_id}"
-    join_room(room)
-    
+    conexion.unir(room)
+
     # Notificar a todos en la sala
-    emit('usuario_unido', {
-        'usuario': session.get('user_name', 'Usuario'),
+    conexion.emit('usuario_unido', {
+        'usuario': conexion.sesion.get('user_name', 'Usuario'),
         'role': user_role,
         'inspeccion_id': inspeccion_id
     }, to=room)
-    
 
-@socketio.on('join_establecimiento')
-def handle_join_establecimiento(data):
+
+@evento_socket('join_establecimiento')
+def handle_join_establecimiento(conexion, data):
     """Unirse a una sala de establecimiento para tiempo real sin inspección activa"""
     establecimiento_id = data.get('establecimiento_id')
-    
+
     if establecimiento_id:
-        if not _usuario_tiene_acceso_establecimiento(establecimiento_id):
-            emit('error', {'msg': 'No autorizado para este establecimiento'})
+        if not _usuario_tiene_acceso_establecimiento(conexion, establecimiento_id):
+            conexion.emit('error', {'msg': 'No autorizado para este establecimiento'})
             return
         room = f"establecimiento_{establecimiento_id}"
-        join_room(room)
-        
+        conexion.unir(room)
+
+
+def _registrar_cambios_checklist(establecimiento_id, calcular_items, observaciones, resumen, actualizado_por, timestamp):
+    """Aplica un cambio del checklist sobre el estado compartido y devuelve (parche, estado)."""
+    parche = {}
+
+    def aplicar(estado_prev):
+        estado = estado_prev or {}
+        parche.clear()
+        parche.update(
+            construir_parche(estado, calcular_items(estado.get('items') or {}), observaciones)
+        )
+        if not parche:
+            return estado_prev
+
+        if parche_modifica_items(parche):
+            reiniciar_confirmacion(estado)
+        if resumen and resumen != estado.get('resumen'):
+            parche['resumen'] = resumen
 
-@socketio.on('item_rating_tiempo_real')
-def handle_item_rating_tiempo_real(data):
-    """Manejar calificaciones en tiempo real para que el encargado las vea"""
+        estado = registrar_parche(estado, parche)
+        estado.update({
+            'establecimiento_id': establecimiento_id,
+            'actualizado_por': actualizado_por,
+            'timestamp': timestamp,
+        })
+        return estado
+
+    clave = f"establecimiento_{establecimiento_id}"
+    estado = datos_tiempo_real.actualizar(clave, aplicar)
+    if parche:
+        # El próximo autoguardado debe compararse contra el estado nuevo
+        huellas_borrador.descartar(clave)
+    return parche, estado or {}
+
+
+def _emitir_parche_checklist(conexion, establecimiento_id, parche, estado, actualizado_por, timestamp):
+    mensaje = mensaje_parche(
+        establecimiento_id, parche, estado,
+        actualizado_por=actualizado_por,
+        timestamp=timestamp,
+    )
+    anotar_parche(
+        establecimiento_id,
+        mensaje,
+        current_app.config.get('ESTADO_TIEMPO_REAL_HISTORIAL_PARCHES', 0),
+    )
+    conexion.emit(EVENTO_PARCHE, mensaje, to=f"establecimiento_{establecimiento_id}", include_self=False)
+
+
+def _reanudar_checklist(conexion, establecimiento_id, ultimo_seq):
+    """Enviar al cliente solo los parches que perdió, o la instantánea si ya no están"""
+    estado = datos_tiempo_real.get(f"establecimiento_{establecimiento_id}")
+    seq_actual = int((estado or {}).get('seq') or 0)
+
+    parches = None
+    try:
+        parches = parches_desde(establecimiento_id, int(ultimo_seq), seq_actual)
+    except (TypeError, ValueError):
+        pass
+
+    if parches is None:
+        conexion.emit(EVENTO_SNAPSHOT, snapshot(establecimiento_id, estado))
+        return
+
+    conexion.emit(EVENTO_REANUDACION, {
+        'establecimiento_id': establecimiento_id,
+        'seq': seq_actual,
+        'parches': parches,
+    })
+
+
+def _validar_editor_checklist(conexion, establecimiento_id):
+    if conexion.sesion.get('user_role') not in ['Inspector', 'Administrador']:
+        conexion.emit('error', {'msg': 'No autorizado para emitir cambios del checklist'})
+        return False
+
+    if not _usuario_tiene_acceso_establecimiento(conexion, establecimiento_id):
+        conexion.emit('error', {'msg': 'No autorizado para este establecimiento'})
+        return False
+    return True
+
+
+@evento_socket('checklist_parche')
+def handle_checklist_parche(conexion, data):
+    """Recibir solo los items que cambiaron y difundirlos con número de secuencia"""
     establecimiento_id = data.get('establecimiento_id')
+    if not establecimiento_id or not _validar_editor_checklist(conexion, establecimiento_id):
+        return {'aplicado': False}
+    establecimiento_id = int(establecimiento_id)
+
+    cambios = data.get('items') or {}
+    eliminados = data.get('items_eliminados') or []
     actualizado_por = data.get('actualizado_por')
-    user_role = session.get('user_role')
-    resumen = data.get('resumen', {})
+    timestamp = data.get('timestamp')
+
+    parche, estado = _registrar_cambios_checklist(
+        establecimiento_id,
+        lambda items: aplicar_diferencia_items(items, cambios, eliminados),
+        data.get('observaciones'),
+        data.get('resumen') or {},
+        actualizado_por,
+        timestamp,
+    )
+    if parche:
+        _emitir_parche_checklist(conexion, establecimiento_id, parche, estado, actualizado_por, timestamp)
+
+    # El acuse lleva la secuencia para que el emisor no la vea como hueco
+    return {'aplicado': bool(parche), 'seq': estado.get('seq', 0)}
+
+
+@evento_socket('item_rating_tiempo_real')
+def handle_item_rating_tiempo_real(conexion, data):
+    """Compatibilidad con clientes que aún envían el checklist completo"""
+    establecimiento_id = data.get('establecimiento_id')
+    if not establecimiento_id or not _validar_editor_checklist(conexion, establecimiento_id):
+        return
+    establecimiento_id = int(establecimiento_id)
+
     items = data.get('items', {})
-    observaciones = data.get('observaciones', '')
+    actualizado_por = data.get('actualizado_por')
     timestamp = data.get('timestamp')
-    confirmada_por_encargado = data.get('confirmada_por_encargado')
-    confirmador_nombre = data.get('confirmador_nombre')
-    confirmador_rol = data.get('confirmador_rol')
 
-    
-    if establecimiento_id:
-        if user_role not in ['Inspector', 'Administrador']:
-            emit('error', {'msg': 'No autorizado para emitir cambios del checklist'})
-            return
+    parche, estado = _registrar_cambios_checklist(
+        establecimiento_id,
+        lambda _items_prev: items,
+        data.get('observaciones', ''),
+        data.get('resumen', {}),
+        actualizado_por,
+        timestamp,
+    )
+    if parche:
+        _emitir_parche_checklist(conexion, establecimiento_id, parche, estado, actualizado_por, timestamp)
 
-        if not _usuario_tiene_acceso_establecimiento(establecimiento_id):
-            emit('error', {'msg': 'No autorizado para este establecimiento'})
-            return
 
-        room = f"establecimiento_{establecimiento_id}"
-            
-        clave_tiempo_real = f"establecimiento_{establecimiento_id}"
-        estado_prev = datos_tiempo_real.get(clave_tiempo_real, {})
-
-        if confirmada_por_encargado is None:
-            confirmada_por_encargado = estado_prev.get('confirmada_por_encargado', False)
-        if confirmada_por_encargado:
-            if confirmador_nombre is None:
-                confirmador_nombre = estado_prev.get('confirmador_nombre')
-            if confirmador_rol is None:
-                confirmador_rol = estado_prev.get('confirmador_rol')
-        else:
-            confirmador_nombre = None
-            confirmador_rol = None
-
-        datos_tiempo_real[clave_tiempo_real] = {
-            'establecimiento_id': establecimiento_id,
-            'actualizado_por': actualizado_por,
-            'resumen': resumen,
-            'timestamp': timestamp,
-            'items': items,
-            'observaciones': observaciones,
-            'confirmada_por_encargado': bool(confirmada_por_encargado),
-            'confirmador_nombre': confirmador_nombre,
-            'confirmador_rol': confirmador_rol
-        }
-        
-        # Emitir datos completos de tiempo real incluyendo resumen actualizado
-        datos_emitir = {
-            'establecimiento_id': establecimiento_id,
-            'actualizado_por': actualizado_por,
-            'resumen': resumen,
-            'timestamp': timestamp,
-            'items': items,
-            'observaciones': observaciones,
-            'confirmada_por_encargado': bool(confirmada_por_encargado),
-            'confirmador_nombre': confirmador_nombre,
-            'confirmador_rol': confirmador_rol
-        }
-        
-        
-        emit('inspeccion_tiempo_real', datos_emitir, to=room, include_self=False)
-        
-
-@socketio.on('leave_inspeccion')
-def on_leave_inspeccion(data):
+@evento_socket('solicitar_snapshot_checklist')
+def handle_solicitar_snapshot_checklist(conexion, data):
+    """Enviar el estado completo a un cliente que detectó un hueco en la secuencia"""
+    establecimiento_id = data.get('establecimiento_id')
+    if not establecimiento_id:
+        return
+
+    if not _usuario_tiene_acceso_establecimiento(conexion, establecimiento_id):
+        conexion.emit('error', {'msg': 'No autorizado para este establecimiento'})
+        return
+
+    estado = datos_tiempo_real.get(f"establecimiento_{establecimiento_id}")
+    conexion.emit(EVENTO_SNAPSHOT, snapshot(int(establecimiento_id), estado))
+
+
+@evento_socket('reanudar_checklist')
+def handle_reanudar_checklist(conexion, data):
+    """Reanudar tras reconexión a partir del último número de secuencia visto"""
+    establecimiento_id = data.get('establecimiento_id')
+    if not establecimiento_id:
+        return
+
+    if not _usuario_tiene_acceso_establecimiento(conexion, establecimiento_id):
+        conexion.emit('error', {'msg': 'No autorizado para este establecimiento'})
+        return
+
+    _reanudar_checklist(conexion, int(establecimiento_id), data.get('ultimo_seq'))
+
+
+@evento_socket('leave_inspeccion')
+def on_leave_inspeccion(conexion, data):
     """Cliente abandona la sala de inspección"""
     inspeccion_id = data.get('inspeccion_id')
-    user_role = session.get('user_role')
-    user_id = session.get('user_id')
-    
+
     room = f"inspeccion_{inspeccion_id}"
-    leave_room(room)
-    
-    emit('usuario_salio', {
-        'usuario': session.get('user_name', 'Usuario'),
+    conexion.salir(room)
+
+    conexion.emit('usuario_salio', {
+        'usuario': conexion.sesion.get('user_name', 'Usuario'),
         'inspeccion_id': inspeccion_id
     }, to=room)
 
-@socketio.on('actualizar_item')
-def handle_item_update(data):
+@evento_socket('actualizar_item')
+def handle_item_update(conexion, data):
     """Maneja la actualización en tiempo real de un item de inspección"""
     inspeccion_id = data.get('inspeccion_id')
     item_id = data.get('item_id')
     rating = data.get('rating')
     observacion = data.get('observacion', '')
-    user_role = session.get('user_role')
-    
+    user_role = conexion.sesion.get('user_role')
+
     if not all([inspeccion_id, item_id, rating is not None]):
-        emit('error', {'msg': 'Datos incompletos para actualizar item'})
+        conexion.emit('error', {'msg': 'Datos incompletos para actualizar item'})
         return
 
-    if not _usuario_tiene_acceso_inspeccion(inspeccion_id):
-        emit('error', {'msg': 'No autorizado para esta inspección'})
+    if not _usuario_tiene_acceso_inspeccion(conexion, inspeccion_id):
+        conexion.emit('error', {'msg': 'No autorizado para esta inspección'})
         return
-    
+
     room = f"inspeccion_{inspeccion_id}"
-    
-    # Enviar actualización a todos los clientes en la sala (excepto el que envía)
-    emit('item_actualizado', {
-        'inspeccion_id': inspeccion_id,
-        'item_id': item_id,
-        'rating': rating,
-        'observacion': observacion,
-        'actualizado_por': user_role,
-        'usuario': session.get('user_name', 'Usuario')
-    }, to=room, include_self=False)
 
-@socketio.on('actualizar_observaciones')
-def handle_observaciones_update(data):
+    # Enviar a la sala (excepto el que envía) agrupado con los cambios de la misma ventana
+    agrupador_items.agregar(
+        room,
+        {'item_id': item_id, 'rating': rating, 'observacion': observacion},
+        _ventana_emision_segundos(),
+        skip_sid=conexion.sid,
+        inspeccion_id=inspeccion_id,
+        actualizado_por=user_role,
+        usuario=conexion.sesion.get('user_name', 'Usuario'),
+    )
+
+@evento_socket('actualizar_observaciones')
+def handle_observaciones_update(conexion, data):
     """Maneja la actualización de observaciones generales"""
     inspeccion_id = data.get('inspeccion_id')
     observaciones = data.get('observaciones', '')
-    user_role = session.get('user_role')
+    user_role = conexion.sesion.get('user_role')
 
-    if not _usuario_tiene_acceso_inspeccion(inspeccion_id):
-        emit('error', {'msg': 'No autorizado para esta inspección'})
+    if not _usuario_tiene_acceso_inspeccion(conexion, inspeccion_id):
+        conexion.emit('error', {'msg': 'No autorizado para esta inspección'})
         return
-    
+
     room = f"inspeccion_{inspeccion_id}"
-    
-    emit('observaciones_actualizadas', {
-        'inspeccion_id': inspeccion_id,
-        'observaciones': observaciones,
-        'actualizado_por': user_role,
-        'usuario': session.get('user_name', 'Usuario')
-    }, to=room, include_self=False)
 
-@socketio.on('cambiar_estado_inspeccion')
-def handle_estado_change(data):
+    agrupador_items.agregar(
+        room,
+        None,
+        _ventana_emision_segundos(),
+        skip_sid=conexion.sid,
+        inspeccion_id=inspeccion_id,
+        observaciones=observaciones,
+        actualizado_por=user_role,
+        usuario=conexion.sesion.get('user_name', 'Usuario'),
+    )
+
+@evento_socket('cambiar_estado_inspeccion')
+def handle_estado_change(conexion, data):
     """Maneja el cambio de estado de la inspección"""
     inspeccion_id = data.get('inspeccion_id')
     nuevo_estado = data.get('estado')
-    user_role = session.get('user_role')
+    user_role = conexion.sesion.get('user_role')
 
-    if not _usuario_tiene_acceso_inspeccion(inspeccion_id):
-        emit('error', {'msg': 'No autorizado para esta inspección'})
+    if not _usuario_tiene_acceso_inspeccion(conexion, inspeccion_id):
+        conexion.emit('error', {'msg': 'No autorizado para esta inspección'})
         return
-    
+
     room = f"inspeccion_{inspeccion_id}"
-    
-    emit('estado_inspeccion_cambiado', {
+
+    conexion.emit('estado_inspeccion_cambiado', {
         'inspeccion_id': inspeccion_id,
         'estado': nuevo_estado,
         'cambiado_por': user_role,
-        'completado_por': session.get('user_name', 'Usuario')
+        'completado_por': conexion.sesion.get('user_name', 'Usuario')
     }, to=room, include_self=False)
 
-@socketio.on('solicitar_firma')
-def handle_solicitud_firma(data):
+@evento_socket('solicitar_firma')
+def handle_solicitud_firma(conexion, data):
     """Maneja solicitudes de firma del encargado"""
     inspeccion_id = data.get('inspeccion_id')
     tipo_firma = data.get('tipo')  # 'encargado' o 'inspector'
-    user_role = session.get('user_role')
+    user_role = conexion.sesion.get('user_role')
 
-    if not _usuario_tiene_acceso_inspeccion(inspeccion_id):
-        emit('error', {'msg': 'No autorizado para esta inspección'})
+    if not _usuario_tiene_acceso_inspeccion(conexion, inspeccion_id):
+        conexion.emit('error', {'msg': 'No autorizado para esta inspección'})
         return
-    
+
     room = f"inspeccion_{inspeccion_id}"
-    
-    emit('solicitud_firma', {
+
+    conexion.emit('solicitud_firma', {
         'inspeccion_id': inspeccion_id,
         'tipo_firma': tipo_firma,
         'solicitado_por': user_role,
         'mensaje': 'Se solicita su firma para aprobar la inspección'
     }, to=room, include_self=False)
 
-@socketio.on('encargado_aprobo')
-def handle_encargado_aprobo(data):
+@evento_socket('encargado_aprobo')
+def handle_encargado_aprobo(conexion, data):
     """Maneja cuando el encargado aprueba la inspección"""
     encargado_id = data.get('encargado_id')
     establecimiento_id = data.get('establecimiento_id')
     mensaje = data.get('mensaje', 'El encargado ha aprobado la inspección')
     firma_data = data.get('firma_data')
-    user_role = session.get('user_role')
+    user_role = conexion.sesion.get('user_role')
 
     if user_role not in ['Encargado', 'Jefe de Establecimiento']:
-        emit('error', {'msg': 'No autorizado para confirmar inspecciones'})
+        conexion.emit('error', {'msg': 'No autorizado para confirmar inspecciones'})
         return
 
-    if not _usuario_tiene_acceso_establecimiento(establecimiento_id):
-        emit('error', {'msg': 'No autorizado para este establecimiento'})
+    if not _usuario_tiene_acceso_establecimiento(conexion, establecimiento_id):
+        conexion.emit('error', {'msg': 'No autorizado para este establecimiento'})
         return
-    
+
     room = f"establecimiento_{establecimiento_id}"
-    emit('encargado_aprobo', {
+    conexion.emit('encargado_aprobo', {
         'mensaje': mensaje,
         'encargado_id': encargado_id,
         'establecimiento_id': establecimiento_id,
@@ -265,60 +456,83 @@ def handle_encargado_aprobo(data):
         'timestamp': data.get('timestamp')
     }, to=room, include_self=False)
 
-@socketio.on('notificacion_general')
-def handle_notificacion_general(data):
+@evento_socket('notificacion_general')
+def handle_notificacion_general(conexion, data):
     """Maneja notificaciones generales entre usuarios"""
     if data.get('tipo') == 'encargado_aprobo':
         establecimiento_id = data.get('establecimiento_id')
-        user_role = session.get('user_role')
+        user_role = conexion.sesion.get('user_role')
 
         if user_role not in ['Encargado', 'Jefe de Establecimiento']:
-            emit('error', {'msg': 'No autorizado para emitir esta notificación'})
+            conexion.emit('error', {'msg': 'No autorizado para emitir esta notificación'})
             return
 
-        if not _usuario_tiene_acceso_establecimiento(establecimiento_id):
-            emit('error', {'msg': 'No autorizado para este establecimiento'})
+        if not _usuario_tiene_acceso_establecimiento(conexion, establecimiento_id):
+            conexion.emit('error', {'msg': 'No autorizado para este establecimiento'})
             return
 
         room = f"establecimiento_{establecimiento_id}"
-        emit('notificacion_general', data, to=room, include_self=False)
+        conexion.emit('notificacion_general', data, to=room, include_self=False)
         return
 
     # Reenviar la notificación a todos los usuarios
-    emit('notificacion_general', data, broadcast=True, include_self=False)
+    conexion.emit('notificacion_general', data, broadcast=True, include_self=False)
 
-@socketio.on('disconnect')
-def handle_disconnect():
-    pass
+@evento_socket('disconnect')
+def handle_disconnect(conexion, data=None):
+    autorizaciones_socket.olvidar(conexion.sid)
 
-@socketio.on('ping_keepalive')
-def handle_ping_keepalive(data):
+@evento_socket('ping_keepalive')
+def handle_ping_keepalive(conexion, data):
     """Responder a ping para mantener conexión activa en móviles"""
-    emit('pong_keepalive', {'timestamp': data.get('timestamp'), 'server_time': __import__('time').time()})
+    conexion.emit('pong_keepalive', {'timestamp': data.get('timestamp'), 'server_time': __import__('time').time()})
 
-@socketio.on('estado_completo_reconexion')
-def handle_estado_completo_reconexion(data):
+@evento_socket('estado_completo_reconexion')
+def handle_estado_completo_reconexion(conexion, data):
     """Manejar reenvío de estado completo tras reconexión"""
     inspeccion_id = data.get('inspeccion_id')
     establecimiento_id = data.get('establecimiento_id')
 
     if inspeccion_id:
-        if not _usuario_tiene_acceso_inspeccion(inspeccion_id):
-            emit('error', {'msg': 'No autorizado para esta inspección'})
+        if not _usuario_tiene_acceso_inspeccion(conexion, inspeccion_id):
+            conexion.emit('error', {'msg': 'No autorizado para esta inspección'})
             return
+        # Con número de secuencia basta con reenviar al cliente lo que se perdió
+        if establecimiento_id and data.get('ultimo_seq') is not None:
+            _reanudar_checklist(conexion, int(establecimiento_id), data.get('ultimo_seq'))
+            return
+
         room = f"inspeccion_{inspeccion_id}"
+        # El estado compartido es la fuente de verdad entre workers; el payload
+        # del cliente solo se usa si el servidor aún no tiene estado.
+        estado_servidor = (
+            datos_tiempo_real.get(f"establecimiento_{establecimiento_id}")
+            if establecimiento_id
+            else None
+        ) or {}
         # Reenviar estado a todos en la sala para sincronizar
-        emit('estado_sincronizado', {
+        conexion.emit('estado_sincronizado', {
             'inspeccion_id': inspeccion_id,
             'establecimiento_id': establecimiento_id,
-            'items': data.get('items', {}),
-            'observaciones': data.get('observaciones', ''),
-            'resumen': data.get('resumen', {}),
+            'items': estado_servidor.get('items', data.get('items', {})),
+            'observaciones': estado_servidor.get('observaciones', data.get('observaciones', '')),
+            'resumen': estado_servidor.get('resumen', data.get('resumen', {})),
             'evidencias_count': data.get('evidencias_count', 0),
             'reconectado': True
         }, to=room)
 
 
+def _manejador_flask(handler):
+    def manejador(*args):
+        return handler(ConexionFlask(), args[0] if args else None)
+    manejador.__name__ = handler.__name__
+    return manejador
+
+
+for _nombre, _handler in EVENTOS_SOCKET.items():
+    socketio.on_event(_nombre, _manejador_flask(_handler))
+
+
 # Función auxiliar para emitir actualizaciones desde el controlador
 def emitir_actualizacion_item(inspeccion_id, item_data):
     """Función para emitir actualizaciones desde otros módulos"""
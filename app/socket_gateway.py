@@ -0,0 +1,143 @@
+"""Gateway asyncio de Socket.IO (opcional).
+
+Con Flask-SocketIO en modo ``threading`` cada websocket ocupa uno de los hilos
+de gunicorn mientras está abierto. Este gateway atiende las conexiones con el
+servidor asyncio de python-socketio: una conexión inactiva cuesta una
+corrutina y los hilos de gunicorn quedan para la API.
+
+Los eventos son los de ``app.socket_events`` (``EVENTOS_SOCKET``). Cada evento
+se ejecuta en un pool acotado de ``SOCKETIO_GATEWAY_HILOS`` hilos dentro del
+contexto de la app, con la sesión decodificada igual que Flask
+(``load_session_from_environ``); las emisiones y cambios de sala que hace el
+handler se aplican después sobre el servidor asyncio.
+
+Requisitos del despliegue:
+
+- ``SOCKETIO_MESSAGE_QUEUE`` (redis:// o amqp://): por ahí llegan las
+  emisiones de la app Flask, que corre con ``SOCKETIO_SOLO_PUBLICAR=true``.
+- ``ESTADO_TIEMPO_REAL_BACKEND=sqlite``: el estado vivo se comparte por archivo.
+
+Se arranca con ``python gateway_socketio.py``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+import socketio
+
+from app.services.emisiones_socket import gestor_cola_socketio
+from app.services.estado_compartido import BACKEND_MEMORIA, estado_compartido
+from app.socket_events import EVENTOS_SOCKET
+from app.utils.security import load_session_from_environ
+
+
+class ConexionGateway:
+    """Conexión del gateway: anota emisiones y salas para aplicarlas en el bucle."""
+
+    def __init__(self, sid: str, sesion: dict):
+        self.sid = sid
+        self.sesion = sesion
+        self._acciones: list[tuple] = []
+
+    def emit(self, evento, datos, to=None, include_self=True, broadcast=False):
+        # Misma semántica que flask_socketio.emit dentro de un evento
+        destino = to if to is not None or broadcast else self.sid
+        omitir = None if include_self or destino == self.sid else self.sid
+        self._acciones.append(("emit", evento, datos, destino, omitir))
+
+    def unir(self, room):
+        self._acciones.append(("unir", room))
+
+    def salir(self, room):
+        self._acciones.append(("salir", room))
+
+    async def aplicar(self, servidor: socketio.AsyncServer) -> None:
+        acciones, self._acciones = self._acciones, []
+        for accion in acciones:
+            if accion[0] == "emit":
+                _, evento, datos, destino, omitir = accion
+                await servidor.emit(evento, datos, to=destino, skip_sid=omitir)
+            elif accion[0] == "unir":
+                await servidor.enter_room(self.sid, accion[1])
+            else:
+                await servidor.leave_room(self.sid, accion[1])
+
+
+def _validar_configuracion(app) -> str:
+    message_queue = app.config.get("SOCKETIO_MESSAGE_QUEUE")
+    if not message_queue:
+        raise RuntimeError(
+            "El gateway Socket.IO necesita SOCKETIO_MESSAGE_QUEUE para recibir las "
+            "emisiones de la app Flask."
+        )
+    if estado_compartido.backend.nombre == BACKEND_MEMORIA:
+        raise RuntimeError(
+            "El gateway Socket.IO corre en otro proceso: configura "
+            "ESTADO_TIEMPO_REAL_BACKEND=sqlite para compartir el estado en tiempo real."
+        )
+    return message_queue
+
+
+def crear_gateway(app) -> socketio.ASGIApp:
+    """Servidor asyncio con los eventos de ``app.socket_events``, como app ASGI."""
+    message_queue = _validar_configuracion(app)
+
+    opciones: dict[str, Any] = {
+        "async_mode": "asgi",
+        "client_manager": gestor_cola_socketio(message_queue, asincrono=True),
+        # Nuestro connect nunca rechaza, y así puede emitir 'connected' al instante
+        "always_connect": True,
+        "logger": app.config["FLASK_ENV"] == "development",
+        "engineio_logger": app.config["FLASK_ENV"] == "development",
+    }
+    cors_allowed_origins = app.config.get("SOCKETIO_CORS_ALLOWED_ORIGINS")
+    if cors_allowed_origins is not None:
+        opciones["cors_allowed_origins"] = cors_allowed_origins
+    servidor = socketio.AsyncServer(**opciones)
+
+    hilos = ThreadPoolExecutor(
+        max_workers=max(1, app.config.get("SOCKETIO_GATEWAY_HILOS", 16)),
+        thread_name_prefix="gateway-socketio",
+    )
+
+    def ejecutar(handler, conexion: ConexionGateway, data):
+        with app.app_context():
+            return handler(conexion, data)
+
+    async def despachar(handler, sid: str, data, sesion: Optional[dict] = None):
+        if sesion is None:
+            sesion = await servidor.get_session(sid)
+        conexion = ConexionGateway(sid, sesion)
+        resultado = await asyncio.get_running_loop().run_in_executor(
+            hilos, ejecutar, handler, conexion, data
+        )
+        await conexion.aplicar(servidor)
+        return resultado
+
+    def registrar(nombre: str, handler) -> None:
+        async def manejar(sid, data=None):
+            return await despachar(handler, sid, data)
+
+        servidor.on(nombre, manejar)
+
+    for nombre, handler in EVENTOS_SOCKET.items():
+        if nombre not in ("connect", "disconnect"):
+            registrar(nombre, handler)
+
+    @servidor.on("connect")
+    async def conectar(sid, environ, auth=None):
+        sesion = load_session_from_environ(app, environ)
+        await servidor.save_session(sid, sesion)
+        await despachar(EVENTOS_SOCKET["connect"], sid, auth, sesion)
+
+    @servidor.on("disconnect")
+    async def desconectar(sid, *args):
+        await despachar(EVENTOS_SOCKET["disconnect"], sid, None, {})
+
+    def cerrar():
+        hilos.shutdown(wait=False)
+
+    return socketio.ASGIApp(servidor, on_shutdown=cerrar)
@@ -693,6 +693,133 @@ function inicializarDatosUsuario() {
 // Control de cambios para optimización de emisiones en tiempo real
 let hayCambiosPendientes = false;
 let ultimoEstadoEmitido = null;
+let ultimoEstablecimientoEmitido = null;
+
+// Protocolo de parches del checklist: último seq e items vistos por establecimiento
+const estadoChecklistRemoto = {};
+const snapshotsChecklistSolicitados = {};
+
+function camposItemDefinidos(item) {
+    if (!item || typeof item !== 'object') return item;
+    const campos = {};
+    Object.keys(item).forEach(campo => {
+        if (item[campo] !== null && item[campo] !== undefined) {
+            campos[campo] = item[campo];
+        }
+    });
+    return campos;
+}
+
+// Diferencia campo a campo entre dos mapas de items (null = campo eliminado)
+function calcularParcheItems(anteriores, actuales) {
+    anteriores = anteriores || {};
+    actuales = actuales || {};
+    const items = {};
+
+    Object.keys(actuales).forEach(itemId => {
+        const previo = camposItemDefinidos(anteriores[itemId]);
+        const nuevo = camposItemDefinidos(actuales[itemId]);
+        if (JSON.stringify(previo) === JSON.stringify(nuevo)) return;
+
+        if (!previo || typeof previo !== 'object' || !nuevo || typeof nuevo !== 'object') {
+            items[itemId] = nuevo;
+            return;
+        }
+
+        const campos = {};
+        Object.keys(nuevo).forEach(campo => {
+            if (JSON.stringify(previo[campo]) !== JSON.stringify(nuevo[campo])) {
+                campos[campo] = nuevo[campo];
+            }
+        });
+        Object.keys(previo).forEach(campo => {
+            if (!(campo in nuevo)) campos[campo] = null;
+        });
+        items[itemId] = campos;
+    });
+
+    const eliminados = Object.keys(anteriores).filter(itemId => !(itemId in actuales));
+    return { items, eliminados };
+}
+
+function aplicarDiferenciaItems(items, cambios, eliminados) {
+    const resultado = { ...(items || {}) };
+    (eliminados || []).forEach(itemId => {
+        delete resultado[String(itemId)];
+    });
+
+    Object.keys(cambios || {}).forEach(itemId => {
+        const campos = cambios[itemId];
+        if (!campos || typeof campos !== 'object') {
+            resultado[itemId] = campos;
+            return;
+        }
+        const item = { ...(resultado[itemId] || {}) };
+        Object.keys(campos).forEach(campo => {
+            if (campos[campo] === null) {
+                delete item[campo];
+            } else {
+                item[campo] = campos[campo];
+            }
+        });
+        resultado[itemId] = item;
+    });
+    return resultado;
+}
+
+function solicitarSnapshotChecklist(establecimientoId) {
+    if (!socket || !socket.connected || snapshotsChecklistSolicitados[establecimientoId]) return;
+    snapshotsChecklistSolicitados[establecimientoId] = true;
+    socket.emit('solicitar_snapshot_checklist', { establecimiento_id: establecimientoId });
+}
+
+function aplicarParcheChecklist(parche) {
+    if (!parche || !parche.establecimiento_id) return;
+
+    const establecimientoId = parche.establecimiento_id;
+    const base = estadoChecklistRemoto[establecimientoId];
+
+    // Sin base conocida o con un hueco en la secuencia: pedir instantánea completa
+    if (!base || parche.seq > base.seq + 1) {
+        solicitarSnapshotChecklist(establecimientoId);
+        return;
+    }
+    if (parche.seq <= base.seq) return;
+
+    base.items = aplicarDiferenciaItems(base.items, parche.items, parche.items_eliminados);
+    base.seq = parche.seq;
+
+    const itemsCambiados = {};
+    Object.keys(parche.items || {}).forEach(itemId => {
+        if (base.items[itemId]) itemsCambiados[itemId] = base.items[itemId];
+    });
+
+    procesarEstadoTiempoReal({ ...parche, items: itemsCambiados }, false);
+}
+
+// Tras (re)conectar: pedir solo los parches perdidos si ya conocemos una secuencia
+async function sincronizarChecklistTrasConexion(establecimientoId) {
+    const base = estadoChecklistRemoto[establecimientoId];
+    if (base && socket && socket.connected) {
+        socket.emit('reanudar_checklist', {
+            establecimiento_id: establecimientoId,
+            ultimo_seq: base.seq
+        });
+        return true;
+    }
+    return sincronizarEstablecimientoInmediatamente(establecimientoId);
+}
+
+function aplicarSnapshotChecklist(data) {
+    if (!data || !data.establecimiento_id) return;
+
+    delete snapshotsChecklistSolicitados[data.establecimiento_id];
+    estadoChecklistRemoto[data.establecimiento_id] = {
+        seq: data.seq || 0,
+        items: JSON.parse(JSON.stringify(data.items || {}))
+    };
+    procesarEstadoTiempoReal(data, true);
+}
 
 // Configuración de autosave - guardado inmediato en cada cambio
 const AUTOSAVE_INTERVAL = 5000; // 5 segundos para guardado de seguridad (si falló el inmediato)
@@ -715,6 +842,7 @@ function consolidarEstadoTrasConfirmacionEncargado() {
     hayCambiosPendientes = false;
     window.hayCambiosPendientes = false;
 
+    ultimoEstablecimientoEmitido = window.inspeccionEstado?.establecimiento_id || null;
     ultimoEstadoEmitido = {
         items: JSON.parse(JSON.stringify(window.inspeccionEstado?.items || {})),
         observaciones: window.inspeccionEstado?.observaciones || '',
@@ -981,7 +1109,7 @@ function inicializarSocketIO() {
                         role: userRole
                     });
 
-                    await sincronizarEstablecimientoInmediatamente(window.inspeccionEstado.establecimiento_id);
+                    await sincronizarChecklistTrasConexion(window.inspeccionEstado.establecimiento_id);
                 }
 
                 // Reenviar estado actual tras conexión si existe
@@ -999,6 +1127,7 @@ function inicializarSocketIO() {
 
     socket.on('disconnect', function (reason) {
         mostrarEstadoConexion('Desconectado', 'error');
+        Object.keys(snapshotsChecklistSolicitados).forEach(id => delete snapshotsChecklistSolicitados[id]);
     });
 
     socket.on('reconnect', function (attemptNumber) {
@@ -1021,7 +1150,7 @@ function inicializarSocketIO() {
                         role: userRole
                     });
 
-                    await sincronizarEstablecimientoInmediatamente(window.inspeccionEstado.establecimiento_id);
+                    await sincronizarChecklistTrasConexion(window.inspeccionEstado.establecimiento_id);
                 }
 
                 // Reenviar estado actual tras reconexión si existe
@@ -1061,30 +1190,23 @@ function inicializarSocketIO() {
         actualizarItemEnTiempoReal(data);
     });
 
-    // Nuevo evento para tiempo real completo en establecimiento
+    // Estado completo en establecimiento (clientes y servidores anteriores a los parches)
     socket.on('inspeccion_tiempo_real', function (data) {
-        if (!data || !data.establecimiento_id) {
-            return;
-        }
-
-        if (userRole === 'Encargado' || userRole === 'Jefe de Establecimiento') {
-            const sincronizacionParcial = actualizarDatosTiempoRealCompletos(data);
+        procesarEstadoTiempoReal(data, true);
+    });
 
-            if (!sincronizacionParcial) {
-                mostrarNotificacion('Sincronizacion completa solicitada al servidor', 'info');
+    // Cambios incrementales del checklist con número de secuencia
+    socket.on('checklist_parche', function (parche) {
+        aplicarParcheChecklist(parche);
+    });
 
-                sincronizarEstablecimientoInmediatamente(data.establecimiento_id).then(exito => {
-                    if (exito) {
-                        mostrarNotificacion('Datos sincronizados automaticamente', 'success');
-                    }
-                });
-            }
-            return;
-        }
+    socket.on('checklist_snapshot', function (data) {
+        aplicarSnapshotChecklist(data);
+    });
 
-        if (esRolEditorChecklist()) {
-            actualizarEstadoTiempoRealInspector(data);
-        }
+    // Parches perdidos durante una desconexión, en orden de secuencia
+    socket.on('checklist_reanudacion', function (data) {
+        (data?.parches || []).forEach(parche => aplicarParcheChecklist(parche));
     });
 
     socket.on('item_actualizado', function (data) {
@@ -1094,6 +1216,13 @@ function inicializarSocketIO() {
         }
     });
 
+    // Varios items (y observaciones) de un mismo guardado en un solo mensaje
+    socket.on('items_actualizados', function (data) {
+        if ((userRole === 'Encargado' || userRole === 'Jefe de Establecimiento') && data.actualizado_por === 'Inspector') {
+            actualizarItemsEnTiempoReal(data);
+        }
+    });
+
     socket.on('observaciones_actualizadas', function (data) {
         // Solo mostrar al encargado cuando el inspector actualiza
         if ((userRole === 'Encargado' || userRole === 'Jefe de Establecimiento') && data.actualizado_por === 'Inspector') {
@@ -1302,6 +1431,17 @@ function mostrarEstadoConexion(estado, tipo) {
 function emitirEstadoCompleto() {
     if (!socket || !socket.connected) return;
 
+    // Con secuencia conocida el servidor solo reenvía los parches perdidos
+    const base = estadoChecklistRemoto[window.inspeccionEstado.establecimiento_id];
+    if (base) {
+        socket.emit('estado_completo_reconexion', {
+            establecimiento_id: window.inspeccionEstado.establecimiento_id,
+            inspeccion_id: inspeccionActualId,
+            ultimo_seq: base.seq
+        });
+        return;
+    }
+
     const estadoCompleto = {
         establecimiento_id: window.inspeccionEstado.establecimiento_id,
         inspeccion_id: inspeccionActualId,
@@ -1517,6 +1657,31 @@ function actualizarItemEnTiempoReal(data) {
     );
 }
 
+function procesarEstadoTiempoReal(data, permitirSincronizacionCompleta) {
+    if (!data || !data.establecimiento_id) {
+        return;
+    }
+
+    if (userRole === 'Encargado' || userRole === 'Jefe de Establecimiento') {
+        const sincronizacionParcial = actualizarDatosTiempoRealCompletos(data);
+
+        if (!sincronizacionParcial && permitirSincronizacionCompleta) {
+            mostrarNotificacion('Sincronizacion completa solicitada al servidor', 'info');
+
+            sincronizarEstablecimientoInmediatamente(data.establecimiento_id).then(exito => {
+                if (exito) {
+                    mostrarNotificacion('Datos sincronizados automaticamente', 'success');
+                }
+            });
+        }
+        return;
+    }
+
+    if (esRolEditorChecklist()) {
+        actualizarEstadoTiempoRealInspector(data);
+    }
+}
+
 function actualizarDatosTiempoRealCompletos(data) {
     if (userRole !== 'Encargado' && userRole !== 'Jefe de Establecimiento') {
         return false;
@@ -1680,6 +1845,46 @@ function actualizarResumenConPuntajes(puntajes) {
     actualizarInterfazResumen();
 }
 
+function actualizarItemsEnTiempoReal(data) {
+    const items = data.items || [];
+
+    items.forEach(item => {
+        const itemElement = document.querySelector(`input[data-item-id="${item.item_id}"][value="${item.rating}"]`);
+        if (itemElement) {
+            itemElement.checked = true;
+            document.querySelectorAll(`input[data-item-id="${item.item_id}"]`).forEach(radio => {
+                radio.disabled = true;
+            });
+        }
+
+        const estadoPrevio = window.inspeccionEstado.items[item.item_id] || {};
+        window.inspeccionEstado.items[item.item_id] = {
+            ...estadoPrevio,
+            rating: item.rating,
+            puntaje_maximo: item.puntaje_maximo || estadoPrevio.puntaje_maximo,
+            riesgo: item.riesgo || estadoPrevio.riesgo
+        };
+    });
+
+    if (items.length > 0) {
+        if (!window.inspeccionEstado.resumen) {
+            window.inspeccionEstado.resumen = {};
+        }
+        window.inspeccionEstado.resumen.total_items = window.inspeccionEstado.resumen.total_items ?? obtenerTotalItemsDisponibles();
+        recalcularResumenEncargado();
+        mostrarNotificacion(
+            items.length === 1
+                ? `Item actualizado: ${obtenerEtiquetaCalificacion(items[0].riesgo, items[0].rating)}`
+                : `${items.length} items actualizados`,
+            'info'
+        );
+    }
+
+    if (data.observaciones !== undefined && data.observaciones !== null) {
+        actualizarObservacionesEnTiempoReal(data);
+    }
+}
+
 function actualizarObservacionesEnTiempoReal(data) {
     const observacionesTextarea = document.getElementById('observaciones-generales');
     if (observacionesTextarea) {
@@ -3175,23 +3380,32 @@ async function guardarEstadoTemporal(forzarEmision = false) {
             const hayChanges = hayCambiosPendientes || hayDiferenciasEnEstado() || forzarEmision;
 
             if (hayChanges) {
+                const establecimientoId = window.inspeccionEstado.establecimiento_id;
+                const emitidoPrevio = ultimoEstablecimientoEmitido === establecimientoId ? ultimoEstadoEmitido : null;
+                const diferencia = calcularParcheItems(
+                    emitidoPrevio ? emitidoPrevio.items : {},
+                    window.inspeccionEstado.items
+                );
                 const datosEmitir = {
-                    establecimiento_id: window.inspeccionEstado.establecimiento_id,
-                    items: window.inspeccionEstado.items,
-                    observaciones: window.inspeccionEstado.observaciones,
+                    establecimiento_id: establecimientoId,
+                    items: diferencia.items,
+                    items_eliminados: diferencia.eliminados,
                     resumen: window.inspeccionEstado.resumen,
                     actualizado_por: userRole,
                     timestamp: Date.now()
                 };
+                if (!emitidoPrevio || emitidoPrevio.observaciones !== window.inspeccionEstado.observaciones) {
+                    datosEmitir.observaciones = window.inspeccionEstado.observaciones || '';
+                }
 
-                const confirmaciones = window.inspeccionEstado.confirmacionesPorEstablecimiento || {};
-                const estadoConfirmacionActual = confirmaciones[window.inspeccionEstado.establecimiento_id] || {};
-                datosEmitir.confirmada_por_encargado = Boolean(estadoConfirmacionActual.confirmada_por_encargado);
-                datosEmitir.confirmador_nombre = estadoConfirmacionActual.confirmador_nombre || null;
-                datosEmitir.confirmador_rol = estadoConfirmacionActual.confirmador_rol || null;
-
-
-                socket.emit('item_rating_tiempo_real', datosEmitir);
+                socket.emit('checklist_parche', datosEmitir, function (acuse) {
+                    // Si nuestro parche fue el siguiente de la secuencia, avanzar la base local
+                    const base = estadoChecklistRemoto[establecimientoId];
+                    if (acuse && acuse.aplicado && base && acuse.seq === base.seq + 1) {
+                        base.items = aplicarDiferenciaItems(base.items, datosEmitir.items, datosEmitir.items_eliminados);
+                        base.seq = acuse.seq;
+                    }
+                });
 
                 // También unirse al room del establecimiento si no lo está
                 socket.emit('join_establecimiento', {
@@ -3201,6 +3415,7 @@ async function guardarEstadoTemporal(forzarEmision = false) {
                 });
 
                 // Guardar el estado actual como último emitido
+                ultimoEstablecimientoEmitido = establecimientoId;
                 ultimoEstadoEmitido = {
                     items: JSON.parse(JSON.stringify(window.inspeccionEstado.items)),
                     observaciones: window.inspeccionEstado.observaciones,
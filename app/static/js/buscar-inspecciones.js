@@ -5,6 +5,12 @@
 
 // ===== VARIABLES GLOBALES =====
 let inspecciones = [];
+// Paginación por cursor: cursor de inicio de cada página visitada (la primera es null)
+let cursoresPaginas = [null];
+let paginaActual = 0;
+let siguienteCursor = null;
+// Filtros con los que se pidió la primera página; los cursores solo valen con ellos
+let filtrosBusqueda = new URLSearchParams();
 
 // ===== ELEMENTOS DEL DOM =====
 let filtroEstablecimiento, filtroEncargado, filtroFechaDesde, filtroFechaHasta, filtroEstado;
@@ -85,6 +91,8 @@ function obtenerElementosDOM() {
 function configurarEventos() {
     // Botones principales
     if (btnBuscar) btnBuscar.addEventListener('click', buscarInspecciones);
+    document.getElementById('btn-anterior')?.addEventListener('click', () => cargarPaginaInspecciones(paginaActual - 1));
+    document.getElementById('btn-siguiente')?.addEventListener('click', () => cargarPaginaInspecciones(paginaActual + 1));
     if (btnLimpiar) btnLimpiar.addEventListener('click', limpiarFiltros);
     if (btnNuevaInspeccion) btnNuevaInspeccion.addEventListener('click', () => window.location.href = '/');
     if (cerrarModal) cerrarModal.addEventListener('click', cerrarModalPrevia);
@@ -204,21 +212,43 @@ async function cargarEncargados(establecimientoId) {
 
 // ===== BÚSQUEDA DE INSPECCIONES =====
 async function buscarInspecciones() {
+    // Filtros nuevos: se fijan junto con la pila de cursores y se vuelve a la primera página
+    filtrosBusqueda = leerFiltros();
+    cursoresPaginas = [null];
+    await cargarPaginaInspecciones(0);
+}
+
+function leerFiltros() {
+    const filtros = new URLSearchParams();
+
+    if (filtroEstablecimiento && filtroEstablecimiento.value) filtros.append('establecimiento_id', filtroEstablecimiento.value);
+    if (filtroEncargado && filtroEncargado.value) filtros.append('encargado_id', filtroEncargado.value);
+    if (filtroFechaDesde && filtroFechaDesde.value) filtros.append('fecha_desde', filtroFechaDesde.value);
+    if (filtroFechaHasta && filtroFechaHasta.value) filtros.append('fecha_hasta', filtroFechaHasta.value);
+    if (filtroEstado && filtroEstado.value) filtros.append('estado', filtroEstado.value);
+
+    return filtros;
+}
+
+async function cargarPaginaInspecciones(pagina) {
+    if (pagina < 0 || pagina >= cursoresPaginas.length) return;
     mostrarLoading(true);
 
     try {
-        const params = new URLSearchParams();
-
-        if (filtroEstablecimiento && filtroEstablecimiento.value) params.append('establecimiento_id', filtroEstablecimiento.value);
-        if (filtroEncargado && filtroEncargado.value) params.append('encargado_id', filtroEncargado.value);
-        if (filtroFechaDesde && filtroFechaDesde.value) params.append('fecha_desde', filtroFechaDesde.value);
-        if (filtroFechaHasta && filtroFechaHasta.value) params.append('fecha_hasta', filtroFechaHasta.value);
-        if (filtroEstado && filtroEstado.value) params.append('estado', filtroEstado.value);
+        // Anterior/siguiente reutilizan los filtros de la búsqueda, no los que haya ahora en el formulario
+        const params = new URLSearchParams(filtrosBusqueda);
+        if (cursoresPaginas[pagina]) params.append('cursor', cursoresPaginas[pagina]);
 
         const response = await fetch(`/api/inspecciones/buscar?${params.toString()}`);
         if (response.ok) {
-            inspecciones = await response.json();
+            const datos = await response.json();
+            inspecciones = datos.inspecciones || [];
+            siguienteCursor = datos.siguiente_cursor || null;
+            paginaActual = pagina;
+            cursoresPaginas = cursoresPaginas.slice(0, pagina + 1);
+            if (siguienteCursor) cursoresPaginas.push(siguienteCursor);
             mostrarResultados();
+            actualizarPaginacion();
         } else {
             throw new Error('Error en la búsqueda');
         }
@@ -229,6 +259,22 @@ async function buscarInspecciones() {
     }
 }
 
+function actualizarPaginacion() {
+    const paginacion = document.getElementById('paginacion');
+    if (!paginacion) return;
+
+    const hayVariasPaginas = paginaActual > 0 || Boolean(siguienteCursor);
+    paginacion.classList.toggle('hidden', !hayVariasPaginas);
+
+    const btnAnterior = document.getElementById('btn-anterior');
+    const btnSiguiente = document.getElementById('btn-siguiente');
+    if (btnAnterior) btnAnterior.disabled = paginaActual === 0;
+    if (btnSiguiente) btnSiguiente.disabled = !siguienteCursor;
+
+    const infoPagina = document.getElementById('info-pagina');
+    if (infoPagina) infoPagina.textContent = `Página ${paginaActual + 1}`;
+}
+
 // ===== VISUALIZACIÓN DE RESULTADOS =====
 function mostrarResultados() {
     if (!listaInspecciones || !contadorResultados) return;
@@ -248,7 +294,7 @@ function mostrarResultados() {
 
     alternarVistasResultados(true);
     if (sinResultados) sinResultados.classList.add('hidden');
-    contadorResultados.textContent = `${inspecciones.length} inspección${inspecciones.length !== 1 ? 'es' : ''} encontrada${inspecciones.length !== 1 ? 's' : ''}`;
+    contadorResultados.textContent = `${inspecciones.length}${siguienteCursor ? '+' : ''} inspección${inspecciones.length !== 1 ? 'es' : ''} encontrada${inspecciones.length !== 1 ? 's' : ''}`;
     
     // Generar HTML asegurándose de que sea un string válido
     const html = inspecciones.map(inspeccion => {
@@ -48,6 +48,15 @@ def register_security(app):
     app.after_request(set_security_headers)
 
 
+def load_session_from_environ(app, environ):
+    """Decode the session cookie of a WSGI-style environ exactly as Flask would.
+
+    Used by the asyncio Socket.IO gateway, which runs outside Flask requests.
+    """
+    session_data = app.session_interface.open_session(app, app.request_class(environ))
+    return dict(session_data or {})
+
+
 def generate_csrf_token():
     token = session.get(CSRF_SESSION_KEY)
     if not token:
@@ -0,0 +1,189 @@
+"""
+Descripción: Benchmark del guardado de detalles de inspección (InspeccionDetalle)
+Lógica: Compara el guardado anterior (un SELECT por item) con el guardado en bloque
+        de InspeccionesController._guardar_detalles_inspeccion para checklists de
+        50, 150 y 300 items. Mide sentencias SQL y latencia del primer guardado
+        (inserciones) y de un segundo guardado (actualizaciones).
+        Usa una base SQLite temporal propia; para medir contra MySQL indicar una
+        base de pruebas en BENCHMARK_DATABASE_URL (se crean y borran tablas).
+Ejemplo de Uso:
+    python benchmark_guardar_detalles.py
+    python benchmark_guardar_detalles.py 50 500
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+_directorio_temporal = tempfile.mkdtemp(prefix="benchmark_detalles_")
+os.environ["DATABASE_URL"] = os.getenv(
+    "BENCHMARK_DATABASE_URL",
+    f"sqlite:///{os.path.join(_directorio_temporal, 'benchmark.db')}",
+)
+os.environ["ESTADO_TIEMPO_REAL_DIARIO"] = "false"
+
+from sqlalchemy import event
+
+from app import create_app
+from app.extensions import db
+from app.controllers.inspecciones_controller import InspeccionesController
+from app.models.Inspecciones_models import (
+    CategoriaEvaluacion,
+    Establecimiento,
+    Inspeccion,
+    InspeccionDetalle,
+    ItemEvaluacionBase,
+    ItemEvaluacionEstablecimiento,
+)
+from app.models.Usuario_models import Rol, Usuario
+
+TAMANOS = [int(valor) for valor in sys.argv[1:]] or [50, 150, 300]
+
+
+class ContadorSentencias:
+    def __init__(self, engine):
+        self.total = 0
+        event.listen(engine, "before_cursor_execute", self._contar)
+
+    def _contar(self, conn, cursor, statement, parameters, context, executemany):
+        self.total += 1
+
+
+def preparar_datos(max_items):
+    rol = Rol(nombre="Inspector")
+    db.session.add(rol)
+    db.session.flush()
+    inspector = Usuario(
+        nombre="Benchmark",
+        nombre_usuario="benchmark",
+        correo="benchmark@example.com",
+        contrasena="-",
+        rol_id=rol.id,
+    )
+    establecimiento = Establecimiento(nombre="Benchmark")
+    categoria = CategoriaEvaluacion(nombre="Benchmark", orden=1)
+    db.session.add_all([inspector, establecimiento, categoria])
+    db.session.flush()
+
+    items = []
+    for indice in range(max_items):
+        item_base = ItemEvaluacionBase(
+            categoria_id=categoria.id,
+            codigo=f"B{indice}",
+            descripcion="Item de benchmark",
+            riesgo=("Menor", "Mayor", "Crítico")[indice % 3],
+            orden=indice,
+        )
+        db.session.add(item_base)
+        db.session.flush()
+        item_establecimiento = ItemEvaluacionEstablecimiento(
+            establecimiento_id=establecimiento.id, item_base_id=item_base.id
+        )
+        db.session.add(item_establecimiento)
+        items.append(item_establecimiento)
+    db.session.commit()
+    return inspector.id, establecimiento.id, [item.id for item in items]
+
+
+def detalles_de_prueba(item_ids, rating):
+    return {
+        item_id: {"rating": rating, "score": float(rating), "observacion_item": ""}
+        for item_id in item_ids
+    }
+
+
+def guardar_uno_por_uno(inspeccion_id, detalles_por_item):
+    """Guardado anterior: busca cada detalle antes de insertarlo o actualizarlo."""
+    for item_id, valores in detalles_por_item.items():
+        detalle = InspeccionDetalle.query.filter_by(
+            inspeccion_id=inspeccion_id, item_establecimiento_id=item_id
+        ).first()
+        if not detalle:
+            detalle = InspeccionDetalle(
+                inspeccion_id=inspeccion_id, item_establecimiento_id=item_id
+            )
+            db.session.add(detalle)
+        detalle.rating = valores["rating"]
+        detalle.score = valores["score"]
+        detalle.observacion_item = valores["observacion_item"]
+
+
+def guardar_en_bloque(inspeccion_id, detalles_por_item):
+    InspeccionesController._guardar_detalles_inspeccion(inspeccion_id, detalles_por_item)
+
+
+def medir(contador, funcion, inspeccion_id, detalles_por_item):
+    db.session.expunge_all()
+    antes = contador.total
+    inicio = time.perf_counter()
+    funcion(inspeccion_id, detalles_por_item)
+    db.session.commit()
+    return contador.total - antes, (time.perf_counter() - inicio) * 1000
+
+
+def main():
+    app = create_app()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        inspector_id, establecimiento_id, item_ids = preparar_datos(max(TAMANOS))
+        contador = ContadorSentencias(db.engine)
+
+        print("\n" + "=" * 80)
+        print("BENCHMARK - GUARDADO DE DETALLES DE INSPECCIÓN")
+        print(f"Base de datos: {db.engine.url.render_as_string(hide_password=True)}")
+        print("=" * 80)
+        print(
+            f"{'items':>6}  {'método':<12} {'sql 1º':>7} {'ms 1º':>9} "
+            f"{'sql 2º':>7} {'ms 2º':>9}"
+        )
+        print("-" * 80)
+
+        for tamano in TAMANOS:
+            for nombre, funcion in (
+                ("uno a uno", guardar_uno_por_uno),
+                ("en bloque", guardar_en_bloque),
+            ):
+                inspeccion = Inspeccion(
+                    establecimiento_id=establecimiento_id,
+                    inspector_id=inspector_id,
+                    fecha=date.today(),
+                    estado="en_proceso",
+                )
+                db.session.add(inspeccion)
+                db.session.commit()
+                inspeccion_id = inspeccion.id
+
+                ids = item_ids[:tamano]
+                sql_alta, ms_alta = medir(
+                    contador, funcion, inspeccion_id, detalles_de_prueba(ids, 2)
+                )
+                sql_cambio, ms_cambio = medir(
+                    contador, funcion, inspeccion_id, detalles_de_prueba(ids, 3)
+                )
+
+                guardados = InspeccionDetalle.query.filter_by(
+                    inspeccion_id=inspeccion_id, rating=3
+                ).count()
+                if guardados != tamano:
+                    raise SystemExit(
+                        f"❌ {nombre}: se esperaban {tamano} detalles y hay {guardados}"
+                    )
+
+                print(
+                    f"{tamano:>6}  {nombre:<12} {sql_alta:>7} {ms_alta:>9.1f} "
+                    f"{sql_cambio:>7} {ms_cambio:>9.1f}"
+                )
+
+        print("-" * 80)
+        print("1º = primer guardado (inserciones), 2º = segundo guardado (actualizaciones)")
+        print("Cada executemany cuenta como una sentencia.")
+        db.drop_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+Descripción: Gateway asyncio de Socket.IO (ver app/socket_gateway.py)
+Lógica: Atiende los websockets del checklist en tiempo real con corrutinas y
+        recibe por SOCKETIO_MESSAGE_QUEUE lo que emite la app Flask, que corre
+        con SOCKETIO_SOLO_PUBLICAR=true. Requiere uvicorn y redis instalados y
+        ESTADO_TIEMPO_REAL_BACKEND=sqlite.
+Ejemplo de Uso:
+    python gateway_socketio.py
+    uvicorn gateway_socketio:application --host 127.0.0.1 --port 5061
+"""
+
+import os
+
+# Dentro del gateway Flask-SocketIO solo publica en la cola (emisiones de servicios)
+os.environ.setdefault("SOCKETIO_SOLO_PUBLICAR", "true")
+
+from app import create_app
+from app.socket_gateway import crear_gateway
+
+app = create_app()
+application = crear_gateway(app)
+
+
+if __name__ == "__main__":
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("❌ El gateway necesita uvicorn: pip install uvicorn")
+
+    host, _, port = os.getenv("SOCKETIO_GATEWAY_BIND", "127.0.0.1:5061").rpartition(":")
+    print(f"🚀 Iniciando gateway Socket.IO en {host}:{port}...")
+    uvicorn.run(application, host=host, port=int(port), log_level="info")
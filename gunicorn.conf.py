@@ -17,8 +17,16 @@ limit_request_fields = int(os.getenv("GUNICORN_LIMIT_REQUEST_FIELDS", "100"))
 limit_request_field_size = int(os.getenv("GUNICORN_LIMIT_REQUEST_FIELD_SIZE", "32768"))
 
 
+estado_tiempo_real_backend = os.getenv("ESTADO_TIEMPO_REAL_BACKEND", "memoria").strip().lower()
+
+if workers != 1 and estado_tiempo_real_backend == "memoria":
+    raise RuntimeError(
+        "GUNICORN_WORKERS debe permanecer en 1 mientras el estado en tiempo real use memoria. "
+        "Para múltiples workers configura ESTADO_TIEMPO_REAL_BACKEND=sqlite."
+    )
+
 if workers != 1 and not os.getenv("SOCKETIO_MESSAGE_QUEUE"):
     raise RuntimeError(
-        "GUNICORN_WORKERS debe permanecer en 1 mientras Socket.IO use estado en memoria. "
-        "Para múltiples workers necesitas sticky sessions y SOCKETIO_MESSAGE_QUEUE."
+        "Con varios workers Socket.IO necesita sticky sessions y SOCKETIO_MESSAGE_QUEUE "
+        "para difundir eventos entre procesos."
     )
@@ -0,0 +1,65 @@
+"""Crea los índices compuestos de inspecciones, detalles, asignaciones y planes.
+
+Los índices están declarados en los modelos (``__table_args__``); las bases
+nuevas los obtienen con ``db.create_all()``. Esta migración los agrega en las
+bases existentes (MySQL o SQLite) y puede ejecutarse varias veces.
+"""
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.engine import make_url
+
+from app.config import Config
+from app.models.Inspecciones_models import (
+    EncargadoEstablecimiento,
+    Inspeccion,
+    InspeccionDetalle,
+    JefeEstablecimiento,
+    PlanSemanal,
+)
+
+load_dotenv()
+
+MODELOS = [
+    Inspeccion,
+    InspeccionDetalle,
+    EncargadoEstablecimiento,
+    JefeEstablecimiento,
+    PlanSemanal,
+]
+
+
+def obtener_engine():
+    return create_engine(make_url(Config.SQLALCHEMY_DATABASE_URI), future=True)
+
+
+def indices_existentes(inspector, tabla):
+    return {indice["name"] for indice in inspector.get_indexes(tabla)}
+
+
+def main():
+    engine = obtener_engine()
+
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+
+        for modelo in MODELOS:
+            tabla = modelo.__table__
+            if not inspector.has_table(tabla.name):
+                print(f"⚠️ La tabla {tabla.name} no existe, se omite")
+                continue
+
+            existentes = indices_existentes(inspector, tabla.name)
+            for indice in sorted(tabla.indexes, key=lambda indice: indice.name):
+                if indice.name in existentes:
+                    print(f"ℹ️ El índice {indice.name} ya existe")
+                    continue
+                indice.create(conn)
+                columnas = ", ".join(columna.name for columna in indice.columns)
+                print(f"✅ Índice {indice.name} creado en {tabla.name} ({columnas})")
+
+    print("✅ Migración de índices completada correctamente")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Descripción: Evaluación automática semanal del reglamento para todos los establecimientos
+Lógica: Calcula en una sola pasada (consultas agrupadas, ver
+        app/services/evaluacion_semanal.py) la calificación semanal y las
+        reincidencias de los checklists de todos los establecimientos activos, y
+        muestra el resultado de los items automáticos A-01, A-02 y A-03. Sirve
+        para preparar las reuniones del lunes; por defecto evalúa la semana
+        anterior y con una fecha evalúa la semana que la contiene. Con --json
+        imprime el resultado en JSON (mismo formato que /reglamento/api/evaluacion-semanal).
+Ejemplo de Uso:
+    python preparar_reuniones_reglamento.py
+    python preparar_reuniones_reglamento.py 2026-10-05
+    python preparar_reuniones_reglamento.py 2026-10-05 --json
+"""
+
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from app.controllers.reglamento_controller import (
+    CODIGOS_AUTOMATICOS_SEMANALES,
+    _evaluar_item_automatico_semanal,
+)
+from app.models.Inspecciones_models import Establecimiento
+from app.services.evaluacion_semanal import calcular_evaluacion_semanal, rango_semana
+
+
+def main():
+    argumentos = [argumento for argumento in sys.argv[1:] if argumento != "--json"]
+    como_json = "--json" in sys.argv[1:]
+    fecha = (
+        datetime.strptime(argumentos[0], "%Y-%m-%d").date()
+        if argumentos
+        else datetime.now().date() - timedelta(days=7)
+    )
+    fecha_inicio, fecha_fin = rango_semana(fecha)
+    codigos = sorted(CODIGOS_AUTOMATICOS_SEMANALES)
+
+    app = create_app()
+    with app.app_context():
+        establecimientos = (
+            Establecimiento.query.filter_by(activo=True)
+            .order_by(Establecimiento.nombre.asc())
+            .all()
+        )
+        resultado = calcular_evaluacion_semanal(fecha_inicio, fecha_fin)
+
+        filas = []
+        for establecimiento in establecimientos:
+            datos = resultado.get(establecimiento.id, {})
+            calificacion = datos.get("calificacion")
+            reincidencias = datos.get("reincidencias") or {
+                "items_reincidentes": 0,
+                "incumplimientos_reincidentes": 0,
+            }
+            filas.append(
+                {
+                    "establecimiento_id": establecimiento.id,
+                    "establecimiento": establecimiento.nombre,
+                    "calificacion_semanal": calificacion,
+                    "reincidencias": reincidencias,
+                    "items": {
+                        codigo: _evaluar_item_automatico_semanal(
+                            codigo,
+                            calificacion["calificacion"] if calificacion else None,
+                            reincidencias,
+                        )
+                        for codigo in codigos
+                    },
+                }
+            )
+
+    if como_json:
+        print(
+            json.dumps(
+                {
+                    "semana": {
+                        "fecha_inicio": fecha_inicio.isoformat(),
+                        "fecha_fin": fecha_fin.isoformat(),
+                        "semana": fecha_inicio.isocalendar().week,
+                        "ano": fecha_inicio.isocalendar().year,
+                    },
+                    "establecimientos": filas,
+                },
+                ensure_ascii=False,
+                indent=2,
+            )
+        )
+        return
+
+    print("\n" + "=" * 100)
+    print(
+        f"EVALUACIÓN SEMANAL DEL REGLAMENTO - Semana {fecha_inicio.isocalendar().week} "
+        f"({fecha_inicio.strftime('%d/%m')} - {fecha_fin.strftime('%d/%m/%Y')})"
+    )
+    print("=" * 100)
+    print(
+        f"{'Establecimiento':<35} {'Checklists':>10} {'Calificación':>14} "
+        f"{'Reincid.':>9}  " + "  ".join(f"{codigo:>5}" for codigo in codigos)
+    )
+    print("-" * 100)
+    for fila in filas:
+        calificacion = fila["calificacion_semanal"]
+        print(
+            f"{fila['establecimiento'][:35]:<35} "
+            f"{calificacion['num_inspecciones'] if calificacion else 0:>10} "
+            f"{calificacion['calificacion'] if calificacion else 'Sin datos':>14} "
+            f"{fila['reincidencias']['items_reincidentes']:>9}  "
+            + "  ".join(
+                f"{'✅' if fila['items'][codigo] else '❌':>4}" for codigo in codigos
+            )
+        )
+    print("-" * 100)
+    sancionados = sum(1 for fila in filas if not all(fila["items"].values()))
+    print(f"✅ {len(filas)} establecimiento(s) evaluados, {sancionados} con items automáticos incumplidos")
+
+
+if __name__ == "__main__":
+    main()
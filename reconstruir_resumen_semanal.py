@@ -0,0 +1,46 @@
+"""
+Descripción: Reconstruye resumen_semanal_establecimiento desde el historial
+Lógica: Crea la tabla si no existe y rehace las filas del resumen semanal a
+        partir de las inspecciones completadas (ver app/services/resumen_semanal.py).
+        Sin argumentos rehace todo; con una fecha solo las semanas desde esa
+        fecha y con un id solo ese establecimiento. Se ejecuta una vez al
+        desplegar el resumen y cuando cambian los umbrales de calificación.
+Ejemplo de Uso:
+    python reconstruir_resumen_semanal.py
+    python reconstruir_resumen_semanal.py 2026-01-01
+    python reconstruir_resumen_semanal.py 2026-01-01 7
+"""
+
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from app.extensions import db
+from app.models.Inspecciones_models import ResumenSemanalEstablecimiento
+from app.services.resumen_semanal import reconstruir_resumen_semanal
+
+
+def main():
+    desde = datetime.strptime(sys.argv[1], "%Y-%m-%d").date() if len(sys.argv) > 1 else None
+    establecimiento_id = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    app = create_app()
+    with app.app_context():
+        ResumenSemanalEstablecimiento.__table__.create(db.engine, checkfirst=True)
+
+        filas = reconstruir_resumen_semanal(
+            db.session, desde=desde, establecimiento_id=establecimiento_id
+        )
+        db.session.commit()
+
+        alcance = f" desde {desde.isoformat()}" if desde else ""
+        if establecimiento_id:
+            alcance += f" para el establecimiento {establecimiento_id}"
+        print(f"✅ Resumen semanal reconstruido{alcance}: {filas} fila(s)")
+
+
+if __name__ == "__main__":
+    main()
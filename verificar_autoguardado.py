@@ -0,0 +1,220 @@
+"""
+Descripción: Verificación del autoguardado incremental de borradores
+Lógica: Crea una base SQLite temporal con un establecimiento y sus items y
+        envía autoguardados a /api/inspecciones/temporal con el cliente de
+        pruebas de Flask. Comprueba que:
+        - un autoguardado idéntico al anterior responde con el mismo seq, no
+          escribe en el estado compartido y aun así renueva el TTL del
+          borrador (también en el diario de borradores);
+        - tras cada cambio, calculo_resumen conserva la huella de todos los
+          items (si faltara alguna, el siguiente autoguardado volvería a
+          calcular su aporte).
+        Termina con código 1 si alguna comprobación falla.
+Ejemplo de Uso:
+    python verificar_autoguardado.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+_directorio_temporal = tempfile.mkdtemp(prefix="verificar_autoguardado_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_directorio_temporal, 'verificar.db')}"
+os.environ["ESTADO_TIEMPO_REAL_DIARIO"] = "false"
+os.environ["ESTADO_TIEMPO_REAL_BACKEND"] = "memoria"
+
+from app import create_app
+from app.extensions import db
+from app.models.Inspecciones_models import (
+    CategoriaEvaluacion,
+    Establecimiento,
+    ItemEvaluacionBase,
+    ItemEvaluacionEstablecimiento,
+)
+from app.models.Usuario_models import Rol, Usuario
+from app.services.diario_borradores import BackendConDiario, DiarioBorradores
+from app.services.estado_compartido import ESPACIOS_DURABLES, BackendMemoria, estado_compartido
+from app.utils.security import CSRF_HEADER_NAME, CSRF_SESSION_KEY
+
+ROL = "Administrador"
+TOKEN = "verificar-autoguardado"
+
+
+def crear_datos():
+    """Un administrador y un establecimiento con tres items de riesgos distintos."""
+    rol = Rol(nombre=ROL)
+    db.session.add(rol)
+    db.session.flush()
+    usuario = Usuario(
+        nombre="Verificación",
+        apellido="Autoguardado",
+        correo="verificar@example.com",
+        nombre_usuario="verificar",
+        contrasena="-",
+        rol_id=rol.id,
+        activo=True,
+    )
+    categoria = CategoriaEvaluacion(nombre="Verificación", orden=1)
+    establecimiento = Establecimiento(nombre="Establecimiento", activo=True)
+    db.session.add_all([usuario, categoria, establecimiento])
+    db.session.flush()
+
+    items = []
+    for numero, riesgo in enumerate(("Menor", "Mayor", "Crítico")):
+        base = ItemEvaluacionBase(
+            categoria_id=categoria.id,
+            codigo=f"V-{numero:02d}",
+            descripcion=f"Item {numero}",
+            riesgo=riesgo,
+            orden=numero,
+        )
+        db.session.add(base)
+        db.session.flush()
+        item = ItemEvaluacionEstablecimiento(
+            establecimiento_id=establecimiento.id, item_base_id=base.id, activo=True
+        )
+        db.session.add(item)
+        items.append(item)
+    db.session.commit()
+    return usuario.id, establecimiento.id, [str(item.id) for item in items]
+
+
+def contar_escrituras(backend):
+    """Envuelve las escrituras del backend y devuelve el contador."""
+    contador = {"escrituras": 0}
+    for metodo in ("guardar", "actualizar", "eliminar"):
+        original = getattr(backend, metodo)
+
+        def envoltura(*args, _original=original, **kwargs):
+            contador["escrituras"] += 1
+            return _original(*args, **kwargs)
+
+        setattr(backend, metodo, envoltura)
+    return contador
+
+
+def _reproducir(diario):
+    reproducidas = []
+    diario.reproducir(lambda espacio, clave, valor, marca: reproducidas.append((espacio, clave, valor, marca)))
+    return reproducidas
+
+
+def vencimientos(backend, clave):
+    """Momento en que vence ``clave`` en cada espacio durable del backend en memoria."""
+    return {
+        espacio: backend._entradas[(espacio, clave)].expira
+        for espacio in ESPACIOS_DURABLES
+        if (espacio, clave) in backend._entradas
+    }
+
+
+def main():
+    app = create_app()
+    fallas = []
+    with app.app_context():
+        db.create_all()
+        # Backend en memoria con diario, como en producción con un solo worker
+        memoria = BackendMemoria(ttl_segundos=3600)
+        diario = DiarioBorradores(os.path.join(_directorio_temporal, "borradores.jsonl"), ttl_segundos=3600)
+        estado_compartido.configurar(BackendConDiario(memoria, diario, ESPACIOS_DURABLES))
+        diario.iniciar()
+        usuario_id, establecimiento_id, items = crear_datos()
+
+        cliente = app.test_client()
+        with cliente.session_transaction() as sesion:
+            sesion.update(
+                {
+                    "user_id": usuario_id,
+                    "user_role": ROL,
+                    "user_name": "Verificación",
+                    CSRF_SESSION_KEY: TOKEN,
+                    "last_activity": time.time(),
+                }
+            )
+        cliente.environ_base[f"HTTP_{CSRF_HEADER_NAME.upper().replace('-', '_')}"] = TOKEN
+
+        def autoguardar(calificaciones, observaciones=""):
+            respuesta = cliente.post(
+                "/api/inspecciones/temporal",
+                json={
+                    "establecimiento_id": establecimiento_id,
+                    "items": {
+                        item_id: {"rating": rating} for item_id, rating in calificaciones.items()
+                    },
+                    "observaciones": observaciones,
+                },
+            )
+            if respuesta.status_code != 200:
+                fallas.append(f"autoguardado respondió {respuesta.status_code}: {respuesta.get_data(as_text=True)}")
+            return respuesta.get_json() or {}
+
+        def huellas_completas(nombre, calificaciones):
+            estado = estado_compartido.espacio("datos_tiempo_real").get(
+                f"establecimiento_{establecimiento_id}", {}
+            )
+            huellas = (estado.get("calculo_resumen") or {}).get("huellas") or {}
+            faltan = sorted(set(calificaciones) - set(huellas))
+            if faltan:
+                fallas.append(f"{nombre}: calculo_resumen perdió la huella de los items {faltan}")
+
+        print("\n" + "=" * 80)
+        print("VERIFICACIÓN DEL AUTOGUARDADO INCREMENTAL")
+        print("=" * 80)
+
+        calificaciones = {items[0]: 1, items[1]: 2}
+        primero = autoguardar(calificaciones)
+        huellas_completas("primer autoguardado", calificaciones)
+
+        clave = f"establecimiento_{establecimiento_id}"
+        antes = vencimientos(memoria, clave)
+        time.sleep(0.05)
+        momento = time.time()
+        contador = contar_escrituras(estado_compartido.backend)
+        segundo = autoguardar(calificaciones)
+        despues = vencimientos(memoria, clave)
+        if set(despues) != set(ESPACIOS_DURABLES) or any(
+            despues[espacio] <= antes[espacio] for espacio in despues
+        ):
+            fallas.append(f"autoguardado idéntico no renovó el TTL: {antes} -> {despues}")
+
+        # Al reproducir el diario, el TTL debe contar desde la renovación
+        diario.cerrar()
+        marcas = {
+            espacio: marca
+            for espacio, clave_diario, _, marca in _reproducir(diario)
+            if clave_diario == clave
+        }
+        diario.iniciar()
+        if any(marcas.get(espacio, 0) < momento for espacio in ESPACIOS_DURABLES):
+            fallas.append(f"el diario no anotó la renovación del TTL: {marcas}")
+        if segundo.get("seq") != primero.get("seq"):
+            fallas.append(f"autoguardado idéntico cambió seq: {primero.get('seq')} -> {segundo.get('seq')}")
+        if contador["escrituras"]:
+            fallas.append(f"autoguardado idéntico escribió {contador['escrituras']} vez/veces")
+        print(f"{'❌' if fallas else '✅'} autoguardado idéntico: seq {segundo.get('seq')}, {contador['escrituras']} escritura(s)")
+
+        calificaciones = {items[0]: 3, items[1]: 2, items[2]: 8}
+        autoguardar(calificaciones)
+        huellas_completas("autoguardado con cambios", calificaciones)
+        autoguardar(calificaciones, "solo cambian las observaciones")
+        huellas_completas("autoguardado con observaciones", calificaciones)
+
+        contador["escrituras"] = 0
+        tercero = autoguardar(calificaciones, "solo cambian las observaciones")
+        cuarto = autoguardar(calificaciones, "solo cambian las observaciones")
+        if cuarto.get("seq") != tercero.get("seq") or contador["escrituras"]:
+            fallas.append("autoguardado idéntico tras un cambio no se omitió")
+
+        print("-" * 80)
+        if fallas:
+            for falla in fallas:
+                print(f"❌ {falla}")
+            sys.exit(1)
+        print("✅ Los autoguardados idénticos se omiten y las huellas se conservan")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Descripción: Verificación con EXPLAIN de las consultas calientes de inspecciones
+Lógica: Obtiene el plan (EXPLAIN QUERY PLAN en SQLite, EXPLAIN en MySQL) de las
+        consultas de metas semanales, dashboards, detalles, asignaciones, planes
+        y búsqueda paginada, y termina con código 1 si alguna recorre completa
+        una tabla en lugar de usar un índice (SCAN sin índice / type=ALL).
+        Por defecto crea el esquema de los modelos en una base SQLite temporal,
+        así comprueba que los índices declarados cubren las consultas. Para
+        revisar una base real (después de migrar_indices_inspecciones.py) indicar
+        VERIFICAR_DATABASE_URL; en MySQL conviene que tenga datos representativos,
+        con tablas casi vacías el optimizador puede preferir el recorrido completo.
+Ejemplo de Uso:
+    python verificar_indices_consultas.py
+    VERIFICAR_DATABASE_URL=mysql+pymysql://... python verificar_indices_consultas.py
+"""
+
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+_url_verificacion = os.getenv("VERIFICAR_DATABASE_URL")
+_directorio_temporal = tempfile.mkdtemp(prefix="verificar_indices_")
+os.environ["DATABASE_URL"] = _url_verificacion or (
+    f"sqlite:///{os.path.join(_directorio_temporal, 'verificar.db')}"
+)
+os.environ["ESTADO_TIEMPO_REAL_DIARIO"] = "false"
+
+from sqlalchemy import func, or_, select, text
+
+from app import create_app
+from app.extensions import db
+from app.models.Inspecciones_models import (
+    EncargadoEstablecimiento,
+    Inspeccion,
+    InspeccionDetalle,
+    JefeEstablecimiento,
+    PlanSemanal,
+)
+
+HOY = date.today()
+INICIO_SEMANA = HOY - timedelta(days=HOY.weekday())
+FIN_SEMANA = INICIO_SEMANA + timedelta(days=6)
+
+
+def consultas():
+    """(nombre, tabla vigilada, sentencia) tal como las arman los controladores."""
+    return [
+        (
+            "metas semanales (obtener_establecimientos)",
+            "inspecciones",
+            select(Inspeccion.establecimiento_id, func.count(Inspeccion.id))
+            .where(
+                Inspeccion.establecimiento_id.in_([1, 2, 3]),
+                Inspeccion.fecha >= INICIO_SEMANA,
+                Inspeccion.fecha <= FIN_SEMANA,
+                Inspeccion.estado == "completada",
+            )
+            .group_by(Inspeccion.establecimiento_id),
+        ),
+        (
+            "inspecciones de la semana de un establecimiento",
+            "inspecciones",
+            select(func.count(Inspeccion.id)).where(
+                Inspeccion.fecha >= INICIO_SEMANA,
+                Inspeccion.fecha <= FIN_SEMANA,
+                Inspeccion.establecimiento_id == 1,
+                Inspeccion.estado == "completada",
+            ),
+        ),
+        (
+            "dashboard por rango de fechas",
+            "inspecciones",
+            select(Inspeccion.id, Inspeccion.puntaje_total).where(
+                Inspeccion.estado == "completada",
+                Inspeccion.fecha >= HOY - timedelta(days=90),
+                Inspeccion.fecha <= HOY,
+            ),
+        ),
+        (
+            "búsqueda paginada por (fecha, created_at, id)",
+            "inspecciones",
+            select(Inspeccion.id)
+            .order_by(
+                Inspeccion.fecha.desc(),
+                Inspeccion.created_at.desc(),
+                Inspeccion.id.desc(),
+            )
+            .limit(51),
+        ),
+        (
+            "detalles de una inspección",
+            "inspeccion_detalles",
+            select(InspeccionDetalle.id, InspeccionDetalle.item_establecimiento_id).where(
+                InspeccionDetalle.inspeccion_id == 1
+            ),
+        ),
+        (
+            "asignaciones vigentes del encargado",
+            "encargados_establecimientos",
+            select(EncargadoEstablecimiento.establecimiento_id).where(
+                EncargadoEstablecimiento.usuario_id == 1,
+                EncargadoEstablecimiento.activo == True,
+                EncargadoEstablecimiento.fecha_inicio <= HOY,
+                or_(
+                    EncargadoEstablecimiento.fecha_fin.is_(None),
+                    EncargadoEstablecimiento.fecha_fin >= HOY,
+                ),
+            ),
+        ),
+        (
+            "asignaciones del jefe de establecimiento",
+            "jefes_establecimientos",
+            select(JefeEstablecimiento.establecimiento_id).where(
+                JefeEstablecimiento.usuario_id == 1,
+                JefeEstablecimiento.activo == True,
+            ),
+        ),
+        (
+            "planes de la semana",
+            "plan_semanal",
+            select(PlanSemanal.id).where(
+                PlanSemanal.semana == HOY.isocalendar()[1],
+                PlanSemanal.ano == HOY.year,
+            ),
+        ),
+    ]
+
+
+def recorridos_completos(conn, sentencia, tabla):
+    """Pasos del plan que recorren ``tabla`` completa."""
+    sql = str(
+        sentencia.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+    )
+    if conn.dialect.name == "sqlite":
+        plan = [fila[-1] for fila in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+        return plan, [
+            paso for paso in plan if paso.split()[:2] == ["SCAN", tabla] and "INDEX" not in paso
+        ]
+
+    filas = [dict(fila._mapping) for fila in conn.execute(text(f"EXPLAIN {sql}"))]
+    plan = [f"{fila.get('table')}: type={fila.get('type')} key={fila.get('key')}" for fila in filas]
+    return plan, [
+        paso
+        for paso, fila in zip(plan, filas)
+        if fila.get("table") == tabla and fila.get("type") == "ALL"
+    ]
+
+
+def main():
+    app = create_app()
+    with app.app_context():
+        if not _url_verificacion:
+            db.create_all()
+
+        print("\n" + "=" * 80)
+        print("VERIFICACIÓN DE ÍNDICES - CONSULTAS DE INSPECCIONES")
+        print(f"Base de datos: {db.engine.url.render_as_string(hide_password=True)}")
+        print("=" * 80)
+
+        fallidas = []
+        with db.engine.connect() as conn:
+            for nombre, tabla, sentencia in consultas():
+                plan, completos = recorridos_completos(conn, sentencia, tabla)
+                print(f"{'❌' if completos else '✅'} {nombre}")
+                for paso in plan:
+                    print(f"     {paso}")
+                if completos:
+                    fallidas.append(nombre)
+
+        print("-" * 80)
+        if fallidas:
+            print(f"❌ {len(fallidas)} consulta(s) recorren la tabla completa:")
+            for nombre in fallidas:
+                print(f"   - {nombre}")
+            sys.exit(1)
+        print("✅ Todas las consultas usan índices")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Descripción: Paridad entre el cálculo de puntajes en SQL y en Python
+Lógica: calcular_puntajes_inspeccion suma los puntajes con una consulta de
+        agregación (PUNTAJES_EN_SQL=true) o calificando los detalles en Python.
+        Este script calcula los totales de cada inspección por los dos caminos
+        y termina con código 1 si alguno difiere. Ninguno de los dos escribe.
+        Por defecto crea una base SQLite temporal con items de los tres
+        riesgos y detalles con ratings válidos, inválidos, nulos y con solo
+        score (incluso fraccionario). Con VERIFICAR_DATABASE_URL revisa las
+        últimas inspecciones de una base real sin modificarla.
+        Antes compara el aporte y el máximo de cada par (riesgo, rating),
+        también con riesgos con espacios, vacíos o NULL: el Enum del modelo
+        no deja cargar esas filas con el ORM, pero la consulta SQL sí las lee.
+Ejemplo de Uso:
+    python verificar_puntajes_sql.py
+    VERIFICAR_DATABASE_URL=mysql+pymysql://... python verificar_puntajes_sql.py 500
+"""
+
+import os
+import random
+import sys
+import tempfile
+from datetime import date
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+_url_verificacion = os.getenv("VERIFICAR_DATABASE_URL")
+_directorio_temporal = tempfile.mkdtemp(prefix="verificar_puntajes_")
+os.environ["DATABASE_URL"] = _url_verificacion or (
+    f"sqlite:///{os.path.join(_directorio_temporal, 'verificar.db')}"
+)
+os.environ["ESTADO_TIEMPO_REAL_DIARIO"] = "false"
+
+from sqlalchemy import String, literal, select
+
+from app import create_app
+from app.controllers.inspecciones_controller import InspeccionesController
+from app.extensions import db
+from app.models.Inspecciones_models import (
+    CategoriaEvaluacion,
+    Establecimiento,
+    Inspeccion,
+    InspeccionDetalle,
+    ItemEvaluacionBase,
+    ItemEvaluacionEstablecimiento,
+)
+from app.services.puntuacion import aporte_rating, aportes_sql, puntaje_maximo, puntaje_maximo_sql
+
+RIESGOS = ("Menor", "Mayor", "Crítico")
+# Valores que solo pueden venir de datos cargados fuera del ORM
+RIESGOS_IRREGULARES = (" Crítico", "Crítico  ", " Mayor ", "", "  ", None)
+RATINGS = (1, 2, 3, 8, 0, 4, 5, None)
+SCORES = (None, Decimal("1"), Decimal("2.50"), Decimal("3.99"), Decimal("8"), Decimal("4.5"))
+
+
+def crear_datos(inspecciones=200, semilla=25):
+    """Establecimientos con items activos e inactivos e inspecciones al azar."""
+    azar = random.Random(semilla)
+    categoria = CategoriaEvaluacion(nombre="Verificación", orden=1)
+    db.session.add(categoria)
+    db.session.flush()
+
+    bases = []
+    for numero in range(12):
+        base = ItemEvaluacionBase(
+            categoria_id=categoria.id,
+            codigo=f"V-{numero:02d}",
+            descripcion=f"Item {numero}",
+            riesgo=RIESGOS[numero % len(RIESGOS)],
+            orden=numero,
+            activo=numero != 11,
+        )
+        db.session.add(base)
+        bases.append(base)
+
+    items_por_establecimiento = {}
+    for numero in range(4):
+        establecimiento = Establecimiento(nombre=f"Establecimiento {numero}", activo=True)
+        db.session.add(establecimiento)
+        db.session.flush()
+        items = []
+        for base in bases:
+            item = ItemEvaluacionEstablecimiento(
+                establecimiento_id=establecimiento.id,
+                item_base_id=base.id,
+                activo=azar.random() > 0.1,
+            )
+            db.session.add(item)
+            items.append(item)
+        db.session.flush()
+        items_por_establecimiento[establecimiento.id] = items
+
+    for _ in range(inspecciones):
+        establecimiento_id = azar.choice(list(items_por_establecimiento))
+        inspeccion = Inspeccion(
+            establecimiento_id=establecimiento_id,
+            inspector_id=1,
+            fecha=date.today(),
+            estado="en_proceso",
+        )
+        db.session.add(inspeccion)
+        db.session.flush()
+        items = items_por_establecimiento[establecimiento_id]
+        for item in azar.sample(items, azar.randint(0, len(items))):
+            db.session.add(
+                InspeccionDetalle(
+                    inspeccion_id=inspeccion.id,
+                    item_establecimiento_id=item.id,
+                    rating=azar.choice(RATINGS),
+                    score=azar.choice(SCORES),
+                )
+            )
+    db.session.commit()
+
+
+def diferencias_por_item():
+    """Aporte y máximo de cada (riesgo, rating) en SQL y en Python."""
+    distintos = []
+    for riesgo in (*RIESGOS, *RIESGOS_IRREGULARES):
+        for rating in (*RATINGS, 9, -1):
+            columna_riesgo = literal(riesgo, String())
+            columna_rating = literal(rating, InspeccionDetalle.rating.type)
+            *aporte, maximo = db.session.execute(
+                select(*aportes_sql(columna_riesgo, columna_rating), puntaje_maximo_sql(columna_riesgo))
+            ).one()
+            sql = (
+                None if aporte[0] is None else (float(aporte[0]), float(aporte[1]), int(aporte[2])),
+                int(maximo),
+            )
+            python = (aporte_rating(riesgo, rating), puntaje_maximo(riesgo))
+            if sql != python:
+                distintos.append((riesgo, rating, sql, python))
+    return distintos
+
+
+def diferencias(sql, python):
+    return {
+        clave: (sql.get(clave), python.get(clave))
+        for clave in sorted(set(sql) | set(python))
+        if sql.get(clave) != python.get(clave)
+    }
+
+
+def main():
+    limite = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    app = create_app()
+    with app.app_context():
+        if not _url_verificacion:
+            db.create_all()
+            crear_datos(limite)
+
+        print("\n" + "=" * 80)
+        print("PARIDAD DE PUNTAJES - SQL vs PYTHON")
+        print(f"Base de datos: {db.engine.url.render_as_string(hide_password=True)}")
+        print("=" * 80)
+
+        distintos = diferencias_por_item()
+        for riesgo, rating, sql, python in distintos:
+            print(f"❌ Riesgo {riesgo!r}, rating {rating!r}: SQL {sql} / Python {python}")
+
+        inspecciones = Inspeccion.query.order_by(Inspeccion.id.desc()).limit(limite).all()
+        distintas = 0
+        for inspeccion in inspecciones:
+            sql = InspeccionesController._totales_puntaje_sql(inspeccion)
+            python = InspeccionesController._totales_puntaje_python(inspeccion)
+            diferentes = diferencias(sql, python)
+            if diferentes:
+                distintas += 1
+                print(f"❌ Inspección {inspeccion.id}: {diferentes}")
+
+        print("-" * 80)
+        if distintas or distintos:
+            print(f"❌ {distintas} de {len(inspecciones)} inspección(es) con totales distintos")
+            print(f"❌ {len(distintos)} par(es) (riesgo, rating) con aportes distintos")
+            sys.exit(1)
+        print(f"✅ {len(inspecciones)} inspección(es) con los mismos totales en SQL y en Python")
+
+
+if __name__ == "__main__":
+    main()